@@ -0,0 +1,222 @@
+"""
+Local stand-in for the Unsplash search API (``/search/photos``) used by the benchmarks.
+Its latency, payload size, error rate and number of results are configurable, so the
+search pipeline can be measured without touching the network.
+
+It can also be run on its own and used via the ``base_url`` setting of the "unsplash"
+backend:
+
+    python -m benchmarks.mock_server --port 8000 --latency 0.1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+#: Path of the emulated search endpoint
+SEARCH_PATH = "/search/photos"
+
+#: Page size used when the request does not give one (same as Unsplash)
+DEFAULT_PER_PAGE = 10
+
+#: Largest page size the API returns (same as Unsplash)
+MAX_PER_PAGE = 30
+
+
+class MockAPISettings(NamedTuple):
+    """
+    Behaviour of the mock API
+    """
+
+    #: Seconds each response is delayed by
+    latency: float = 0.05
+
+    #: Additional random delay of up to this many seconds
+    jitter: float = 0.0
+
+    #: Bytes of filler text added to each record
+    payload_size: int = 0
+
+    #: Share of requests (0 to 1) answered with a 503 response
+    error_rate: float = 0.0
+
+    #: Number of results available for each query
+    total_results: int = 1000
+
+
+class MockUnsplashHandler(BaseHTTPRequestHandler):
+    """
+    Answers search requests like the Unsplash API does
+    """
+
+    protocol_version = "HTTP/1.1"
+    server: MockUnsplashServer
+
+    def do_GET(self):
+        settings = self.server.settings
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        self.server.count_request()
+
+        time.sleep(settings.latency + random.uniform(0, settings.jitter))
+
+        if url.path != SEARCH_PATH:
+            return self.send_json(404, {"errors": ["Not found"]})
+
+        if random.random() < settings.error_rate:
+            self.server.count_error()
+            return self.send_json(503, {"errors": ["Service unavailable"]})
+
+        try:
+            page = max(int(params.get("page", 1)), 1)
+            per_page = min(
+                max(int(params.get("per_page", DEFAULT_PER_PAGE)), 1), MAX_PER_PAGE
+            )
+        except ValueError:
+            return self.send_json(400, {"errors": ["Invalid page"]})
+
+        query = params.get("query", "")
+        start = (page - 1) * per_page
+        records = [
+            self.get_record(query, idx, settings.payload_size)
+            for idx in range(start, min(start + per_page, settings.total_results))
+        ]
+
+        self.send_json(
+            200,
+            {
+                "total": settings.total_results,
+                "total_pages": math.ceil(settings.total_results / per_page),
+                "results": records,
+            },
+        )
+
+    def get_record(self, query: str, idx: int, payload_size: int) -> dict:
+        photo_id = f"{query}-{idx}"
+
+        return {
+            "id": photo_id,
+            "width": 4000,
+            "height": 3000,
+            "description": "x" * payload_size,
+            "links": {
+                "download": f"http://{self.headers['Host']}/photos/{photo_id}/download"
+            },
+        }
+
+    def send_json(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        """
+        Logging each request would slow the server down
+        """
+
+
+class MockUnsplashServer(ThreadingHTTPServer):
+    """
+    Mock API server which handles each connection in its own thread. Use it as a
+    context manager to run it in the background:
+
+        with MockUnsplashServer(MockAPISettings(latency=0.1)) as server:
+            ...  # send requests to server.url
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, settings: MockAPISettings, host: str = "127.0.0.1", port: int = 0
+    ):
+        super().__init__((host, port), MockUnsplashHandler)
+        self.settings = settings
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+
+        return f"http://{host}:{port}/"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def count_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.errors = 0
+
+    def __enter__(self) -> MockUnsplashServer:
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds an option for each of the `MockAPISettings` to ``parser``
+    """
+    defaults = MockAPISettings()
+
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--payload-size", type=int, default=defaults.payload_size)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--total-results", type=int, default=defaults.total_results)
+
+
+def get_settings(args: argparse.Namespace) -> MockAPISettings:
+    return MockAPISettings(
+        latency=args.latency,
+        jitter=args.jitter,
+        payload_size=args.payload_size,
+        error_rate=args.error_rate,
+        total_results=args.total_results,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockUnsplashServer(get_settings(args), args.host, args.port)
+    print(f"Serving the mock Unsplash API at {server.url}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Benchmarks ``latz search`` end to end against the local mock Unsplash API (see
+`benchmarks.mock_server`) at several concurrency levels and measures:
+
+- startup time (``latz --help``)
+- throughput (queries and results per second)
+- p50/p99 latency (time until the first result of each query is written)
+- peak memory (maximum resident set size of the latz process)
+
+The results are written as JSON, so runs from different commits can be compared:
+
+    python -m benchmarks.run --output baseline.json
+    git checkout my-branch
+    python -m benchmarks.run --output changes.json --compare baseline.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import NamedTuple
+
+from rich.console import Console
+from rich.table import Table
+
+from .mock_server import (
+    MockAPISettings,
+    MockUnsplashServer,
+    add_settings_arguments,
+    get_settings,
+)
+
+#: Directory containing the "latz" package
+PROJECT_ROOT = Path(__file__).parent.parent
+
+#: Version of the format of the results file
+RESULTS_VERSION = 1
+
+#: Metrics where a lower value is better (all others are better when higher)
+LOWER_IS_BETTER = frozenset(
+    {
+        "startup_seconds",
+        "wall_seconds",
+        "latency_p50_seconds",
+        "latency_p99_seconds",
+        "peak_memory_mb",
+        "requests",
+    }
+)
+
+
+class RunResult(NamedTuple):
+    """
+    Measurements of a single ``latz`` run
+    """
+
+    wall_seconds: float
+    peak_memory_mb: float
+    results: int
+    latencies: tuple[float, ...]
+
+
+def get_environment(home: Path) -> dict[str, str]:
+    """
+    Environment for running latz in isolation with ``home`` as its home directory
+    """
+    env = {
+        name: value
+        for name, value in os.environ.items()
+        if not name.startswith("LATZ_")
+    }
+
+    return {
+        **env,
+        "HOME": str(home),
+        "XDG_CACHE_HOME": str(home / "cache"),
+        "PYTHONPATH": str(PROJECT_ROOT),
+    }
+
+
+def write_config(home: Path, server: MockUnsplashServer, concurrency: int) -> None:
+    """
+    Writes a configuration which only uses the "unsplash" backend pointed at ``server``
+    """
+    config = {
+        "search_backends": ["unsplash"],
+        "max_concurrency": concurrency,
+        "search_backend_settings": {
+            "unsplash": {"access_key": "benchmark", "base_url": server.url}
+        },
+    }
+    (home / ".latz.json").write_text(json.dumps(config))
+
+
+def run_latz(args: Sequence[str], env: dict[str, str], cwd: Path) -> RunResult:
+    """
+    Runs latz with ``args`` and measures it. When latz writes NDJSON, the time until the
+    first result of each query arrives is recorded as its latency.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        (sys.executable, "-m", "latz", *args),
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    first_results: dict[str, float] = {}
+    results = 0
+
+    assert process.stdout is not None
+    for line in process.stdout:
+        if not line.startswith("{"):
+            continue
+        results += 1
+        query = json.loads(line).get("query")
+        first_results.setdefault(query, time.perf_counter() - started)
+
+    # Unlike "process.wait()", this gives us the resource usage of just this process
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    wall_seconds = time.perf_counter() - started
+    process.stdout.close()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"latz {' '.join(args)} exited with {process.returncode}")
+
+    # Linux reports kilobytes, macOS bytes
+    peak_memory = usage.ru_maxrss / (1024**2 if sys.platform == "darwin" else 1024)
+
+    return RunResult(
+        wall_seconds, peak_memory, results, tuple(sorted(first_results.values()))
+    )
+
+
+def get_percentile(values: Sequence[float], percentile: int) -> float:
+    """
+    Returns the ``percentile`` of the sorted ``values``
+    """
+    if len(values) < 2:
+        return values[0] if values else 0.0
+
+    return statistics.quantiles(values, n=100, method="inclusive")[percentile - 1]
+
+
+def measure_startup(env: dict[str, str], cwd: Path, runs: int) -> float:
+    """
+    Returns the median time ``latz --help`` takes
+    """
+    return statistics.median(
+        run_latz(("--help",), env, cwd).wall_seconds for _ in range(runs)
+    )
+
+
+def measure_search(
+    server: MockUnsplashServer,
+    home: Path,
+    queries_file: Path,
+    queries: int,
+    concurrency: int,
+    limit: int,
+    repeat: int,
+) -> dict:
+    """
+    Runs the search for all queries ``repeat`` times with at most ``concurrency``
+    searches at the same time and returns the median of each metric
+    """
+    env = get_environment(home)
+    write_config(home, server, concurrency)
+    args = (
+        "search",
+        "--queries-file",
+        str(queries_file),
+        "--limit",
+        str(limit),
+        "--concurrency",
+        str(concurrency),
+        "--format",
+        "ndjson",
+        "--no-cache",
+    )
+    runs = []
+    requests = []
+
+    for _ in range(repeat):
+        server.reset_counts()
+        runs.append(run_latz(args, env, home))
+        requests.append(server.requests)
+
+    def median(values) -> float:
+        return round(statistics.median(values), 4)
+
+    return {
+        "concurrency": concurrency,
+        "wall_seconds": median(run.wall_seconds for run in runs),
+        "queries_per_second": median(queries / run.wall_seconds for run in runs),
+        "results_per_second": median(run.results / run.wall_seconds for run in runs),
+        "latency_p50_seconds": median(
+            get_percentile(run.latencies, 50) for run in runs
+        ),
+        "latency_p99_seconds": median(
+            get_percentile(run.latencies, 99) for run in runs
+        ),
+        "peak_memory_mb": median(run.peak_memory_mb for run in runs),
+        "results": median(run.results for run in runs),
+        "requests": median(requests),
+    }
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ("git", "rev-parse", "HEAD"),
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    settings: MockAPISettings,
+    concurrency_levels: Sequence[int],
+    queries: int = 100,
+    limit: int = 30,
+    repeat: int = 3,
+    startup_runs: int = 5,
+) -> dict:
+    """
+    Runs all benchmarks and returns their results
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir, MockUnsplashServer(
+        settings
+    ) as server:
+        home = Path(tmp_dir)
+        queries_file = home / "queries.txt"
+        queries_file.write_text("".join(f"query{idx}\n" for idx in range(queries)))
+
+        startup = measure_startup(get_environment(home), home, startup_runs)
+        scenarios = [
+            measure_search(
+                server, home, queries_file, queries, concurrency, limit, repeat
+            )
+            for concurrency in concurrency_levels
+        ]
+
+    return {
+        "version": RESULTS_VERSION,
+        "metadata": {
+            "commit": get_commit(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "queries": queries,
+            "limit": limit,
+            "repeat": repeat,
+            "mock_api": settings._asdict(),
+        },
+        "startup_seconds": round(startup, 4),
+        "scenarios": scenarios,
+    }
+
+
+def get_metrics(results: dict) -> dict[str, float]:
+    """
+    Flattens ``results`` into "<scenario>.<metric>" names and their values
+    """
+    metrics = {"startup_seconds": results["startup_seconds"]}
+
+    for scenario in results["scenarios"]:
+        for name, value in scenario.items():
+            if name != "concurrency":
+                metrics[f"concurrency={scenario['concurrency']}.{name}"] = value
+
+    return metrics
+
+
+def compare_results(baseline: dict, current: dict) -> Table:
+    """
+    Creates a table showing how each metric changed compared to ``baseline``
+    """
+    table = Table(title="Compared to baseline")
+    table.add_column("Metric")
+    table.add_column("Baseline", justify="right")
+    table.add_column("Current", justify="right")
+    table.add_column("Change", justify="right")
+
+    baseline_metrics = get_metrics(baseline)
+
+    for name, value in get_metrics(current).items():
+        old_value = baseline_metrics.get(name)
+        if old_value is None:
+            continue
+
+        change = (value - old_value) / old_value if old_value else 0.0
+        lower_is_better = name.rsplit(".", 1)[-1] in LOWER_IS_BETTER
+        color = "green" if (change < 0) == lower_is_better else "red"
+
+        table.add_row(
+            name,
+            str(old_value),
+            str(value),
+            f"[{color}]{change:+.1%}[/{color}]" if change else f"{change:+.1%}",
+        )
+
+    return table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 4, 16], metavar="N"
+    )
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--startup-runs", type=int, default=5)
+    parser.add_argument("--output", "-o", type=Path, help="File to write results to")
+    parser.add_argument(
+        "--compare", type=Path, help="Results file of an earlier run to compare with"
+    )
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        get_settings(args),
+        args.concurrency,
+        queries=args.queries,
+        limit=args.limit,
+        repeat=args.repeat,
+        startup_runs=args.startup_runs,
+    )
+    output = json.dumps(results, indent=2)
+
+    if args.output is not None:
+        args.output.write_text(f"{output}\n")
+    else:
+        print(output)
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        Console(stderr=True).print(compare_results(baseline, results))
+
+
+if __name__ == "__main__":
+    main()
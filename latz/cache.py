@@ -0,0 +1,178 @@
+"""
+Module which holds the persistent search result cache. Results are stored in a SQLite
+database and keyed on the search backend, the normalized query and a hash of the
+backend's settings.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from .config.models import BaseSearchBackendSettings
+from .image import ImageSearchResult
+
+logger = logging.getLogger(__name__)
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS search_results (
+    backend TEXT NOT NULL,
+    query TEXT NOT NULL,
+    settings_hash TEXT NOT NULL,
+    result_limit INTEGER,
+    created REAL NOT NULL,
+    results TEXT NOT NULL,
+    PRIMARY KEY (backend, query, settings_hash)
+)
+"""
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a search query so that trivially different queries share a cache entry
+
+    Example:
+    >>> normalize_query("  Funny   BUNNY ")
+    'funny bunny'
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def get_settings_hash(settings: BaseModel | None, params: dict | None = None) -> str:
+    """
+    Returns a stable hash of a search backend's settings and the ``params`` (e.g.
+    offset and filters) its search is called with. Settings that latz adds to every
+    backend (e.g. ``cache_ttl``) are excluded because they do not change results.
+    """
+    data = (
+        settings.dict(exclude=set(BaseSearchBackendSettings.__fields__))
+        if settings is not None
+        else {}
+    )
+    serialized = json.dumps(
+        [data, params] if params else data, sort_keys=True, default=str
+    )
+
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def get_cache_ttl(config, backend_name: str) -> int:
+    """
+    Returns the number of seconds results for ``backend_name`` may be cached for.
+    The backend's own ``cache_ttl`` setting takes precedence over the global one.
+    """
+    backend_settings = getattr(config.search_backend_settings, backend_name, None)
+    backend_ttl = getattr(backend_settings, "cache_ttl", None)
+
+    return config.cache_ttl if backend_ttl is None else backend_ttl
+
+
+class SearchResultCache:
+    """
+    Persistent cache for search results. Entries remember the ``limit`` they were
+    fetched with so that a result fetched for a larger limit can answer a smaller one.
+
+    The cache never raises; any problem with the underlying database is logged and
+    treated as a cache miss.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(path)
+            self._connection.execute(CREATE_TABLE_SQL)
+        except (OSError, sqlite3.Error) as exc:
+            logger.warning(f"Unable to open search cache at {path}: {exc}")
+            self._connection = None
+
+    def get(
+        self,
+        backend: str,
+        query: str,
+        settings_hash: str,
+        ttl: int,
+        limit: int | None = None,
+    ) -> tuple[ImageSearchResult, ...] | None:
+        """
+        Returns cached results or ``None`` when nothing usable has been cached. An entry
+        is usable when it is younger than ``ttl`` seconds and holds at least ``limit``
+        results (or every result the backend had to offer).
+        """
+        if self._connection is None or ttl <= 0:
+            return None
+
+        try:
+            row = self._connection.execute(
+                "SELECT result_limit, created, results FROM search_results "
+                "WHERE backend = ? AND query = ? AND settings_hash = ?",
+                (backend, normalize_query(query), settings_hash),
+            ).fetchone()
+        except sqlite3.Error as exc:
+            logger.warning(f"Unable to read from search cache: {exc}")
+            return None
+
+        if row is None:
+            return None
+
+        result_limit, created, results_json = row
+
+        if time.time() - created > ttl:
+            return None
+
+        results = tuple(ImageSearchResult(*result) for result in json.loads(results_json))
+
+        # An entry covers the request if it was not limited, was fetched with a larger
+        # limit or if the backend ran out of results before reaching its limit.
+        exhausted = result_limit is None or len(results) < result_limit
+        if not exhausted and (limit is None or limit > result_limit):
+            return None
+
+        return results[:limit] if limit is not None else results
+
+    def set(
+        self,
+        backend: str,
+        query: str,
+        settings_hash: str,
+        results: tuple[ImageSearchResult, ...],
+        limit: int | None = None,
+    ) -> None:
+        """
+        Stores ``results`` which were retrieved using ``limit`` (``None`` means the
+        backend returned everything it would return for this query).
+        """
+        if self._connection is None:
+            return
+
+        try:
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO search_results "
+                    "(backend, query, settings_hash, result_limit, created, results) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        backend,
+                        normalize_query(query),
+                        settings_hash,
+                        limit,
+                        time.time(),
+                        json.dumps(results),
+                    ),
+                )
+        except sqlite3.Error as exc:
+            logger.warning(f"Unable to write to search cache: {exc}")
+
+    def close(self) -> None:
+        """Closes the underlying database connection"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
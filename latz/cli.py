@@ -1,21 +1,62 @@
-from argparse import Namespace
-from typing import cast
+from __future__ import annotations
+
+from collections.abc import Sequence
+from functools import cached_property, partial
+from pathlib import Path
+from typing import TYPE_CHECKING, cast
+from weakref import WeakKeyDictionary
 
 import rich_click as click
-from pydantic import create_model, validator
 
-from .commands import search_command, config_group
-from .config import get_app_config, BaseAppConfig
-from .constants import CONFIG_FILES
-from .exceptions import ConfigError
-from .plugins.manager import get_plugin_manager, AppPluginManager
+from . import profiling
+from .commands import search_command, download_command, serve_command, config_group
+from .constants import (
+    CONFIG_FILES,
+    CONFIG_SCHEMA_CACHE_FILE,
+    CONFIG_SNAPSHOT_CACHE_FILE,
+    PROFILE_ENV_VAR,
+    PROFILE_FILE_ENV_VAR,
+)
+
+if TYPE_CHECKING:
+    from .config import BaseAppConfig
+    from .plugins.manager import AppPluginManager
 
 click.rich_click.USE_RICH_MARKUP = True
 click.rich_click.USE_MARKDOWN_EMOJI = True
 
+#: Commands which only need the plugins providing the configured search backends
+SEARCH_COMMANDS = ("search", "download", "serve")
+
+#: Generated configuration classes of each plugin manager indexed by the fingerprint of
+#: the config fields they were generated from
+_app_config_classes: WeakKeyDictionary[
+    AppPluginManager, dict[str, type[BaseAppConfig]]
+] = WeakKeyDictionary()
+
+
+def create_app_config_class(
+    plugin_manager: AppPluginManager, search_backends: Sequence[str] | None = None
+) -> type[BaseAppConfig]:
+    """
+    Creates the class that we use to create our application configuration object.
+    When ``search_backends`` is given, only the settings of these search backends (and
+    of plugins that have already been imported) are included.
+
+    The class is reused for as long as the config fields of the registered plugins
+    stay the same.
+    """
+    from pydantic import create_model, validator
+
+    from .config import BaseAppConfig
+
+    config_fields = plugin_manager.get_search_backend_config_fields(search_backends)
+    app_config_classes = _app_config_classes.setdefault(plugin_manager, {})
+    fingerprint = plugin_manager.config_fields_fingerprint
+
+    if fingerprint in app_config_classes:
+        return app_config_classes[fingerprint]
 
-def create_app_config_class(plugin_manager: AppPluginManager) -> type[BaseAppConfig]:
-    """Creates the class that we use to create our application configuration object"""
     # We need to dynamically define our validators because we do not know all the of the
     # valid backends until runtime.
     validators = {
@@ -26,42 +67,140 @@ def create_app_config_class(plugin_manager: AppPluginManager) -> type[BaseAppCon
 
     # Dynamically create our new configuration object based on possible new fields
     # from our registered plugins.
-    return cast(
+    app_config_classes[fingerprint] = cast(
         type[BaseAppConfig],
         create_model(
             "AppConfig",
-            **plugin_manager.search_backend_config_fields,
+            **config_fields,
             __validators__=validators,
             __base__=BaseAppConfig
         ),
     )
 
+    return app_config_classes[fingerprint]
+
+
+class AppContext:
+    """
+    Objects shared by all commands. Each of them is only created when a command first
+    uses it, so ``--help`` and commands that do not need the plugins or the
+    configuration do not pay for importing and building them.
+    """
+
+    def __init__(self, search_backends_only: bool = False):
+        #: Only import the plugins providing the configured search backends
+        self.search_backends_only = search_backends_only
+
+    @cached_property
+    def plugin_manager(self) -> AppPluginManager:
+        from .plugins.manager import get_plugin_manager
+
+        with profiling.span("plugins.discover"):
+            return get_plugin_manager()
+
+    @cached_property
+    def config_class(self) -> type[BaseAppConfig]:
+        from .config import get_search_backend_names
+
+        search_backends = None
+        if self.search_backends_only:
+            search_backends = get_search_backend_names(CONFIG_FILES)
+
+        with profiling.span("config.class"):
+            return create_app_config_class(self.plugin_manager, search_backends)
+
+    @cached_property
+    def config_schema(self) -> dict:
+        """
+        JSON schema of `config_class`; it is cached on disk between runs
+        """
+        from .config import ConfigSchemaCache
+
+        config_class = self.config_class
+
+        with profiling.span("config.schema"):
+            return ConfigSchemaCache(CONFIG_SCHEMA_CACHE_FILE).get_schema(
+                config_class, self.plugin_manager.config_fields_fingerprint
+            )
+
+    @cached_property
+    def config(self) -> BaseAppConfig:
+        """
+        Creates the actual config object which parses all possible configuration sources
+        listed in `CONFIG_FILES`.
+
+        :raises click.ClickException: Raised when the configuration is invalid
+        """
+        from .config import ConfigSnapshotCache, get_app_config
+        from .exceptions import ConfigError
+
+        config_class = self.config_class
+
+        try:
+            with profiling.span("config.load"):
+                return get_app_config(
+                    CONFIG_FILES,
+                    config_class,
+                    ConfigSnapshotCache(CONFIG_SNAPSHOT_CACHE_FILE),
+                    self.plugin_manager.config_fields_fingerprint,
+                )
+        except ConfigError as exc:
+            raise click.ClickException(str(exc))
+
+
+def report_profile(show: bool, path: Path | None) -> None:
+    """
+    Stops profiling and prints the timings of each stage (to stderr) when ``show`` is
+    set and writes them to ``path`` when given
+    """
+    profiler = profiling.disable()
+
+    if profiler is None:
+        return
+
+    if path is not None:
+        profiler.write(path)
+
+    if show:
+        from rich.console import Console
+
+        Console(stderr=True).print(profiling.create_report_table(profiler))
+
 
 @click.group("latz")
+@click.option(
+    "--profile",
+    is_flag=True,
+    envvar=PROFILE_ENV_VAR,
+    help="Print how long each stage of the command took.",
+)
+@click.option(
+    "--profile-file",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    envvar=PROFILE_FILE_ENV_VAR,
+    help="Write how long each stage of the command took as JSON to this file.",
+)
 @click.pass_context
-def cli(ctx):
+def cli(ctx, profile: bool, profile_file: Path | None):
     """
     "latz" is a command line tool for searching images via various image API backends.
     It is largely meant for educational purposes to show how to develop plugin friendly
     Python applications.
 
-    The included commands are "search" for performing actual image searches and "config"
-    for setting and displaying configuration variables.
+    The included commands are "search" for performing actual image searches, "download"
+    for saving the images found and "config" for setting and displaying configuration
+    variables.
     """
-    ctx.ensure_object(Namespace)
-    plugin_manager = get_plugin_manager()
-    ctx.obj.plugin_manager = plugin_manager
-
-    AppConfig = create_app_config_class(plugin_manager)
-    ctx.obj.config_class = AppConfig
+    if profile or profile_file is not None:
+        profiling.enable()
+        ctx.call_on_close(partial(report_profile, profile, profile_file))
 
-    # Creates the actual config object which parses all possible configuration sources
-    # listed in `CONFIG_FILES`.
-    try:
-        ctx.obj.config = get_app_config(CONFIG_FILES, AppConfig)
-    except ConfigError as exc:
-        raise click.ClickException(str(exc))
+    # Searching only requires the plugins providing the configured search backends, so
+    # we avoid importing any other plugins.
+    ctx.obj = AppContext(search_backends_only=ctx.invoked_subcommand in SEARCH_COMMANDS)
 
 
 cli.add_command(search_command)
+cli.add_command(download_command)
+cli.add_command(serve_command)
 cli.add_command(config_group)
@@ -1,2 +1,4 @@
 from .search import command as search_command  # noqa: F401
+from .download import command as download_command  # noqa: F401
+from .serve import command as serve_command  # noqa: F401
 from .config.commands import group as config_group  # noqa: F401
@@ -6,12 +6,17 @@ import rich_click as click
 from rich import print as rprint
 
 from ...constants import CONFIG_FILE_HOME_DIR
-from ...config import parse_config_file_as_json, write_config_file
 from ...exceptions import ConfigError
-from .validators import ConfigValuesValidator
 
-# Create our validator callables
-validate_and_parse_config_values = ConfigValuesValidator()
+
+def validate_and_parse_config_values(ctx, param, values) -> dict:
+    """
+    Click callback which validates and parses the values passed to "config set"
+    """
+    # Imported here so that other commands do not pay for importing the validator
+    from .validators import ConfigValuesValidator
+
+    return ConfigValuesValidator()(ctx, param, values)
 
 
 @click.group("config")
@@ -38,6 +43,8 @@ def set_command(config, config_values):
     """
     Set configuration values.
     """
+    from ...config import parse_config_file_as_json, write_config_file
+
     config_file = Path(config or CONFIG_FILE_HOME_DIR)
 
     # If this file does not exist, write an empty JSON object to it
@@ -34,7 +34,7 @@ class ConfigValuesValidator:
 
         for value in values:
             checked_values.update(
-                self.validate_single_value(value, ctx.obj.config_class)
+                self.validate_single_value(value, ctx.obj.config_schema)
             )
 
         try:
@@ -45,7 +45,7 @@ class ConfigValuesValidator:
 
         return current_config
 
-    def validate_single_value(self, value: str, config_class) -> dict:
+    def validate_single_value(self, value: str, schema: dict) -> dict:
         """
         Validates a single config parameter. This is done by first matching the
         string value against a regex. Afterwards we return this value in its dictionary
@@ -59,10 +59,9 @@ class ConfigValuesValidator:
             raise click.BadParameter(self._format_bad_format_error(value))
 
         parameter, parsed_value = match.groups()
-        schema = config_class.schema()
         parameter_type = get_param_type(schema, parameter)
 
-        if parameter_type == tuple:
+        if parameter_type in (tuple, list):
             parsed_value = parsed_value.split(VALUE_SEPARATOR)
 
         return get_nested_dict_from_path(parameter, parsed_value)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, TextIO
+
+import click
+
+from latz.constants import SEARCH_CACHE_FILE
+
+if TYPE_CHECKING:
+    from latz.plugins import SearchBackendHook
+    from latz.resize import ImageSize
+
+
+def validate_sizes(ctx, param, values) -> tuple[ImageSize, ...]:
+    """
+    Click callback which parses the "--size" values
+    """
+    from latz.resize import parse_size
+
+    try:
+        return tuple(parse_size(value) for value in values)
+    except ValueError:
+        raise click.BadParameter("Sizes need to be in the '<width>x<height>' format.")
+
+
+@click.command("download")
+@click.argument("query", required=False)
+@click.option("--limit", "-l", type=click.IntRange(min=0))
+@click.option(
+    "--results",
+    "-r",
+    "results_file",
+    type=click.File("r"),
+    help=(
+        "Download saved search results instead of searching (a JSON array or newline "
+        "delimited JSON objects with a 'url' key); use '-' to read from stdin."
+    ),
+)
+@click.option(
+    "--output-dir",
+    "-o",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=".",
+    show_default=True,
+    help="Directory to save images to.",
+)
+@click.option(
+    "--concurrency",
+    "-c",
+    type=click.IntRange(min=1),
+    help="Maximum number of downloads to run at the same time.",
+)
+@click.option(
+    "--size",
+    "-s",
+    "sizes",
+    multiple=True,
+    callback=validate_sizes,
+    help=(
+        "Also save a copy of each image scaled down to fit within '<width>x<height>'. "
+        "Can be provided multiple times."
+    ),
+)
+@click.pass_context
+def command(
+    ctx,
+    query: str | None,
+    limit: int | None,
+    results_file: TextIO | None,
+    output_dir: Path,
+    concurrency: int | None,
+    sizes: tuple[ImageSize, ...],
+):
+    """
+    Command that downloads the images found for a search term. Interrupted downloads
+    are resumed the next time the command is run.
+    """
+    if (query is None) == (results_file is None):
+        raise click.UsageError("Provide either a QUERY or --results (but not both).")
+
+    # Imported here so that other commands do not pay for importing them
+    import asyncio
+
+    from latz.cache import SearchResultCache
+    from latz.download import load_results, main
+    from latz.events import EventDispatcher
+
+    results = None
+    backends: tuple[SearchBackendHook, ...] = ()
+
+    if results_file is not None:
+        results = load_results(results_file)[:limit]
+    else:
+        backends = ctx.obj.plugin_manager.get_configured_search_backends(ctx.obj.config)
+
+    cache = None
+    if query is not None and ctx.obj.config.cache:
+        cache = SearchResultCache(SEARCH_CACHE_FILE)
+
+    events = EventDispatcher(ctx.obj.plugin_manager.hook)
+
+    try:
+        failed = asyncio.run(
+            main(
+                ctx.obj.config,
+                backends,
+                query,
+                results,
+                output_dir,
+                limit=limit,
+                cache=cache,
+                concurrency=concurrency,
+                sizes=sizes,
+                events=events,
+            )
+        )
+    finally:
+        events.close()
+        if cache is not None:
+            cache.close()
+
+    if failed:
+        ctx.exit(1)
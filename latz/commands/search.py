@@ -1,72 +1,264 @@
 from __future__ import annotations
 
-import asyncio
-from collections.abc import Iterable, Callable
-from functools import partial
-from itertools import chain
+from collections.abc import Sequence
+from typing import TextIO, cast
 
 import click
-from rich.console import Console
-from rich.table import Table
 
-from latz import fetch
-from latz.image import ImageSearchResult
+from latz.constants import NO_DAEMON_ENV_VAR, SEARCH_CACHE_FILE
+from latz.output import OUTPUT_FORMATS, TABLE_FORMAT, silence_stdout
 
 
-def display_results(results: Iterable[ImageSearchResult]) -> None:
+def read_queries(queries_file: TextIO) -> tuple[str, ...]:
     """
-    Displays the `ImageSearchResult` objects as a `rich.table.Table`
+    Reads newline delimited queries, skipping blank lines
     """
-    table = Table(title="Search Results")
+    return tuple(line.strip() for line in queries_file if line.strip())
 
-    table.add_column("#", no_wrap=True)
-    table.add_column("Link", style="magenta")
-    table.add_column("Backend", justify="right", style="green")
 
-    for idx, result in enumerate(results, start=1):
-        table.add_row(str(idx), result.url, result.search_backend)
+def parse_filters(ctx, param, values: tuple[str, ...]) -> dict[str, str]:
+    """
+    Parses "name=value" pairs passed via ``--filter``
+    """
+    filters = {}
+
+    for value in values:
+        name, sep, filter_value = value.partition("=")
+        if not sep or not name:
+            raise click.BadParameter(f"'{value}' is not in the form name=value")
+        filters[name] = filter_value
 
-    console = Console()
-    console.print(table)
+    return filters
 
 
-async def main(search_callables: Iterable[Callable], limit: int | None = None):
+def search_via_daemon(queries: Sequence[str], **kwargs) -> bool:
     """
-    Main async coroutine that runs all the currently configured search functions
-    and prints the output of the query.
+    Runs the search on the daemon started by "latz serve --daemon" and shows the
+    results table; returns ``False`` when no daemon is running, so the search has to
+    run in-process. Accepts the same keyword arguments as `latz.daemon.search`.
+
+    The daemon answers once all backends are done, so this is only used for the
+    default table output; streamed output runs in-process.
     """
-    results = await fetch.gather_results(search_callables)
+    from rich.console import Console
+    from rich.markup import escape
+
+    from latz import daemon, profiling
+    from latz.image import ImageSearchResult
+    from latz.output import (
+        display_failed_searches,
+        display_missed_searches,
+        display_results,
+    )
+
+    try:
+        with profiling.span("daemon"):
+            response = daemon.search(queries, **kwargs)
+    except daemon.DaemonOutdated as exc:
+        Console(stderr=True).print(
+            f"[yellow]Not using the daemon: {escape(str(exc))}; restart it to pick up "
+            "the changes.[/yellow]"
+        )
+        return False
+    except daemon.DaemonUnavailable:
+        return False
+    except daemon.DaemonError as exc:
+        raise click.ClickException(str(exc))
+
+    show_query = len(queries) > 1
+    results = [ImageSearchResult(**record) for record in response["results"]]
+
+    for name in response["skipped"]:
+        Console(stderr=True).print(
+            f"[yellow]Skipping {escape(name)}; it does not support all of the "
+            "filters[/yellow]"
+        )
 
-    if limit is not None:
-        results = tuple(res[:limit] for res in results)
+    display_results(results, show_query=show_query)
 
-    # merge results sets into single tuple
-    results = tuple(chain(*results))
+    if response["missed"] and response["deadline"] is not None:
+        display_missed_searches(
+            ((job["backend"], job["query"]) for job in response["missed"]),
+            response["deadline"],
+            show_query=show_query,
+        )
 
-    display_results(results)
+    if response.get("failed"):
+        display_failed_searches(
+            ((job["backend"], job["query"]) for job in response["failed"]),
+            show_query=show_query,
+        )
+
+    return True
 
 
 @click.command("search")
-@click.argument("query")
-@click.option("--limit", "-l", type=int)
+@click.argument("query", required=False)
+@click.option("--limit", "-l", type=click.IntRange(min=0))
+@click.option(
+    "--offset",
+    "-o",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Number of results to skip for each search backend.",
+)
+@click.option(
+    "--filter",
+    "-F",
+    "filters",
+    multiple=True,
+    callback=parse_filters,
+    metavar="NAME=VALUE",
+    help=(
+        "Filter to pass on to the search backends (e.g. orientation=portrait); "
+        "backends which do not support it are skipped."
+    ),
+)
+@click.option(
+    "--queries-file",
+    "-f",
+    type=click.File("r"),
+    help="File with one query per line to search for; use '-' to read from stdin.",
+)
+@click.option(
+    "--concurrency",
+    "-c",
+    type=click.IntRange(min=1),
+    help="Maximum number of searches to run at the same time.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Do not read from or write to the search result cache.",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    help="Ignore cached search results but store the fresh ones.",
+)
+@click.option(
+    "--deadline",
+    "-d",
+    type=click.FloatRange(min=0, min_open=True),
+    help=(
+        "Seconds to wait for search backends; shows the results that have arrived by "
+        "then and reports the backends that missed the deadline."
+    ),
+)
+@click.option(
+    "--stream",
+    "-s",
+    is_flag=True,
+    help="Show results from each search backend as soon as they arrive.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(OUTPUT_FORMATS),
+    default=TABLE_FORMAT,
+    show_default=True,
+    help=(
+        "Output format; ndjson, csv and json write the results of each search backend "
+        "as soon as it answers, which is best suited for piping them into other tools."
+    ),
+)
+@click.option(
+    "--no-daemon",
+    is_flag=True,
+    envvar=NO_DAEMON_ENV_VAR,
+    help=(
+        'Search in-process even when "latz serve --daemon" is running (searches using '
+        "--stream or --format always run in-process)."
+    ),
+)
 @click.pass_context
-def command(ctx, query: str, limit: int):
+def command(
+    ctx,
+    query: str | None,
+    limit: int,
+    offset: int,
+    filters: dict[str, str],
+    queries_file: TextIO | None,
+    concurrency: int | None,
+    no_cache: bool,
+    refresh: bool,
+    stream: bool,
+    deadline: float | None,
+    output_format: str,
+    no_daemon: bool,
+):
     """
-    Command that retrieves an image based on a search term
+    Command that retrieves an image based on a search term. When "latz serve --daemon"
+    is running, the search is sent there instead of running in this process (unless
+    the results are streamed).
     """
-    client = fetch.get_async_client()
+    if (query is None) == (queries_file is None):
+        raise click.UsageError("Provide either a QUERY or --queries-file (but not both).")
+
+    if queries_file is not None:
+        queries = read_queries(queries_file)
+    else:
+        queries = (cast(str, query),)
+
+    # The daemon only answers once all backends are done, so streamed output (which
+    # shows the results of each backend as soon as it answers) runs in-process
+    if not no_daemon and not stream and output_format == TABLE_FORMAT:
+        try:
+            if search_via_daemon(
+                queries,
+                limit=limit,
+                offset=offset,
+                filters=filters,
+                concurrency=concurrency,
+                cache=not no_cache,
+                refresh=refresh,
+                deadline=deadline,
+            ):
+                return
+        except BrokenPipeError:
+            silence_stdout()
+            ctx.exit(1)
+
+    # Imported here so that other commands do not pay for importing them
+    import asyncio
+
+    from latz.cache import SearchResultCache
+    from latz.events import EventDispatcher
+    from latz.search import main
 
     # We collect all enabled backends here
-    search_backends = ctx.obj.plugin_manager.get_configured_search_backends(
-        ctx.obj.config
-    )
+    backends = ctx.obj.plugin_manager.get_configured_search_backends(ctx.obj.config)
 
-    # We use `partial` to create a generator with callables preconfigured with the
-    # necessary arguments (e.g. `client`, `config` and `query`)
-    search_callables = (
-        partial(backend.search, client, ctx.obj.config, query)
-        for backend in search_backends
-    )
+    cache = None
+    if ctx.obj.config.cache and not no_cache:
+        cache = SearchResultCache(SEARCH_CACHE_FILE)
+
+    events = EventDispatcher(ctx.obj.plugin_manager.hook)
 
     # This is the function call that kicks everything off
-    asyncio.run(main(search_callables, limit=limit))
+    try:
+        asyncio.run(
+            main(
+                ctx.obj.config,
+                backends,
+                queries,
+                limit=limit,
+                cache=cache,
+                refresh=refresh,
+                stream=stream,
+                concurrency=concurrency,
+                deadline=deadline,
+                offset=offset,
+                filters=filters,
+                output_format=output_format,
+                events=events,
+            )
+        )
+    except BrokenPipeError:
+        # Whoever was reading our output (e.g. "head") has stopped, so we stop as well
+        silence_stdout()
+        ctx.exit(1)
+    finally:
+        events.close()
+        if cache is not None:
+            cache.close()
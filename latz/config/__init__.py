@@ -1,6 +1,10 @@
 from .main import (  # noqa: F401
     get_app_config,
+    get_config_sources_state,
+    get_search_backend_names,
     parse_config_file_as_json,
     write_config_file,
 )
-from .models import BaseAppConfig  # noqa: F401
+from .models import BaseAppConfig, BaseSearchBackendSettings  # noqa: F401
+from .schema import ConfigSchemaCache  # noqa: F401
+from .snapshot import ConfigSnapshotCache  # noqa: F401
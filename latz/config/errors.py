@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from pathlib import Path
 from collections.abc import Sequence
 
@@ -9,7 +11,7 @@ PARSE_ERROR_SUGGESTION = ""  # TODO: link to documentation
 CONFIG_ERROR_PREFIX = "Unable to parse configuration file"
 
 
-def format_validation_error(exc: ValidationError, path: Path) -> str:
+def format_validation_error(exc: ValidationError, path: Path | str) -> str:
     """
     Formats a ``pydantic.Validation`` error as a ``str``
     """
@@ -1,20 +1,30 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
+import os
+import stat
 from collections.abc import Sequence, Iterable
 from pathlib import Path
-from functools import reduce
 from typing import NamedTuple, Any
 
 from pydantic import ValidationError
 
 from .models import BaseAppConfig
+from ..constants import ENV_PREFIX
 from .errors import format_validation_error, format_all_validation_errors
+from .schema import get_model_fields_state
+from .snapshot import ConfigSnapshotCache
 from ..exceptions import ConfigError
 
 logger = logging.getLogger(__name__)
 
+#: Most recently validated configuration for each configuration class together with
+#: the state of the configuration sources it was created from (see
+#: `get_config_sources_state`)
+_config_snapshots: dict[type[BaseAppConfig], tuple[tuple, BaseAppConfig]] = {}
+
 
 class ParsedConfigFile(NamedTuple):
     #: Path to the configuration file
@@ -30,19 +40,26 @@ class ParsedConfigFile(NamedTuple):
     model: BaseAppConfig | None
 
 
-def merge_app_configs(
-    app_configs: Iterable[BaseAppConfig], model_class: type[BaseAppConfig]
-) -> BaseAppConfig:
-    def reduce_func(
-        config_one: BaseAppConfig, config_two: BaseAppConfig
-    ) -> BaseAppConfig:
-        """
-        Provided two AppConfig objects, merge them into a single AppConfig object.
-        Properties from ``config_two`` will override properties on ``config_one``
-        """
-        return model_class(**{**config_one.dict(), **config_two.dict()})
+def merge_config_data(config_data: Iterable[dict]) -> dict:
+    """
+    Merges the data of several configuration files into a single dictionary. Values
+    from later files override those from earlier ones; nested dictionaries (e.g.
+    "search_backend_settings") are merged key by key.
+
+    Example:
+    >>> merge_config_data(({"a": 1, "b": {"c": 2}}, {"b": {"d": 3}}))
+    {'a': 1, 'b': {'c': 2, 'd': 3}}
+    """
+    merged: dict = {}
+
+    for data in config_data:
+        for key, value in data.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = merge_config_data((merged[key], value))
+            else:
+                merged[key] = value
 
-    return reduce(reduce_func, app_configs)
+    return merged
 
 
 def parse_config_file_as_json(
@@ -116,12 +133,104 @@ def parse_config_files(paths: Sequence[Path]) -> tuple[ParsedConfigFile, ...] |
     return tuple(parse_config_file_as_json(path) for path in existing_paths)
 
 
+def get_config_sources_state(paths: Sequence[Path]) -> tuple:
+    """
+    Returns the state of everything the configuration is read from: the modification
+    time and size of the configuration files at ``paths`` and the values of our
+    environment variables. When this state has not changed, neither has the
+    configuration.
+    """
+    files_state: list[tuple[Path, int | None, int | None]] = []
+
+    for path in paths:
+        try:
+            file_stat = path.stat()
+        except OSError:
+            files_state.append((path, None, None))
+            continue
+
+        if stat.S_ISREG(file_stat.st_mode):
+            files_state.append((path, file_stat.st_mtime_ns, file_stat.st_size))
+        else:
+            files_state.append((path, None, None))
+
+    # Environment variable names are not case sensitive for pydantic
+    env_state = sorted(
+        (name.upper(), value)
+        for name, value in os.environ.items()
+        if name.upper().startswith(ENV_PREFIX)
+    )
+
+    return tuple(files_state), tuple(env_state)
+
+
+def get_config_fingerprint(
+    state: tuple, model_class: type[BaseAppConfig], config_fields_fingerprint: str
+) -> str:
+    """
+    Returns a fingerprint of the configuration sources ``state`` (see
+    `get_config_sources_state`) and the fields of ``model_class``, which was generated
+    from plugin config fields with the fingerprint ``config_fields_fingerprint``
+    """
+    files_state, env_state = state
+    sources = [[str(path), *file_state] for path, *file_state in files_state]
+    fingerprint_state = [
+        json.dumps([sources, env_state]),
+        config_fields_fingerprint,
+        *get_model_fields_state(model_class),
+    ]
+
+    return hashlib.sha256("\n".join(fingerprint_state).encode()).hexdigest()
+
+
 def get_app_config(
+    paths: Sequence[Path],
+    model_class: type[BaseAppConfig],
+    snapshot_cache: ConfigSnapshotCache | None = None,
+    config_fields_fingerprint: str = "",
+) -> BaseAppConfig:
+    """
+    Returns the configuration parsed from the configuration files at ``paths`` and the
+    environment. The validated configuration is reused as long as neither the files nor
+    the environment variables change, so it should be treated as read only.
+
+    When ``snapshot_cache`` is given, the validated configuration is reused between
+    runs as well; ``config_fields_fingerprint`` is the fingerprint of the plugins'
+    config fields ``model_class`` was generated from.
+
+    :raises ConfigError: Happens when any errors are encountered during config parsing
+    """
+    state = get_config_sources_state(paths)
+    snapshot = _config_snapshots.get(model_class)
+
+    if snapshot is not None and snapshot[0] == state:
+        return snapshot[1]
+
+    config = None
+
+    if snapshot_cache is not None:
+        fingerprint = get_config_fingerprint(
+            state, model_class, config_fields_fingerprint
+        )
+        config = snapshot_cache.get_config(model_class, fingerprint)
+
+    if config is None:
+        config = parse_app_config(paths, model_class)
+
+        if snapshot_cache is not None:
+            snapshot_cache.set_config(fingerprint, config)
+
+    _config_snapshots[model_class] = (state, config)
+
+    return config
+
+
+def parse_app_config(
     paths: Sequence[Path], model_class: type[BaseAppConfig]
 ) -> BaseAppConfig:
     """
     Given a sequence of ``paths`` first attempts to parse these as JSON and then
-    attempts to parse valid JSON objects as ``AppConfig`` objects.
+    merges and validates them as a single ``AppConfig`` object.
 
     :raises ConfigError: Happens when any errors are encountered during config parsing
     """
@@ -131,26 +240,64 @@ def get_app_config(
     if parsed_config_files is None:
         return model_class()
 
-    parsed_config_files = tuple(
-        parse_app_config_model(parsed, model_class) for parsed in parsed_config_files
-    )
-
-    # Gather errors
+    # Fail loudly if any files could not be parsed
     errors = tuple(parsed.error for parsed in parsed_config_files if parsed.error)
 
-    # Fail loudly if any errors
     if len(errors) > 0:
         raise ConfigError(format_all_validation_errors(errors))
 
-    # Gather configs
-    app_configs = tuple(parsed.model for parsed in parsed_config_files if parsed.model)
+    config_data = merge_config_data(
+        parsed.data for parsed in parsed_config_files if parsed.data
+    )
 
-    # If there are no app_configs and no errors, provide a default
-    if not app_configs:
-        return model_class()
+    try:
+        return model_class(**config_data)
+    except ValidationError as exc:
+        # Validate each file on its own so the errors point to the files causing them
+        parsed_config_files = tuple(
+            parse_app_config_model(parsed, model_class)
+            for parsed in parsed_config_files
+        )
+        errors = tuple(parsed.error for parsed in parsed_config_files if parsed.error)
+
+        # The files are only invalid when combined
+        if len(errors) == 0:
+            paths_str = ", ".join(str(parsed.path) for parsed in parsed_config_files)
+            errors = (format_validation_error(exc, paths_str),)
+
+        raise ConfigError(format_all_validation_errors(errors))
+
+
+def get_search_backend_names(paths: Sequence[Path]) -> tuple[str, ...] | None:
+    """
+    Returns the names of all search backends that may end up in the "search_backends"
+    setting without fully parsing the configuration (which requires all plugins to be
+    imported). This includes the default value, the environment variable and the value
+    in each of the configuration files found at ``paths``.
+
+    Returns ``None`` when this cannot be determined.
+    """
+    names = list(BaseAppConfig.__fields__["search_backends"].default)
+    env_name = f"{ENV_PREFIX}search_backends".lower()
+    env_values = tuple(
+        value for name, value in os.environ.items() if name.lower() == env_name
+    )
+
+    try:
+        values = [json.loads(value) for value in env_values]
+    except ValueError:
+        return None
+
+    for parsed_config in parse_config_files(paths) or ():
+        if parsed_config.data is not None:
+            values.append(parsed_config.data.get("search_backends", []))
+
+    for value in values:
+        if not isinstance(value, list):
+            return None
+        names.extend(str(name) for name in value)
 
-    # Merge all successfully parsed app_configs
-    return merge_app_configs(app_configs, model_class)
+    return tuple(dict.fromkeys(names))
 
 
 def write_config_file(config_file_data: dict[str, Any], config_file: Path) -> None:
@@ -1,8 +1,75 @@
-from pydantic import BaseSettings, Field
+from pydantic import BaseModel, BaseSettings, Field
 
 from ..constants import ENV_PREFIX
 
 
+class BaseSearchBackendSettings(BaseModel):
+    """
+    Settings that latz adds to every registered search backend. These live alongside
+    the plugin's own settings under ``search_backend_settings.<backend>``.
+    """
+
+    cache_ttl: int | None = Field(
+        default=None,
+        description=(
+            "Seconds to keep cached search results for this backend. "
+            "Overrides the global 'cache_ttl' setting when set."
+        ),
+    )
+
+    concurrency: int | None = Field(
+        default=None,
+        ge=1,
+        description=(
+            "Number of searches sent to this backend at the same time to start with. "
+            "Defaults to the global 'max_concurrency' setting."
+        ),
+    )
+
+    max_concurrency: int | None = Field(
+        default=None,
+        ge=1,
+        description=(
+            "Highest number of concurrent searches this backend is ramped up to while "
+            "it stays healthy. Defaults to the 'http_max_connections' setting."
+        ),
+    )
+
+    adaptive_concurrency: bool = Field(
+        default=True,
+        description=(
+            "Lower the number of concurrent searches when this backend is overloaded "
+            "(429/5xx responses or rising latency) and raise it again while it is healthy."
+        ),
+    )
+
+    retries: int = Field(
+        default=2,
+        ge=0,
+        description=(
+            "Number of times a search request is retried after connection errors, "
+            "timeouts or 429/5xx responses."
+        ),
+    )
+
+    retry_backoff: float = Field(
+        default=0.5,
+        ge=0,
+        description=(
+            "Seconds to wait before the first retry; doubled for every further retry "
+            "and randomized so clients do not retry at the same time."
+        ),
+    )
+
+    hedge_requests: bool = Field(
+        default=False,
+        description=(
+            "Send a second request when the first one is slower than 95% of this "
+            "backend's recent requests and use whichever answers first."
+        ),
+    )
+
+
 class BaseAppConfig(BaseSettings):
     """
     Holds all settings for the latz application. These are parsed from
@@ -14,5 +81,59 @@ class BaseAppConfig(BaseSettings):
         description="Image search backend to use for retrieving images.",
     )
 
+    cache: bool = Field(
+        default=True,
+        description="Whether search results should be cached on disk.",
+    )
+
+    cache_ttl: int = Field(
+        default=3600,
+        description="Default number of seconds to keep cached search results for.",
+    )
+
+    max_concurrency: int = Field(
+        default=10,
+        description="Maximum number of search requests that run at the same time.",
+    )
+
+    search_deadline: float | None = Field(
+        default=None,
+        gt=0,
+        description=(
+            "Seconds the search command waits for search backends; the results that "
+            "have arrived by then are shown and the others are reported as missing."
+        ),
+    )
+
+    http2: bool = Field(
+        default=False,
+        description="Use HTTP/2 when available (requires the 'h2' package).",
+    )
+
+    http_max_connections: int = Field(
+        default=100,
+        description="Maximum number of connections in the shared connection pool.",
+    )
+
+    http_max_keepalive_connections: int = Field(
+        default=20,
+        description="Maximum number of idle connections kept alive in the pool.",
+    )
+
+    http_keepalive_expiry: float = Field(
+        default=5.0,
+        description="Seconds an idle connection is kept alive before it is closed.",
+    )
+
+    http_connect_timeout: float = Field(
+        default=5.0,
+        description="Seconds to wait for a connection to be established.",
+    )
+
+    http_read_timeout: float = Field(
+        default=5.0,
+        description="Seconds to wait for data to be received (or sent).",
+    )
+
     class Config:
         env_prefix = ENV_PREFIX
@@ -0,0 +1,69 @@
+"""
+Module which holds the on disk cache for the JSON schema of the configuration. The
+configuration model is generated from the installed plugins at runtime, so building its
+schema is slow; the cached schema is reused as long as the plugins' config fields stay
+the same.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from ..filecache import JSONFileCache
+
+
+def get_model_fields_state(model: type[BaseModel]) -> list[str]:
+    """
+    Returns a description of the fields of ``model`` (names, types, defaults and
+    everything else that ends up in its schema such as descriptions)
+    """
+    return [
+        f"{name}:{field!r}:{field.field_info!r}"
+        for name, field in model.__fields__.items()
+    ]
+
+
+class ConfigSchemaCache:
+    """
+    On disk cache for the JSON schema of a configuration model (see `JSONFileCache`).
+    The schema is generated again whenever the cache is missing or stale.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def read(self, fingerprint: str) -> dict | None:
+        """
+        Returns the cached schema or ``None`` if the cache is missing or stale
+        """
+        schema = JSONFileCache(self.path, fingerprint).read()
+
+        return schema if isinstance(schema, dict) else None
+
+    def write(self, fingerprint: str, schema: dict) -> None:
+        """
+        Writes ``schema`` to the cache
+        """
+        JSONFileCache(self.path, fingerprint).write(schema)
+
+    def get_schema(
+        self, config_class: type[BaseModel], config_fields_fingerprint: str
+    ) -> dict:
+        """
+        Returns the schema of ``config_class``, generating (and caching) it if necessary.
+        ``config_fields_fingerprint`` is the fingerprint of the plugins' config fields
+        ``config_class`` was generated from.
+        """
+        state = [config_fields_fingerprint, *get_model_fields_state(config_class)]
+        fingerprint = hashlib.sha256("\n".join(state).encode()).hexdigest()
+        schema = self.read(fingerprint)
+
+        if schema is None:
+            # Round trip through JSON so we return the same thing as when reading it
+            schema = json.loads(config_class.schema_json())
+            self.write(fingerprint, schema)
+
+        return schema
@@ -0,0 +1,131 @@
+"""
+Module which holds the on disk cache for the validated configuration. Validating the
+configuration model generated from the installed plugins is slow, so the validated
+values are reused between runs as long as the configuration sources and the plugins'
+config fields stay the same.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, TypeVar
+
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON, SHAPE_TUPLE, SHAPE_TUPLE_ELLIPSIS
+from pydantic.utils import lenient_issubclass
+
+from ..filecache import JSONFileCache
+
+ModelType = TypeVar("ModelType", bound=BaseModel)
+
+#: Types of the values which survive a round trip through JSON unchanged
+JSON_TYPES = (str, int, float, bool, type(None))
+
+
+def construct_model(model_class: type[ModelType], data: dict) -> ModelType:
+    """
+    Rebuilds a model from the output of its ``dict`` method (after a round trip
+    through JSON) without validating it again. Nested models and tuples are restored
+    as well.
+    """
+    values = {}
+
+    for name, value in data.items():
+        field = model_class.__fields__.get(name)
+
+        if field is None:
+            continue
+
+        if (
+            field.shape == SHAPE_SINGLETON
+            and lenient_issubclass(field.type_, BaseModel)
+            and isinstance(value, dict)
+        ):
+            value = construct_model(field.type_, value)
+        elif field.shape in (SHAPE_TUPLE, SHAPE_TUPLE_ELLIPSIS) and isinstance(
+            value, list
+        ):
+            value = tuple(value)
+
+        values[name] = value
+
+    return model_class.construct(**values)
+
+
+def has_json_values(value: Any) -> bool:
+    """
+    Returns whether ``value`` only consists of plain JSON values (e.g. no ``SecretStr``,
+    ``Path`` or enum members, which would not be restored by `construct_model`)
+
+    Example:
+    >>> has_json_values({"a": [1, "b", None]}), has_json_values({"a": Path(".")})
+    (True, False)
+    """
+    if isinstance(value, dict):
+        return all(
+            type(key) is str and has_json_values(item) for key, item in value.items()
+        )
+
+    if isinstance(value, (list, tuple)):
+        return all(has_json_values(item) for item in value)
+
+    return type(value) in JSON_TYPES
+
+
+class ConfigSnapshotCache:
+    """
+    On disk cache for a validated configuration (see `JSONFileCache`). The
+    configuration is validated again whenever the cache is missing or stale.
+
+    The configuration may contain credentials, so the cache file is only readable by
+    the current user.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def read(self, fingerprint: str) -> dict | None:
+        """
+        Returns the cached configuration values or ``None`` if the cache is missing or
+        stale
+        """
+        config = JSONFileCache(self.path, fingerprint).read()
+
+        return config if isinstance(config, dict) else None
+
+    def write(self, fingerprint: str, config: dict) -> None:
+        """
+        Writes the configuration values ``config`` to the cache
+        """
+        JSONFileCache(self.path, fingerprint, mode=0o600).write(config)
+
+    def get_config(
+        self, model_class: type[ModelType], fingerprint: str
+    ) -> ModelType | None:
+        """
+        Returns the cached configuration as a ``model_class`` object or ``None`` if
+        the cache is missing or stale
+        """
+        config = self.read(fingerprint)
+
+        if config is None:
+            return None
+
+        return construct_model(model_class, config)
+
+    def set_config(self, fingerprint: str, config: BaseModel) -> None:
+        """
+        Caches ``config`` unless it holds values that `construct_model` cannot restore
+        """
+        values = config.dict()
+
+        if not has_json_values(values):
+            return
+
+        # Round trip through JSON so we compare with what we would read later on
+        values = json.loads(json.dumps(values))
+
+        if construct_model(type(config), values) != config:
+            return
+
+        self.write(fingerprint, values)
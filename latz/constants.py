@@ -16,3 +16,36 @@ CONFIG_FILE_HOME_DIR = Path(os.path.expanduser("~")) / CONFIG_FILE_NAME
 CONFIG_FILES = (
     CONFIG_FILE_HOME_DIR,
 )
+
+#: Directory where latz keeps cached data (follows the XDG base directory spec)
+CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path(os.path.expanduser("~")) / ".cache")
+    / APP_NAME
+)
+
+#: SQLite database used to cache search results between runs
+SEARCH_CACHE_FILE = CACHE_DIR / "search.sqlite"
+
+#: File used to cache the plugins discovered in the current environment
+PLUGIN_CACHE_FILE = CACHE_DIR / "plugins.json"
+
+#: File used to cache the JSON schema of the configuration between runs
+CONFIG_SCHEMA_CACHE_FILE = CACHE_DIR / "config-schema.json"
+
+#: File used to cache the validated configuration between runs
+CONFIG_SNAPSHOT_CACHE_FILE = CACHE_DIR / "config-snapshot.json"
+
+#: Environment variable which turns on printing the timings of each stage of a command
+PROFILE_ENV_VAR = f"{ENV_PREFIX}PROFILE"
+
+#: Environment variable holding the file the timings of each stage are written to
+PROFILE_FILE_ENV_VAR = f"{ENV_PREFIX}PROFILE_FILE"
+
+#: Unix domain socket "latz serve --daemon" listens on and "latz search" forwards to
+DAEMON_SOCKET_FILE = CACHE_DIR / "daemon.sock"
+
+#: Environment variable holding the socket of the daemon (overrides `DAEMON_SOCKET_FILE`)
+DAEMON_SOCKET_ENV_VAR = f"{ENV_PREFIX}DAEMON_SOCKET"
+
+#: Environment variable which turns off forwarding searches to the daemon
+NO_DAEMON_ENV_VAR = f"{ENV_PREFIX}NO_DAEMON"
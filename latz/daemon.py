@@ -0,0 +1,188 @@
+"""
+Module which holds the client side of the latz daemon. ``latz serve --daemon`` keeps the
+plugins, configuration and connections warm behind a Unix domain socket; ``latz search``
+sends its searches there when the daemon is running, so it does not have to import the
+plugins or build the configuration itself.
+
+This module is imported on every search, so it only uses the standard library.
+"""
+from __future__ import annotations
+
+import json
+import os
+import socket
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from .constants import (
+    DAEMON_SOCKET_ENV_VAR,
+    DAEMON_SOCKET_FILE,
+    ENV_PREFIX,
+    NO_DAEMON_ENV_VAR,
+    PROFILE_ENV_VAR,
+    PROFILE_FILE_ENV_VAR,
+)
+
+#: Environment variables which only affect the command line and not the configuration
+CLIENT_ENV_VARS = frozenset(
+    {DAEMON_SOCKET_ENV_VAR, NO_DAEMON_ENV_VAR, PROFILE_ENV_VAR, PROFILE_FILE_ENV_VAR}
+)
+
+#: Seconds to wait for the daemon to accept the connection
+CONNECT_TIMEOUT = 1.0
+
+#: Status the daemon answers with when its configuration differs from ours
+CONFLICT_STATUS = 409
+
+
+class DaemonUnavailable(Exception):
+    """
+    Raised when no daemon is listening or it cannot handle the request (e.g. because
+    it was started with a different configuration); the command then runs in-process.
+    """
+
+
+class DaemonOutdated(DaemonUnavailable):
+    """
+    Raised when the daemon was started with a different configuration than ours
+    """
+
+
+class DaemonError(Exception):
+    """
+    Raised when the daemon failed to handle the request
+    """
+
+
+class DaemonResponse(NamedTuple):
+    """
+    Status and JSON data of a response sent by the daemon
+    """
+
+    status: int
+    data: Any
+
+
+def get_socket_path() -> Path:
+    """
+    Returns the socket the daemon listens on
+    """
+    return Path(os.environ.get(DAEMON_SOCKET_ENV_VAR) or DAEMON_SOCKET_FILE)
+
+
+def get_config_environment() -> dict[str, str]:
+    """
+    Returns our environment variables which may change the configuration. Requests
+    carry them so the daemon can tell whether it was started with the same ones.
+    """
+    return {
+        name.upper(): value
+        for name, value in os.environ.items()
+        if name.upper().startswith(ENV_PREFIX) and name.upper() not in CLIENT_ENV_VARS
+    }
+
+
+def read_response(sock: socket.socket) -> DaemonResponse:
+    """
+    Reads the (``Connection: close``) HTTP response sent over ``sock``
+
+    :raises DaemonError: Raised when the response is malformed
+    """
+    chunks = []
+    while chunk := sock.recv(65536):
+        chunks.append(chunk)
+
+    head, _, body = b"".join(chunks).partition(b"\r\n\r\n")
+
+    try:
+        status = int(head.split(b" ", 2)[1])
+        data = json.loads(body)
+    except (IndexError, ValueError):
+        raise DaemonError("The daemon sent an invalid response")
+
+    return DaemonResponse(status, data)
+
+
+def send_request(
+    path: str, data: dict, socket_path: Path | None = None
+) -> DaemonResponse:
+    """
+    POSTs ``data`` as JSON to ``path`` of the daemon listening on ``socket_path``
+
+    :raises DaemonUnavailable: Raised when no daemon is listening on ``socket_path``
+    :raises DaemonError: Raised when the connection to the daemon broke
+    """
+    socket_path = socket_path or get_socket_path()
+
+    if not hasattr(socket, "AF_UNIX"):
+        raise DaemonUnavailable("Unix domain sockets are not supported")
+
+    body = json.dumps(data).encode()
+    head = (
+        f"POST {path} HTTP/1.1\r\n"
+        "Host: latz\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n"
+        "\r\n"
+    )
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            raise DaemonUnavailable(f"No daemon is listening on {socket_path}")
+
+        # Searches may take as long as the search backends do
+        sock.settimeout(None)
+        try:
+            sock.sendall(head.encode("latin-1") + body)
+            return read_response(sock)
+        except OSError as exc:
+            raise DaemonError(f"Lost the connection to the daemon: {exc}")
+
+
+def search(
+    queries: Sequence[str],
+    limit: int | None = None,
+    offset: int = 0,
+    filters: dict[str, str] | None = None,
+    concurrency: int | None = None,
+    cache: bool = True,
+    refresh: bool = False,
+    deadline: float | None = None,
+    socket_path: Path | None = None,
+) -> dict:
+    """
+    Runs the search on the daemon and returns its response (see `latz.server`)
+
+    :raises DaemonUnavailable: Raised when the search has to run in-process instead
+    :raises DaemonOutdated: Raised when the daemon needs to be restarted to pick up
+                            configuration changes
+    :raises DaemonError: Raised when the daemon failed to run the search
+    """
+    response = send_request(
+        "/search",
+        {
+            "queries": list(queries),
+            "limit": limit,
+            "offset": offset,
+            "filters": filters or {},
+            "concurrency": concurrency,
+            "cache": cache,
+            "refresh": refresh,
+            "deadline": deadline,
+            "environment": get_config_environment(),
+        },
+        socket_path,
+    )
+    message = response.data.get("error") if isinstance(response.data, dict) else None
+
+    if response.status == CONFLICT_STATUS:
+        raise DaemonOutdated(message)
+    if response.status != 200:
+        raise DaemonError(message or f"The daemon answered with {response.status}")
+
+    return response.data
@@ -0,0 +1,324 @@
+"""
+Module which holds everything related to downloading images returned by search backends.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+from collections.abc import AsyncIterator, Iterable, Sequence
+from contextlib import AsyncExitStack
+from functools import partial
+from pathlib import Path
+from typing import NamedTuple, TextIO, cast
+
+import httpx
+from rich.console import Console
+
+from . import fetch, profiling
+from .cache import SearchResultCache
+from .events import EventDispatcher
+from .image import ImageSearchResult, deduplicate_results
+from .plugins import SearchBackendHook
+from .resize import ImageSize, ResizePool
+from .search import get_search_jobs, get_search_results
+
+logger = logging.getLogger(__name__)
+
+#: Size of the chunks image bodies are written to disk in
+CHUNK_SIZE = 64 * 1024
+
+#: Suffix for files that are still being downloaded
+PARTIAL_SUFFIX = ".part"
+
+#: Extension used when the content type of an image is unknown
+DEFAULT_EXTENSION = ".jpg"
+
+#: Name used to request the client for downloading images from the `ClientManager`
+DOWNLOAD_CLIENT_NAME = "download"
+
+
+class DownloadResult(NamedTuple):
+    """
+    Outcome of downloading a single image
+    """
+
+    #: Search result that was downloaded
+    result: ImageSearchResult
+
+    #: Where the image was saved to; ``None`` when the download failed
+    path: Path | None
+
+    #: Error encountered while downloading
+    error: str | None
+
+
+class ResizeResult(NamedTuple):
+    """
+    Outcome of resizing a single downloaded image
+    """
+
+    #: Downloaded image that was resized
+    path: Path
+
+    #: Paths of the resized images; empty when resizing failed
+    resized_paths: tuple[Path, ...]
+
+    #: Error encountered while resizing
+    error: str | None
+
+
+def get_file_stem(result: ImageSearchResult) -> str:
+    """
+    Returns the file name (without extension) for a search result. It is derived from
+    the URL so that repeated downloads of the same image end up in the same file.
+    Results may come from saved files, so path separators in the backend name are not
+    trusted.
+
+    Example:
+    >>> get_file_stem(ImageSearchResult("https://example.com/1", 1, 1, "test"))
+    'test-f2f9784142e4d11e'
+    >>> get_file_stem(ImageSearchResult("https://example.com/1", 1, 1, "../../tmp/x"))
+    'x-f2f9784142e4d11e'
+    """
+    url_hash = hashlib.sha256((result.url or "").encode()).hexdigest()[:16]
+    backend_name = Path(result.search_backend or "").name or "image"
+
+    return f"{backend_name}-{url_hash}"
+
+
+def get_extension(response: httpx.Response) -> str:
+    """
+    Returns the file extension matching the content type of ``response``
+    """
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+    extension = mimetypes.guess_extension(content_type) if content_type else None
+
+    return extension or DEFAULT_EXTENSION
+
+
+def find_existing_download(directory: Path, stem: str) -> Path | None:
+    """
+    Returns the path of a finished download for ``stem`` if there is one
+    """
+    for path in directory.glob(f"{stem}.*"):
+        if path.suffix != PARTIAL_SUFFIX:
+            return path
+
+
+def load_results(results_file: TextIO) -> tuple[ImageSearchResult, ...]:
+    """
+    Loads saved search results. These can either be a JSON array or newline delimited
+    JSON objects; each object needs at least a "url" key.
+    """
+    content = results_file.read()
+
+    try:
+        records = json.loads(content)
+    except json.JSONDecodeError:
+        records = [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    if isinstance(records, dict):
+        records = [records]
+
+    return parse_results(records)
+
+
+def parse_results(records: Iterable) -> tuple[ImageSearchResult, ...]:
+    """
+    Creates search results from JSON objects; objects without a "url" are skipped
+    """
+    return tuple(
+        ImageSearchResult(
+            url=record.get("url"),
+            width=record.get("width"),
+            height=record.get("height"),
+            search_backend=record.get("search_backend"),
+            query=record.get("query"),
+            id=record.get("id"),
+        )
+        for record in records
+        if isinstance(record, dict) and record.get("url")
+    )
+
+
+async def download_image(
+    client: httpx.AsyncClient,
+    result: ImageSearchResult,
+    directory: Path,
+    chunk_size: int = CHUNK_SIZE,
+) -> DownloadResult:
+    """
+    Downloads the image for ``result`` into ``directory``.
+
+    The body is streamed to a temporary ".part" file in chunks which is renamed once
+    the download is complete, so a finished file is never partially written. When a
+    ".part" file is left behind by an earlier attempt, only the missing bytes are
+    requested (provided the server supports range requests).
+    """
+    if result.url is None:
+        return DownloadResult(result=result, path=None, error="Result has no URL")
+
+    stem = get_file_stem(result)
+    existing = find_existing_download(directory, stem)
+
+    if existing is not None:
+        return DownloadResult(result=result, path=existing, error=None)
+
+    partial_path = directory / f"{stem}{PARTIAL_SUFFIX}"
+    offset = partial_path.stat().st_size if partial_path.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    try:
+        async with client.stream(
+            "GET", result.url, headers=headers, follow_redirects=True
+        ) as response:
+            # Our partial file is no longer usable; start over
+            if response.status_code == httpx.codes.REQUESTED_RANGE_NOT_SATISFIABLE:
+                partial_path.unlink()
+                return await download_image(client, result, directory, chunk_size)
+
+            response.raise_for_status()
+
+            # Servers which do not support range requests send the whole body
+            mode = "ab" if response.status_code == httpx.codes.PARTIAL_CONTENT else "wb"
+
+            with partial_path.open(mode) as fp:
+                async for chunk in response.aiter_bytes(chunk_size):
+                    fp.write(chunk)
+
+            path = directory / f"{stem}{get_extension(response)}"
+            os.replace(partial_path, path)
+
+    except (httpx.HTTPError, OSError) as exc:
+        logger.debug(exc)
+        return DownloadResult(result=result, path=None, error=str(exc))
+
+    return DownloadResult(result=result, path=path, error=None)
+
+
+async def download_images(
+    client: httpx.AsyncClient,
+    results: Iterable[ImageSearchResult],
+    directory: Path,
+    concurrency: int = 10,
+) -> AsyncIterator[DownloadResult]:
+    """
+    Downloads the images for all ``results`` with at most ``concurrency`` downloads
+    running at the same time. Yields each `DownloadResult` as soon as it is done.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+
+    download_callables = (
+        partial(download_image, client, result, directory)
+        for result in results
+        if result.url
+    )
+
+    async for _, download_result in fetch.iter_results(
+        download_callables, limit=concurrency
+    ):
+        yield download_result
+
+
+async def resize_download(pool: ResizePool, path: Path) -> ResizeResult:
+    """
+    Resizes the downloaded image at ``path`` using ``pool``. Any error (e.g. an image
+    too large to be decoded safely or a worker process that died) is returned instead
+    of raised, so it only affects this image.
+    """
+    try:
+        resized_paths = await pool.resize(path)
+    except Exception as exc:
+        logger.debug(exc)
+        return ResizeResult(path=path, resized_paths=(), error=str(exc) or repr(exc))
+
+    return ResizeResult(path=path, resized_paths=resized_paths, error=None)
+
+
+async def main(
+    config,
+    backends: Sequence[SearchBackendHook],
+    query: str | None,
+    results: Sequence[ImageSearchResult] | None,
+    directory: Path,
+    limit: int | None = None,
+    cache: SearchResultCache | None = None,
+    concurrency: int | None = None,
+    sizes: Sequence[ImageSize] = (),
+    events: EventDispatcher | None = None,
+) -> int:
+    """
+    Main async coroutine that searches for ``query`` (unless ``results`` are provided)
+    and downloads all images found into ``directory``. Returns the number of failed
+    downloads.
+
+    When ``sizes`` are given, each image is handed to a pool of worker processes to be
+    resized as soon as it has been downloaded, so resizing overlaps with the downloads
+    that are still running.
+
+    Searches, requests and cache lookups are reported to ``events``.
+    """
+    console = Console()
+    error_console = Console(stderr=True)
+    concurrency = concurrency or config.max_concurrency
+    resize_tasks = []
+    failed = 0
+
+    async with AsyncExitStack() as stack:
+        clients = await stack.enter_async_context(
+            fetch.ClientManager(config, events=events)
+        )
+        pool = await stack.enter_async_context(ResizePool(sizes)) if sizes else None
+
+        if results is None:
+            with profiling.span("search"):
+                results = await get_search_results(
+                    clients,
+                    config,
+                    get_search_jobs(backends, (cast(str, query),)),
+                    limit=limit,
+                    cache=cache,
+                    concurrency=concurrency,
+                )
+
+        # Search results are already free of duplicates but saved results might not be
+        with profiling.span("download"):
+            async for download_result in download_images(
+                clients.get_client(DOWNLOAD_CLIENT_NAME),
+                deduplicate_results(results),
+                directory,
+                concurrency=concurrency,
+            ):
+                if download_result.error is None:
+                    console.print(f"[green]Saved[/green] {download_result.path}")
+                    if pool is not None and download_result.path is not None:
+                        resize_tasks.append(
+                            asyncio.ensure_future(
+                                resize_download(pool, download_result.path)
+                            )
+                        )
+                else:
+                    failed += 1
+                    error_console.print(
+                        f"[red]Failed[/red] {download_result.result.url}: "
+                        f"{download_result.error}"
+                    )
+
+        # Only the resizing that did not overlap with the downloads is timed here
+        with profiling.span("resize"):
+            for resize_task in asyncio.as_completed(resize_tasks):
+                resize_result = await resize_task
+                for resized_path in resize_result.resized_paths:
+                    console.print(f"[green]Resized[/green] {resized_path}")
+                if resize_result.error is not None:
+                    failed += 1
+                    error_console.print(
+                        f"[red]Failed[/red] to resize {resize_result.path}: "
+                        f"{resize_result.error}"
+                    )
+
+    return failed
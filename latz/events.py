@@ -0,0 +1,147 @@
+"""
+Module which holds the dispatcher for the observability hooks (e.g. ``search_finished``)
+that plugins implement to export metrics. Hooks are called from a background thread, so
+slow plugins do not hold up searches.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from functools import wraps
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+#: Names of the hooks which are called with events (see `AppHookSpecs`)
+EVENT_HOOKS = frozenset(
+    {"search_started", "search_finished", "request_completed", "cache_lookup"}
+)
+
+#: Maximum number of events waiting to be handed to plugins; further events are dropped
+EVENT_QUEUE_SIZE = 10_000
+
+#: Seconds `EventDispatcher.close` waits for plugins to handle the remaining events
+CLOSE_TIMEOUT = 5.0
+
+#: Tells the background thread to stop
+_STOP = object()
+
+
+class EventDispatcher:
+    """
+    Hands events to the plugins implementing the corresponding hooks of ``hook`` (the
+    ``hook`` attribute of the plugin manager). Events are put on a bounded queue and
+    the hooks are called from a background thread; events are only queued for hooks
+    that at least one plugin implements.
+
+    Should be closed once all events have been emitted, so the remaining ones are
+    handed to the plugins before latz exits.
+    """
+
+    def __init__(self, hook: Any = None, queue_size: int = EVENT_QUEUE_SIZE):
+        self.hook = hook
+        #: Hooks implemented by at least one plugin
+        self.active = frozenset(
+            name
+            for name in EVENT_HOOKS
+            if hook is not None and getattr(hook, name).get_hookimpls()
+        )
+        #: Number of events dropped because the queue was full
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+
+    def emit(self, name: str, **kwargs: Any) -> None:
+        """
+        Queues a call of the hook ``name`` with ``kwargs``; never blocks
+        """
+        if name not in self.active:
+            return
+
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="latz-events", daemon=True
+            )
+            self._thread.start()
+
+        try:
+            self._queue.put_nowait((name, kwargs))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            event = self._queue.get()
+            if event is _STOP:
+                return
+
+            name, kwargs = event
+            try:
+                getattr(self.hook, name)(**kwargs)
+            except Exception:
+                # A broken metrics plugin should not break searching
+                logger.exception(f"Error while calling the '{name}' hook")
+
+    def observe_search(
+        self, backend: str, query: str, search: Callable[..., Awaitable[T]]
+    ) -> Callable[..., Awaitable[T]]:
+        """
+        Returns a version of the coroutine function ``search`` which emits the
+        ``search_started`` and ``search_finished`` events; when no plugin implements
+        them, ``search`` is returned as is.
+        """
+        if self.active.isdisjoint({"search_started", "search_finished"}):
+            return search
+
+        @wraps(search)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            self.emit("search_started", backend=backend, query=query)
+            started = time.monotonic()
+            try:
+                results = await search(*args, **kwargs)
+            except BaseException as exc:
+                self.emit(
+                    "search_finished",
+                    backend=backend,
+                    query=query,
+                    duration=time.monotonic() - started,
+                    results=None,
+                    error=str(exc) or type(exc).__name__,
+                )
+                raise
+
+            self.emit(
+                "search_finished",
+                backend=backend,
+                query=query,
+                duration=time.monotonic() - started,
+                results=len(results) if results is not None else None,  # type: ignore
+                error=None,
+            )
+
+            return results
+
+        return wrapper
+
+    def close(self, timeout: float = CLOSE_TIMEOUT) -> None:
+        """
+        Waits (at most ``timeout`` seconds) until the queued events have been handed to
+        the plugins
+        """
+        if self._thread is None:
+            return
+
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+        if self.dropped:
+            logger.warning(f"Dropped {self.dropped} events; plugins were too slow")
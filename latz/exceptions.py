@@ -18,6 +18,7 @@ class SearchBackendError(LatzError):
     """
 
     def __init__(self, message, original: Exception | None = None):
+        super().__init__(message)
         self.message = message
         self.original = original
 
@@ -1,29 +1,660 @@
 """
 Module which holds everything related to making networking requests for this application.
 """
+from __future__ import annotations
+
 import asyncio
+import importlib.util
+import json
 import logging
-from collections.abc import Iterable, Callable
+import math
+import random
+import statistics
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterable, Callable
+from contextlib import nullcontext
+from typing import Any, NamedTuple
 
 import httpx
 
+from .config import BaseAppConfig
+from .events import EventDispatcher
+from .exceptions import LatzError
+
 logger = logging.getLogger(__name__)
 
+#: Factor the concurrency limit of a backend is multiplied with when it is overloaded
+CONCURRENCY_DECREASE_FACTOR = 0.5
+
+#: A backend counts as overloaded when its (smoothed) latency rises above this multiple
+#: of the lowest latency seen for it
+LATENCY_TOLERANCE = 2.0
+
+#: Weight of the newest response when smoothing latencies
+LATENCY_SMOOTHING = 0.2
+
+#: Characters JSON allows between tokens
+JSON_WHITESPACE = " \t\n\r"
+
+#: Characters which may follow a value inside a JSON document
+JSON_DELIMITERS = frozenset(",:]}" + JSON_WHITESPACE)
+
+#: Request methods that are safe to send more than once (i.e. retry or hedge)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+#: Status codes of responses that are worth retrying
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+#: Number of recent latencies kept per backend to decide when to hedge a request
+LATENCY_SAMPLES = 100
+
+#: Minimum number of latencies needed before requests are hedged
+MIN_HEDGE_SAMPLES = 20
+
+#: Percentile of the recent latencies after which a hedged request is sent
+HEDGE_PERCENTILE = 95
+
+
+def get_transport(config: BaseAppConfig | None = None) -> httpx.AsyncHTTPTransport:
+    """
+    Returns the transport (connection pool) configured with the HTTP settings
+    in ``config``. HTTP/2 is only enabled when the optional "h2" package is installed.
+    """
+    config = config or BaseAppConfig()
+    http2 = config.http2
+
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning(
+            "HTTP/2 is enabled but the 'h2' package is not installed; using HTTP/1.1"
+        )
+        http2 = False
+
+    return httpx.AsyncHTTPTransport(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=config.http_max_connections,
+            max_keepalive_connections=config.http_max_keepalive_connections,
+            keepalive_expiry=config.http_keepalive_expiry,
+        ),
+    )
+
+
+def get_timeout(config: BaseAppConfig | None = None) -> httpx.Timeout:
+    """
+    Returns the timeout settings in ``config``
+    """
+    config = config or BaseAppConfig()
+
+    return httpx.Timeout(config.http_read_timeout, connect=config.http_connect_timeout)
+
+
+def get_async_client(config: BaseAppConfig | None = None) -> httpx.AsyncClient:
+    """
+    Returns a httpx.Client object to use for making network requests. It uses the
+    connection pool and timeout settings in ``config``.
+
+    Use `ClientManager` instead when clients for several search backends are needed.
+    """
+    return httpx.AsyncClient(transport=get_transport(config), timeout=get_timeout(config))
+
+
+class ConcurrencyLimiter:
+    """
+    Limits how many requests are sent to a single backend at the same time and adapts
+    this limit to how well the backend copes (additive increase, multiplicative
+    decrease):
+
+    * The limit is halved when the backend is overloaded, i.e. it responds with 429 or
+      5xx status codes, connections fail or its latency rises well above the lowest
+      latency seen so far. It is lowered at most once per round of requests.
+    * While the backend stays healthy, the limit is raised by one for every ``limit``
+      successful responses until ``max_limit`` is reached.
+
+    Should be used as an async context manager around each request (`SharedTransport`
+    does this for every request it sends, including retries and hedged requests):
+
+        async with limiter:
+            response = await send(...)
+    """
+
+    def __init__(self, limit: int, max_limit: int | None = None, adaptive: bool = True):
+        #: Current limit; fractional so it can grow by less than one per response
+        self.limit = float(limit)
+        self.max_limit = max(limit, max_limit or limit)
+        self.adaptive = adaptive
+
+        #: Number of requests currently running
+        self.active = 0
+
+        #: Smoothed latency and lowest smoothed latency seen (in seconds)
+        self.latency: float | None = None
+        self.baseline_latency: float | None = None
+
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease = -math.inf
+
+    async def acquire(self) -> None:
+        """Waits until another request may be sent"""
+        while self.active >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Pass on a wake up we can no longer use
+                if waiter.done() and not waiter.cancelled():
+                    self._wake_waiters()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+        self.active += 1
+
+    def release(self) -> None:
+        """Marks a request as done"""
+        self.active -= 1
+        self._wake_waiters()
+
+    def has_free_slot(self) -> bool:
+        """Returns whether another request may be sent right away"""
+        return self.active < int(self.limit) and not self._waiters
+
+    def _wake_waiters(self) -> None:
+        available = int(self.limit) - self.active
+
+        while available > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                available -= 1
+
+    def record(self, started: float, elapsed: float, overloaded: bool = False) -> None:
+        """
+        Adapts the limit to the outcome of a request that was sent at ``started`` (as
+        returned by `time.monotonic`) and took ``elapsed`` seconds.
+        """
+        if not self.adaptive:
+            return
+
+        if not overloaded:
+            if self.latency is None:
+                self.latency = elapsed
+            else:
+                self.latency += LATENCY_SMOOTHING * (elapsed - self.latency)
+
+            if self.baseline_latency is None or self.latency < self.baseline_latency:
+                self.baseline_latency = self.latency
+
+            overloaded = self.latency > LATENCY_TOLERANCE * self.baseline_latency
+
+        if not overloaded:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._wake_waiters()
+
+        # Requests sent before the last decrease do not reflect the lowered limit yet
+        elif started >= self._last_decrease:
+            self.limit = max(1.0, self.limit * CONCURRENCY_DECREASE_FACTOR)
+            self._last_decrease = time.monotonic()
+
+            # The backend might just be slower now; move towards its current latency
+            # so we do not keep lowering the limit because of it
+            if self.latency is not None and self.baseline_latency is not None:
+                self.baseline_latency = (self.baseline_latency + self.latency) / 2
+
+    async def __aenter__(self) -> ConcurrencyLimiter:
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self.release()
+
+
+def is_overloaded_response(response: httpx.Response) -> bool:
+    """
+    Returns whether ``response`` signals that the server is overloaded
+    """
+    return (
+        response.status_code == httpx.codes.TOO_MANY_REQUESTS
+        or response.status_code >= 500
+    )
+
+
+class RetryPolicy(NamedTuple):
+    """
+    How requests to a search backend are retried and hedged. Only idempotent requests
+    are ever sent more than once.
+    """
+
+    #: Number of times a request is retried after a connection error, a timeout or a
+    #: response with one of the `RETRY_STATUS_CODES`
+    retries: int = 0
+
+    #: Delay before the first retry in seconds; it doubles with every further retry
+    backoff: float = 0.5
+
+    #: Upper bound for the delay before a retry in seconds
+    max_backoff: float = 10.0
+
+    #: Send a second request when the first one takes longer than `HEDGE_PERCENTILE`
+    #: percent of the recent requests did and use whichever response arrives first
+    hedge: bool = False
+
+    def get_delay(self, attempt: int, response: httpx.Response | None = None) -> float:
+        """
+        Returns how long to wait before retrying after attempt number ``attempt``
+        (starting at 0). The delay is picked at random up to the exponential backoff
+        ("full jitter"), so clients do not retry in lockstep. A "Retry-After" header
+        (in seconds) on ``response`` takes precedence.
+        """
+        retry_after = response.headers.get("Retry-After", "") if response else ""
+
+        if retry_after.isdigit():
+            return min(self.max_backoff, float(retry_after))
+
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """
+    Transport which hands requests to a shared connection pool. Closing it does not
+    close the pool; that is left to the `ClientManager` that owns the pool.
+
+    Idempotent requests are retried and hedged according to ``policy``. When a
+    ``limiter`` is given, every request sent (including retries and hedged requests)
+    takes one of its slots while it runs and its outcome is reported to it; when
+    ``events`` are given, every request sent is reported as a ``request_completed``
+    event of the backend ``name``.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        limiter: ConcurrencyLimiter | None = None,
+        policy: RetryPolicy | None = None,
+        name: str | None = None,
+        events: EventDispatcher | None = None,
+    ):
+        self.transport = transport
+        self.limiter = limiter
+        self.policy = policy or RetryPolicy()
+        self.name = name
+        self.events = events
+
+        #: Latencies of the most recent successful requests (in seconds)
+        self.latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method not in IDEMPOTENT_METHODS:
+            return await self._send(request)
+
+        attempt = 0
+
+        while True:
+            try:
+                response = await self._send_hedged(request)
+            except httpx.TransportError:
+                if attempt >= self.policy.retries:
+                    raise
+                delay = self.policy.get_delay(attempt)
+            else:
+                if (
+                    attempt >= self.policy.retries
+                    or response.status_code not in RETRY_STATUS_CODES
+                ):
+                    return response
+                delay = self.policy.get_delay(attempt, response)
+                await response.aclose()
+
+            logger.debug(f"Retrying request to {request.url} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
 
-def get_async_client() -> httpx.AsyncClient:
+    def get_hedge_delay(self) -> float | None:
+        """
+        Returns how many seconds to wait for a response before sending a hedged request;
+        ``None`` when requests are not hedged (yet)
+        """
+        if not self.policy.hedge or len(self.latencies) < MIN_HEDGE_SAMPLES:
+            return None
+
+        return statistics.quantiles(self.latencies, n=100)[HEDGE_PERCENTILE - 1]
+
+    async def _send_hedged(self, request: httpx.Request) -> httpx.Response:
+        """
+        Sends ``request`` and sends it a second time when the first one is slower than
+        usual (unless the limiter has no free slot for it). The first successful
+        response wins; the other request is cancelled.
+        """
+        hedge_delay = self.get_hedge_delay()
+
+        if hedge_delay is None:
+            return await self._send(request)
+
+        tasks = [asyncio.ensure_future(self._send(request))]
+        response = None
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+
+            if not done and (self.limiter is None or self.limiter.has_free_slot()):
+                logger.debug(f"Hedging request to {request.url}")
+                tasks.append(asyncio.ensure_future(self._send(request)))
+
+            pending = set(tasks)
+
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        response = task.result()
+                        return response
+
+                # All requests failed; raise the error of the last one
+                if not pending:
+                    return await done.pop()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif (
+                    not task.cancelled()
+                    and task.exception() is None
+                    and task.result() is not response
+                ):
+                    await task.result().aclose()
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        """Sends ``request`` once and records how long it took"""
+        async with self.limiter or nullcontext():
+            return await self._send_once(request)
+
+    async def _send_once(self, request: httpx.Request) -> httpx.Response:
+        started = time.monotonic()
+
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TransportError as exc:
+            elapsed = time.monotonic() - started
+            if self.limiter is not None:
+                self.limiter.record(started, elapsed, overloaded=True)
+            self.emit_request_completed(request, elapsed, error=str(exc) or repr(exc))
+            raise
+        except asyncio.CancelledError:
+            # Only a lower bound, but leaving out requests we gave up on would make
+            # the latencies look better than they are
+            self.latencies.append(time.monotonic() - started)
+            raise
+
+        elapsed = time.monotonic() - started
+        overloaded = is_overloaded_response(response)
+
+        if not overloaded:
+            self.latencies.append(elapsed)
+
+        if self.limiter is not None:
+            self.limiter.record(started, elapsed, overloaded=overloaded)
+        self.emit_request_completed(request, elapsed, status_code=response.status_code)
+
+        return response
+
+    def emit_request_completed(
+        self,
+        request: httpx.Request,
+        duration: float,
+        status_code: int | None = None,
+        error: str | None = None,
+    ) -> None:
+        # Checked here so that we do not even build the event when nobody listens
+        if self.events is not None and "request_completed" in self.events.active:
+            self.events.emit(
+                "request_completed",
+                backend=self.name,
+                method=request.method,
+                url=str(request.url),
+                status_code=status_code,
+                duration=duration,
+                error=error,
+            )
+
+    async def aclose(self) -> None:
+        pass
+
+
+class ClientManager:
     """
-    Returns a httpx.Client object to use for making network requests.
+    Hands out one ``httpx.AsyncClient`` per search backend. Each client has its own
+    headers (so backends cannot overwrite each other's authentication), but all of
+    them share a single connection pool so connections are reused between backends.
+
+    Each name also gets a `ConcurrencyLimiter` which is fed with the outcome of the
+    requests sent by its client.
 
-    Note: this is currently pretty sparse but includes room to grow and allows us
-    to add settings we wish to apply to all network requests for this particular
-    application in the future.
+    Requests are reported to ``events`` (see `SharedTransport`).
+
+    Should be used as an async context manager so that the pool is closed afterwards:
+
+        async with ClientManager(config) as clients:
+            client = clients.get_client("unsplash")
     """
-    return httpx.AsyncClient()
+
+    def __init__(
+        self, config: BaseAppConfig | None = None, events: EventDispatcher | None = None
+    ):
+        self.config = config or BaseAppConfig()
+        self.events = events or EventDispatcher()
+        self.transport = get_transport(config)
+        self.timeout = get_timeout(config)
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._limiters: dict[str, ConcurrencyLimiter] = {}
+
+    def get_backend_settings(self, name: str) -> Any:
+        """
+        Returns the settings of the search backend ``name``; ``None`` if there are none
+        (e.g. for the client used to download images)
+        """
+        return getattr(
+            getattr(self.config, "search_backend_settings", None), name, None
+        )
+
+    def get_retry_policy(self, name: str) -> RetryPolicy:
+        """
+        Returns how requests for ``name`` are retried and hedged. Only search backends
+        have these settings; other requests are neither retried nor hedged.
+        """
+        backend_settings = self.get_backend_settings(name)
+
+        if backend_settings is None:
+            return RetryPolicy()
+
+        return RetryPolicy(
+            retries=backend_settings.retries,
+            backoff=backend_settings.retry_backoff,
+            hedge=backend_settings.hedge_requests,
+        )
+
+    def get_limiter(self, name: str) -> ConcurrencyLimiter:
+        """
+        Returns the concurrency limiter for ``name``. Search backends start at their own
+        ``concurrency`` setting (or the global ``max_concurrency`` setting) and may go
+        up to their ``max_concurrency`` setting (or the size of the connection pool).
+        """
+        limiter = self._limiters.get(name)
+
+        if limiter is None:
+            backend_settings = self.get_backend_settings(name)
+            limit = getattr(backend_settings, "concurrency", None)
+            max_limit = getattr(backend_settings, "max_concurrency", None)
+            limiter = ConcurrencyLimiter(
+                limit or self.config.max_concurrency,
+                max_limit=max_limit or self.config.http_max_connections,
+                adaptive=getattr(backend_settings, "adaptive_concurrency", True),
+            )
+            self._limiters[name] = limiter
+
+        return limiter
+
+    def get_client(self, name: str) -> httpx.AsyncClient:
+        """
+        Returns the client for ``name`` (usually a search backend name), creating it
+        the first time it is requested.
+        """
+        client = self._clients.get(name)
+
+        if client is None:
+            client = httpx.AsyncClient(
+                transport=SharedTransport(
+                    self.transport,
+                    limiter=self.get_limiter(name),
+                    policy=self.get_retry_policy(name),
+                    name=name,
+                    events=self.events,
+                ),
+                timeout=self.timeout,
+            )
+            self._clients[name] = client
+
+        return client
+
+    async def aclose(self) -> None:
+        """Closes all clients and the shared connection pool"""
+        for client in self._clients.values():
+            await client.aclose()
+
+        self._clients.clear()
+        await self.transport.aclose()
+
+    async def __aenter__(self) -> ClientManager:
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+
+class JSONStreamReader:
+    """
+    Decodes JSON values one at a time from text arriving in ``chunks`` (e.g.
+    ``response.aiter_text()``). Only the text that has not been decoded yet is kept.
+    """
+
+    def __init__(self, chunks: AsyncIterator[str]):
+        self.chunks = chunks
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+
+    async def read(self) -> bool:
+        """
+        Appends the next chunk to the buffer (dropping the text already decoded);
+        returns ``False`` when there is nothing left to read
+        """
+        try:
+            chunk = await self.chunks.__anext__()
+        except StopAsyncIteration:
+            return False
+
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+
+        return True
+
+    async def peek(self) -> str:
+        """
+        Skips whitespace and returns the next character (an empty string at the end)
+        """
+        while True:
+            while (
+                self.pos < len(self.buffer) and self.buffer[self.pos] in JSON_WHITESPACE
+            ):
+                self.pos += 1
+
+            if self.pos < len(self.buffer) or not await self.read():
+                return self.buffer[self.pos : self.pos + 1]
+
+    async def expect(self, chars: str) -> str:
+        """
+        Consumes and returns the next character, which must be one of ``chars``
+
+        :raises json.JSONDecodeError: Raised when another character follows
+        """
+        char = await self.peek()
+
+        if not char or char not in chars:
+            raise json.JSONDecodeError(
+                f"Expecting one of {chars!r}", self.buffer, self.pos
+            )
+        self.pos += 1
+
+        return char
+
+    async def decode(self) -> Any:
+        """
+        Decodes the next complete value
+
+        :raises json.JSONDecodeError: Raised when the value is invalid
+        """
+        await self.peek()
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value may just not have arrived completely yet
+                if not await self.read():
+                    raise
+                continue
+
+            # Numbers may continue in the next chunk until a delimiter follows them
+            complete = self.buffer[end : end + 1] in JSON_DELIMITERS
+
+            if not isinstance(value, (int, float)) or complete or not await self.read():
+                self.pos = end
+                return value
+
+
+async def iter_json_items(chunks: AsyncIterator[str], key: str) -> AsyncIterator[Any]:
+    """
+    Incrementally decodes a JSON object read from ``chunks`` and yields the items of
+    its ``key`` array as soon as each of them has been decoded, so neither the whole
+    document nor all of its items need to be held in memory. Other members of the
+    object are decoded and thrown away; reading stops at the end of the array.
+
+    :raises json.JSONDecodeError: Raised when the text is not a JSON object
+    """
+    reader = JSONStreamReader(chunks)
+    await reader.expect("{")
+
+    if await reader.peek() == "}":
+        return
+
+    while True:
+        name = await reader.decode()
+        if not isinstance(name, str):
+            raise json.JSONDecodeError("Expecting property name", reader.buffer, 0)
+        await reader.expect(":")
+
+        if name == key and await reader.peek() == "[":
+            await reader.expect("[")
+            if await reader.peek() == "]":
+                return
+
+            while True:
+                yield await reader.decode()
+                if await reader.expect(",]") == "]":
+                    return
+
+        await reader.decode()
+        if await reader.expect(",}") == "}":
+            return
 
 
 async def gather_results(get_callables: Iterable[Callable], limit: int = 10) -> tuple:
     """
-    Downloads files asynchronously but limits concurrency to `limit`
+    Downloads files asynchronously but limits concurrency to `limit`. Callables which
+    fail (`httpx.HTTPError` or `LatzError`) are logged and return ``None``.
     """
     sem = asyncio.Semaphore(limit)  # This allows us to limit our concurrency.
 
@@ -31,8 +662,51 @@ async def gather_results(get_callables: Iterable[Callable], limit: int = 10) ->
         async with sem:
             try:
                 return await get_callable()
-            except httpx.HTTPError as exc:
+            except (httpx.HTTPError, LatzError) as exc:
                 logger.error(exc)
 
     tasks = tuple(_get(get_callable) for get_callable in get_callables)
     return await asyncio.gather(*tasks)
+
+
+async def iter_results(
+    get_callables: Iterable[Callable],
+    limit: int = 10,
+    timeout: float | None = None,
+) -> AsyncIterator[tuple[int, Any]]:
+    """
+    Same as `gather_results` but yields ``(index, result)`` pairs as soon as each
+    callable finishes. ``index`` is the position of the callable in ``get_callables``.
+    Unexpected errors are logged (with their traceback) and return ``None`` as well.
+
+    When ``timeout`` (in seconds) runs out before all callables are done, the remaining
+    ones are cancelled and `asyncio.TimeoutError` is raised.
+    """
+    sem = asyncio.Semaphore(limit)  # This allows us to limit our concurrency.
+
+    async def _get(idx: int, get_callable: Callable) -> tuple[int, Any]:
+        async with sem:
+            try:
+                return idx, await get_callable()
+            except (httpx.HTTPError, LatzError) as exc:
+                logger.error(exc)
+                return idx, None
+            except Exception:
+                # E.g. a bug in a plugin; this must not lose the results of the others
+                logger.exception("Unexpected error while fetching results")
+                return idx, None
+
+    tasks = tuple(
+        asyncio.ensure_future(_get(idx, get_callable))
+        for idx, get_callable in enumerate(get_callables)
+    )
+
+    try:
+        for task in asyncio.as_completed(tasks, timeout=timeout):
+            yield await task
+    finally:
+        # Only has an effect when the caller stops iterating early or time ran out
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
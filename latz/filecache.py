@@ -0,0 +1,59 @@
+"""
+Module which holds the on disk JSON cache shared by the caches which speed up startup
+(discovered plugins, the config schema and the validated configuration).
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class JSONFileCache:
+    """
+    JSON file holding a single cached value. The value is only used when it was written
+    for the same fingerprint; files are replaced atomically so concurrent runs never
+    read a partially written cache.
+
+    The cache never raises; problems reading or writing it are logged and are treated
+    like a missing cache.
+    """
+
+    def __init__(self, path: Path, fingerprint: str, mode: int = 0o666):
+        self.path = path
+        self.fingerprint = fingerprint
+        #: Permissions the cache file is created with (before applying the umask)
+        self.mode = mode
+
+    def read(self) -> Any:
+        """
+        Returns the cached value or ``None`` if the cache is missing or stale
+        """
+        try:
+            with self.path.open() as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or data.get("fingerprint") != self.fingerprint:
+            return None
+
+        return data.get("value")
+
+    def write(self, value: Any) -> None:
+        """
+        Writes ``value`` to the cache
+        """
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            partial_path = self.path.with_name(f"{self.path.name}.{os.getpid()}")
+            fd = os.open(partial_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, self.mode)
+            with open(fd, "w") as fp:
+                json.dump({"fingerprint": self.fingerprint, "value": value}, fp)
+            os.replace(partial_path, self.path)
+        except OSError as exc:
+            logger.warning(f"Unable to write cache to {self.path}: {exc}")
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
+from collections.abc import Iterable, Iterator
 from typing import NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+#: Ports which are dropped from URLs while normalizing them
+DEFAULT_PORTS = {"http": 80, "https": 443}
 
 
 class ImageSearchResult(NamedTuple):
@@ -12,3 +17,90 @@ class ImageSearchResult(NamedTuple):
     width: int | None
     height: int | None
     search_backend: str | None
+    query: str | None = None
+    id: str | None = None
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a URL so that trivially different URLs for the same image compare equal.
+    The scheme and host are lower cased, default ports and fragments are removed and
+    query parameters are sorted.
+
+    Example:
+    >>> normalize_url("HTTPS://Example.com:443/photo/?b=2&a=1#top")
+    'https://example.com/photo?a=1&b=2'
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class ResultIndex:
+    """
+    Hash index of the search results seen so far. A result is a duplicate when its
+    normalized URL or its backend provided ``id`` has been seen before. With
+    ``per_query`` set, results are only compared to results for the same query.
+    """
+
+    def __init__(self, per_query: bool = False):
+        self.per_query = per_query
+        self._ids: set[tuple[str | None, str | None, str]] = set()
+        self._urls: set[tuple[str | None, str]] = set()
+
+    def copy(self) -> ResultIndex:
+        """
+        Returns an independent copy of the index
+        """
+        index = ResultIndex(self.per_query)
+        index._ids = self._ids.copy()
+        index._urls = self._urls.copy()
+
+        return index
+
+    def add(self, result: ImageSearchResult) -> bool:
+        """
+        Adds ``result`` to the index. Returns ``False`` if it is a duplicate.
+        """
+        query = result.query if self.per_query else None
+        result_id = (query, result.search_backend, result.id) if result.id else None
+        url = (query, normalize_url(result.url)) if result.url else None
+
+        if (result_id is not None and result_id in self._ids) or (
+            url is not None and url in self._urls
+        ):
+            return False
+
+        if result_id is not None:
+            self._ids.add(result_id)
+        if url is not None:
+            self._urls.add(url)
+
+        return True
+
+
+def deduplicate_results(
+    results: Iterable[ImageSearchResult], index: ResultIndex | None = None
+) -> Iterator[ImageSearchResult]:
+    """
+    Yields ``results`` without duplicates, keeping the first occurrence of each image
+
+    Example:
+    >>> results = (
+    ...     ImageSearchResult("https://example.com/1", 1, 1, "one"),
+    ...     ImageSearchResult("https://EXAMPLE.com/1/", 1, 1, "two"),
+    ... )
+    >>> [result.search_backend for result in deduplicate_results(results)]
+    ['one']
+    """
+    index = index if index is not None else ResultIndex()
+
+    return (result for result in results if index.add(result))
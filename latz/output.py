@@ -0,0 +1,210 @@
+"""
+Module which holds everything related to showing search results: the rich table and
+machine readable formats. Unlike the rich table, results in machine readable formats are
+written as soon as they are available.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import sys
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, TextIO
+
+from . import profiling
+from .image import ImageSearchResult
+
+if TYPE_CHECKING:
+    from rich.table import Table
+
+#: Default format; renders a rich table once all results are in
+TABLE_FORMAT = "table"
+
+#: Machine readable formats which are written while searching
+STREAMING_FORMATS = ("ndjson", "csv", "json")
+
+#: All formats the results can be written in
+OUTPUT_FORMATS = (TABLE_FORMAT, *STREAMING_FORMATS)
+
+#: Maximum number of results written to the stream at once
+FLUSH_BATCH_SIZE = 100
+
+
+class ResultWriter:
+    """
+    Writes search results to ``stream`` in one of the `STREAMING_FORMATS`. Results are
+    formatted into a buffer which is written and flushed after every ``batch_size``
+    results and at the end of each `write` call.
+
+    :raises BrokenPipeError: Raised by `write` and `close` when the reading end of
+                             ``stream`` has been closed (e.g. ``latz search ... | head``)
+    """
+
+    def __init__(
+        self,
+        output_format: str,
+        stream: TextIO | None = None,
+        batch_size: int = FLUSH_BATCH_SIZE,
+    ):
+        if output_format not in STREAMING_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+
+        self.output_format = output_format
+        self.stream = stream if stream is not None else sys.stdout
+        self.batch_size = batch_size
+        self.count = 0
+        self._buffer = io.StringIO()
+        self._buffered = 0
+        self._csv_writer = csv.writer(self._buffer, lineterminator="\n")
+
+        if output_format == "csv":
+            self._csv_writer.writerow(ImageSearchResult._fields)
+        elif output_format == "json":
+            self._buffer.write("[")
+
+    def _format(self, result: ImageSearchResult) -> None:
+        if self.output_format == "csv":
+            self._csv_writer.writerow(
+                "" if value is None else value for value in result
+            )
+            return
+
+        line = json.dumps(result._asdict())
+
+        if self.output_format == "ndjson":
+            self._buffer.write(f"{line}\n")
+        else:
+            self._buffer.write(f"{',' if self.count else ''}\n  {line}")
+
+    def flush(self) -> None:
+        """
+        Writes the buffered results to the stream
+        """
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._buffered = 0
+
+        if data:
+            self.stream.write(data)
+            self.stream.flush()
+
+    def write(self, results: Iterable[ImageSearchResult]) -> None:
+        """
+        Writes ``results`` to the stream
+        """
+        for result in results:
+            self._format(result)
+            self.count += 1
+            self._buffered += 1
+
+            if self._buffered >= self.batch_size:
+                self.flush()
+
+        self.flush()
+
+    def close(self) -> None:
+        """
+        Finishes the output (e.g. closes the JSON array)
+        """
+        if self.output_format == "json":
+            self._buffer.write("\n]\n" if self.count else "]\n")
+        self.flush()
+
+
+def create_results_table(
+    results: Iterable[ImageSearchResult], show_query: bool = False
+) -> Table:
+    """
+    Creates a `rich.table.Table` holding the `ImageSearchResult` objects
+    """
+    from rich.table import Table
+
+    table = Table(title="Search Results")
+
+    table.add_column("#", no_wrap=True)
+    if show_query:
+        table.add_column("Query", style="cyan")
+    table.add_column("Link", style="magenta")
+    table.add_column("Backend", justify="right", style="green")
+
+    for idx, result in enumerate(results, start=1):
+        query_column = (result.query,) if show_query else ()
+        table.add_row(str(idx), *query_column, result.url, result.search_backend)
+
+    return table
+
+
+def display_results(
+    results: Iterable[ImageSearchResult], show_query: bool = False
+) -> None:
+    """
+    Displays the `ImageSearchResult` objects as a `rich.table.Table`
+    """
+    from rich.console import Console
+
+    with profiling.span("render"):
+        console = Console()
+        console.print(create_results_table(results, show_query=show_query))
+
+
+def format_searches(searches: Iterable[tuple[str, str]], show_query: bool) -> str:
+    """
+    Returns the backend names of ``searches`` (backend name and query) for messages
+
+    Example:
+    >>> format_searches((("unsplash", "cats"), ("placeholder", "dogs")), True)
+    'unsplash ("cats"), placeholder ("dogs")'
+    """
+    from rich.markup import escape
+
+    return ", ".join(
+        f'{backend} ("{escape(query)}")' if show_query else backend
+        for backend, query in searches
+    )
+
+
+def display_missed_searches(
+    missed: Iterable[tuple[str, str]], deadline: float, show_query: bool = False
+) -> None:
+    """
+    Reports the searches (backend name and query) which did not finish before the
+    ``deadline``
+    """
+    from rich.console import Console
+
+    names = format_searches(missed, show_query)
+    console = Console(stderr=True)
+    console.print(
+        f"[yellow]Deadline of {deadline}s exceeded;[/yellow] no results from: {names}"
+    )
+
+
+def display_failed_searches(
+    failed: Iterable[tuple[str, str]], show_query: bool = False
+) -> None:
+    """
+    Reports the searches (backend name and query) which failed
+    """
+    from rich.console import Console
+
+    names = format_searches(failed, show_query)
+    console = Console(stderr=True)
+    console.print(f"[yellow]Searches failed;[/yellow] no results from: {names}")
+
+
+def silence_stdout() -> None:
+    """
+    Points stdout at ``os.devnull`` once the pipe it was writing to has been closed, so
+    Python does not complain about failing to flush it when exiting.
+    """
+    try:
+        fileno = sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        return
+
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, fileno)
+    os.close(devnull)
@@ -1 +1,5 @@
-from .hookspec import hookimpl, SearchBackendHook  # noqa: F401
+from .hookspec import (  # noqa: F401
+    hookimpl,
+    SearchBackendCapabilities,
+    SearchBackendHook,
+)
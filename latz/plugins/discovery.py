@@ -0,0 +1,123 @@
+"""
+Module which holds everything related to discovering plugins that are installed
+alongside latz. Scanning the metadata of every installed distribution is slow in large
+environments, so the result is cached on disk and only refreshed when the installed
+packages change.
+"""
+from __future__ import annotations
+
+import hashlib
+import importlib.metadata
+import os
+import sys
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from ..filecache import JSONFileCache
+
+
+class PluginEntryPoint(NamedTuple):
+    """
+    Entry point of a plugin that has been discovered but not necessarily imported
+    """
+
+    #: Name of the entry point (also used as the name the plugin is registered under)
+    name: str
+
+    #: Import path of the plugin (e.g. "latz_imgur.main")
+    value: str
+
+    #: Names of the search backends this plugin provides; ``None`` when this is not known
+    #: because the plugin has never been imported.
+    search_backends: tuple[str, ...] | None = None
+
+    def load(self, group: str):
+        """Imports the plugin"""
+        return importlib.metadata.EntryPoint(self.name, self.value, group).load()
+
+
+def get_environment_fingerprint(paths: Iterable[str] | None = None) -> str:
+    """
+    Returns a fingerprint of the installed distributions. Installing, upgrading or
+    removing a package changes the modification time of the directory its metadata
+    lives in (e.g. "site-packages"), so these times are part of the fingerprint.
+    """
+    state = [sys.version]
+
+    for path in paths if paths is not None else sys.path:
+        # An empty entry stands for the current working directory which changes often
+        # and is not where packages are installed to.
+        if not path:
+            continue
+        try:
+            state.append(f"{path}:{os.stat(path).st_mtime_ns}")
+        except OSError:
+            state.append(path)
+
+    return hashlib.sha256("\n".join(state).encode()).hexdigest()
+
+
+def discover_entry_points(group: str) -> tuple[PluginEntryPoint, ...]:
+    """
+    Scans all installed distributions for entry points in ``group``
+    """
+    return tuple(
+        PluginEntryPoint(name=entry_point.name, value=entry_point.value)
+        for entry_point in importlib.metadata.entry_points(group=group)
+    )
+
+
+class PluginDiscoveryCache:
+    """
+    On disk cache for discovered plugin entry points (see `JSONFileCache`). The cache
+    is only valid as long as the environment fingerprint it was written with matches
+    the current one; otherwise the entry points are discovered again.
+    """
+
+    def __init__(self, path: Path, group: str):
+        self.group = group
+        self.cache = JSONFileCache(path, get_environment_fingerprint())
+
+    def read(self) -> tuple[PluginEntryPoint, ...] | None:
+        """
+        Returns the cached entry points or ``None`` if the cache is missing or stale
+        """
+        data = self.cache.read()
+
+        if data is None:
+            return None
+
+        try:
+            return tuple(
+                PluginEntryPoint(
+                    name=entry_point["name"],
+                    value=entry_point["value"],
+                    search_backends=(
+                        tuple(entry_point["search_backends"])
+                        if entry_point.get("search_backends") is not None
+                        else None
+                    ),
+                )
+                for entry_point in data
+            )
+        except (KeyError, TypeError):
+            return None
+
+    def write(self, entry_points: Iterable[PluginEntryPoint]) -> None:
+        """
+        Writes ``entry_points`` to the cache
+        """
+        self.cache.write([entry_point._asdict() for entry_point in entry_points])
+
+    def get_entry_points(self) -> tuple[PluginEntryPoint, ...]:
+        """
+        Returns the cached entry points, discovering (and caching) them if necessary
+        """
+        entry_points = self.read()
+
+        if entry_points is None:
+            entry_points = discover_entry_points(self.group)
+            self.write(entry_points)
+
+        return entry_points
@@ -1,18 +1,73 @@
+from __future__ import annotations
+
 from collections.abc import Iterable, Awaitable
-from typing import NamedTuple, Any
+from typing import TYPE_CHECKING, NamedTuple
 from collections.abc import Callable
 
-import httpx
 import pluggy  # type: ignore
-from pydantic import BaseModel
 
 from latz.constants import APP_NAME
 from latz.image import ImageSearchResult
 
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
 hookspec = pluggy.HookspecMarker(APP_NAME)
 hookimpl = pluggy.HookimplMarker(APP_NAME)
 
 
+class SearchBackendCapabilities(NamedTuple):
+    """
+    Describes what a search backend's ``search`` callable supports beyond the basic
+    ``search(client, config, query)`` contract. latz uses this to only request what is
+    actually needed from each backend.
+    """
+
+    pagination: bool = False
+    """
+    Whether ``search`` accepts ``limit`` and ``offset`` keyword arguments and returns
+    at most ``limit`` results, skipping the first ``offset`` ones.
+    """
+
+    max_page_size: int | None = None
+    """
+    Largest number of results the backend's API returns for a single request. When
+    more results are needed, latz splits the search into several requests of at most
+    this size and runs them concurrently. Only used together with ``pagination``.
+    """
+
+    filters: tuple[str, ...] = ()
+    """
+    Names of the filters (e.g. "orientation") ``search`` accepts as additional keyword
+    arguments. Searches using filters a backend does not support skip that backend.
+
+    **Example:**
+
+    ```python
+    async def search(client, config, query, limit=None, offset=0, orientation=None):
+        ...
+
+    @hookimpl
+    def search_backend():
+        return SearchBackendHook(
+            name="custom",
+            search=search,
+            capabilities=SearchBackendCapabilities(
+                pagination=True, max_page_size=50, filters=("orientation",)
+            ),
+            ...
+        )
+    ```
+    """
+
+    default_page_size: int | None = None
+    """
+    Number of results ``search`` returns when it is called without a ``limit``. latz
+    needs this to know which searches cached results can answer. Only used together
+    with ``pagination``.
+    """
+
+
 class SearchBackendHook(NamedTuple):
     """
     Holds the metadata and callable for using the image search hook.
@@ -50,11 +105,11 @@ class SearchBackendHook(NamedTuple):
     ```
     """
 
-    search: Callable[
-        [httpx.AsyncClient, Any, str], Awaitable[tuple[ImageSearchResult, ...]]
-    ]
+    search: Callable[..., Awaitable[tuple[ImageSearchResult, ...]]]
     """
-    Callable that implements the search hook.
+    Callable that implements the search hook. It is called with a
+    ``httpx.AsyncClient``, the application config and the query; depending on the
+    ``capabilities`` it also receives ``limit``, ``offset`` and filter keyword arguments.
     """
 
     config_fields: BaseModel
@@ -82,6 +137,13 @@ class SearchBackendHook(NamedTuple):
     ```
     """
 
+    capabilities: SearchBackendCapabilities | None = None
+    """
+    What the ``search`` callable supports (see `SearchBackendCapabilities`). When this
+    is left out, ``search`` is only ever called with ``client``, ``config`` and
+    ``query`` and is expected to return all of its results.
+    """
+
 
 class AppHookSpecs:
     """Holds all hookspecs for this application"""
@@ -95,3 +157,65 @@ class AppHookSpecs:
         using this plugin hook.
         """
         return tuple()
+
+    @hookspec
+    def search_started(self, backend: str, query: str) -> None:
+        """
+        Called when a search backend starts searching for ``query``.
+
+        This and the other observability hooks (`search_finished`,
+        `request_completed` and `cache_lookup`) are meant for exporting metrics. They
+        are called from a background thread after the fact, so they never slow down
+        searches; implementations should therefore not expect to run in the event loop.
+        """
+
+    @hookspec
+    def search_finished(
+        self,
+        backend: str,
+        query: str,
+        duration: float,
+        results: int | None,
+        error: str | None,
+    ) -> None:
+        """
+        Called when a search backend has finished searching for ``query``. ``duration``
+        is in seconds and ``results`` holds the number of results found; on failure,
+        ``results`` is ``None`` and ``error`` describes what went wrong.
+
+        **Example:**
+
+        ```python
+        @hookimpl
+        def search_finished(backend, duration, error):
+            statsd.timing(f"latz.search.{backend}", duration * 1000)
+            if error is not None:
+                statsd.incr(f"latz.search.{backend}.errors")
+        ```
+
+        As usual with pluggy, implementations only need to accept the arguments they
+        use.
+        """
+
+    @hookspec
+    def request_completed(
+        self,
+        backend: str,
+        method: str,
+        url: str,
+        status_code: int | None,
+        duration: float,
+        error: str | None,
+    ) -> None:
+        """
+        Called for every HTTP request sent on behalf of ``backend`` (including retried
+        and hedged ones) once its response has arrived. ``status_code`` is ``None``
+        when no response arrived; ``error`` then describes what went wrong.
+        """
+
+    @hookspec
+    def cache_lookup(self, backend: str, query: str, hit: bool) -> None:
+        """
+        Called each time the search result cache is checked for the results of
+        ``backend`` for ``query``
+        """
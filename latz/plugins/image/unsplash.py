@@ -1,24 +1,41 @@
 from __future__ import annotations
 
+import asyncio
 import urllib.parse
+from itertools import chain, islice
+from typing import TYPE_CHECKING
 
-import httpx
 from pydantic import BaseModel, Field
 
 from ...image import (
     ImageSearchResult,
 )
-from .. import hookimpl, SearchBackendHook
+from .. import hookimpl, SearchBackendCapabilities, SearchBackendHook
 from ...exceptions import SearchBackendError
 
+if TYPE_CHECKING:
+    import httpx
+
 #: Name of the plugin that will be referenced in our configuration
 PLUGIN_NAME = "unsplash"
 
 #: Base URL for the Unsplash API
 BASE_URL = "https://api.unsplash.com/"
 
+#: Path of the endpoint used for searching images
+SEARCH_PATH = "/search/photos"
+
 #: Endpoint used for searching images
-SEARCH_ENDPOINT = urllib.parse.urljoin(BASE_URL, "/search/photos")
+SEARCH_ENDPOINT = urllib.parse.urljoin(BASE_URL, SEARCH_PATH)
+
+#: Maximum number of results the API returns per page
+MAX_PER_PAGE = 30
+
+#: Number of results the API returns per page when no page size is given
+DEFAULT_PER_PAGE = 10
+
+#: Search parameters of the API which narrow down the results
+FILTERS = ("orientation", "color", "content_filter", "order_by")
 
 
 class UnsplashBackendConfig(BaseModel):
@@ -29,50 +46,165 @@ class UnsplashBackendConfig(BaseModel):
     """
 
     access_key: str = Field(description="Access key for the Unsplash API")
+    base_url: str = Field(
+        BASE_URL,
+        description="Base URL for the Unsplash API (e.g. of a local mock server)",
+    )
+
+
+def _get_result(record: dict) -> ImageSearchResult:
+    """
+    Creates an `ImageSearchResult` from a single record returned by the API
+    """
+    return ImageSearchResult(
+        url=record.get("links", {}).get("download"),
+        width=record.get("width"),
+        height=record.get("height"),
+        search_backend=PLUGIN_NAME,
+        id=record.get("id"),
+    )
 
 
-async def _get(client: httpx.AsyncClient, url: str, query: str) -> dict:
+async def _get(
+    client: httpx.AsyncClient,
+    url: str,
+    query: str,
+    headers: dict | None = None,
+    params: dict | None = None,
+) -> list[ImageSearchResult]:
     """
-    Wraps `client.get` call in a try, except so that we raise
+    Wraps the request in a try, except so that we raise
     an application specific exception instead.
 
+    The response is parsed while it is read and each record is turned into an
+    `ImageSearchResult` as soon as it has been decoded, so the raw JSON is never held in
+    memory as a whole.
+
     :raises SearchBackendError: Encountered during problems querying the API
     """
+    # Only searching needs httpx, so commands like "config show" do not import it
+    import httpx
+
+    from ...fetch import iter_json_items
+
     try:
-        resp = await client.get(url, params={"query": query})
-        resp.raise_for_status()
+        async with client.stream(
+            "GET", url, params={"query": query, **(params or {})}, headers=headers
+        ) as resp:
+            resp.raise_for_status()
+
+            return [
+                _get_result(record)
+                async for record in iter_json_items(resp.aiter_text(), "results")
+                if isinstance(record, dict)
+            ]
     except httpx.HTTPError as exc:
         raise SearchBackendError(str(exc), original=exc)
+    except ValueError as exc:
+        raise SearchBackendError(
+            "Received malformed response from search backend", original=exc
+        )
+
+
+async def _get_pages(
+    client: httpx.AsyncClient,
+    url: str,
+    query: str,
+    limit: int,
+    offset: int = 0,
+    headers: dict | None = None,
+    params: dict | None = None,
+) -> list[ImageSearchResult]:
+    """
+    Requests all pages needed for the ``limit`` results starting at ``offset`` at the
+    same time and returns their results in order. The page size is the largest one
+    that lines up with ``offset`` so that as few results as possible are skipped. Once a
+    page comes back short, there are no more results, so we stop waiting for the pages
+    after it.
+
+    :raises SearchBackendError: Encountered during problems querying the API
+    """
+    per_page = min(limit, MAX_PER_PAGE)
+    if offset % per_page:
+        per_page = MAX_PER_PAGE
+
+    first_page = offset // per_page + 1
+    last_page = (offset + limit - 1) // per_page + 1
+    tasks = [
+        asyncio.ensure_future(
+            _get(
+                client,
+                url,
+                query,
+                headers=headers,
+                params={**(params or {}), "page": page, "per_page": per_page},
+            )
+        )
+        for page in range(first_page, last_page + 1)
+    ]
+    page_count = len(tasks)
+
+    try:
+        pending = set(tasks)
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if len(task.result()) < per_page:
+                    page_count = min(page_count, tasks.index(task) + 1)
 
-    json_data = resp.json()
+            pending = {task for task in pending if tasks.index(task) < page_count}
+    finally:
+        for task in tasks:
+            task.cancel()
 
-    if not isinstance(json_data, dict):
-        raise SearchBackendError("Received malformed response from search backend")
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-    return json_data
+    results = chain.from_iterable(task.result() for task in tasks[:page_count])
+    skip = offset - (first_page - 1) * per_page
+
+    return list(islice(results, skip, skip + limit))
 
 
 async def search(
-    client: httpx.AsyncClient, config, query: str
+    client: httpx.AsyncClient,
+    config,
+    query: str,
+    limit: int | None = None,
+    offset: int = 0,
+    **filters: str,
 ) -> tuple[ImageSearchResult, ...]:
     """
     Find images based on a `query` and return a tuple of `ImageSearchResult` objects.
+    When a ``limit`` or ``offset`` is given, as many pages as are needed for these
+    results are fetched at the same time; otherwise, only the first page is fetched.
+    ``filters`` (see `FILTERS`) are passed on to the API as is.
 
     :raises SearchBackendError: Encountered during problems querying the API
     """
-    access_key = config.search_backend_settings.unsplash.access_key
-    client.headers = httpx.Headers({"Authorization": f"Client-ID {access_key}"})
-    json_data = await _get(client, SEARCH_ENDPOINT, query)
-
-    return tuple(
-        ImageSearchResult(
-            url=record.get("links", {}).get("download"),
-            width=record.get("width"),
-            height=record.get("height"),
-            search_backend=PLUGIN_NAME,
+    settings = config.search_backend_settings.unsplash
+    headers = {"Authorization": f"Client-ID {settings.access_key}"}
+    url = urllib.parse.urljoin(settings.base_url, SEARCH_PATH)
+
+    if limit is not None and limit < 1:
+        return tuple()
+
+    if limit is None and not offset:
+        results = await _get(client, url, query, headers=headers, params=filters)
+    else:
+        results = await _get_pages(
+            client,
+            url,
+            query,
+            limit or DEFAULT_PER_PAGE,
+            offset,
+            headers=headers,
+            params=filters,
         )
-        for record in json_data.get("results", tuple())
-    )
+
+    return tuple(results)
 
 
 @hookimpl
@@ -84,4 +216,10 @@ def search_backend():
         name=PLUGIN_NAME,
         search=search,
         config_fields=UnsplashBackendConfig(access_key=""),
+        capabilities=SearchBackendCapabilities(
+            pagination=True,
+            max_page_size=MAX_PER_PAGE,
+            filters=FILTERS,
+            default_page_size=DEFAULT_PER_PAGE,
+        ),
     )
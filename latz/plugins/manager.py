@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+import hashlib
 from collections import Counter
-from functools import reduce
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
+from functools import cache
+from typing import Any
 
+import pydantic
 from pluggy import PluginManager  # type: ignore
-from pydantic import create_model
+from pydantic import BaseModel, create_model
 
-from ..constants import APP_NAME
+from ..config.models import BaseSearchBackendSettings
+from ..config.schema import get_model_fields_state
+from ..constants import APP_NAME, PLUGIN_CACHE_FILE
 from ..exceptions import LatzError
+from .. import profiling
+from .discovery import PluginDiscoveryCache, PluginEntryPoint
 from .hookspec import AppHookSpecs, SearchBackendHook
 from .image import unsplash, placeholder
 
@@ -19,6 +26,10 @@ SEARCH_BACKEND_SETTINGS_MODEL = "SearchBackendSettings"
 #: Key used in the configuration of the dynamically generated settings from plugins.
 SEARCH_BACKEND_SETTINGS_KEY = "search_backend_settings"
 
+#: Generated search backend settings models and their defaults indexed by the
+#: fingerprint of the config fields they were generated from
+_search_backend_settings_models: dict[str, tuple[type[BaseModel], dict]] = {}
+
 
 class AppPluginManager(PluginManager):
     """
@@ -27,33 +38,136 @@ class AppPluginManager(PluginManager):
     """
 
     def __init__(self, *args, **kwargs):
-        # This is used as a cache
-        self.__search_backend_hooks = None
+        # These are used as a cache
+        self.__search_backend_registry: dict[str, SearchBackendHook] | None = None
+        self.__config_fields_fingerprint: str | None = None
+
+        # Plugins which have been discovered but are only imported once they are needed
+        self.__discovery_cache: PluginDiscoveryCache | None = None
+        self.__entry_points: dict[str, PluginEntryPoint] = {}
+        self.__pending_plugins: set[str] = set()
 
         super().__init__(*args, **kwargs)
 
     def reset_cache(self) -> None:
         """Resets all cached properties"""
-        self.__search_backend_hooks = None
+        self.__search_backend_registry = None
+        self.__config_fields_fingerprint = None
+
+    def register(self, *args, **kwargs):
+        """Registers a plugin and resets cached properties that depend on it"""
+        self.reset_cache()
+        return super().register(*args, **kwargs)
+
+    def unregister(self, *args, **kwargs):
+        """Unregisters a plugin and resets cached properties that depend on it"""
+        self.reset_cache()
+        return super().unregister(*args, **kwargs)
+
+    def add_discovered_plugins(self, discovery_cache: PluginDiscoveryCache) -> None:
+        """
+        Adds the plugins found by ``discovery_cache`` without importing them. They are
+        imported by `load_plugins` once they are needed.
+        """
+        self.__discovery_cache = discovery_cache
+
+        for entry_point in discovery_cache.get_entry_points():
+            self.__entry_points[entry_point.name] = entry_point
+
+            if not (
+                self.get_plugin(entry_point.name) or self.is_blocked(entry_point.name)
+            ):
+                self.__pending_plugins.add(entry_point.name)
+
+    def load_plugins(self, search_backends: Iterable[str] | None = None) -> None:
+        """
+        Imports and registers discovered plugins. When ``search_backends`` is given, only
+        plugins providing one of these backends are imported (plus plugins providing no
+        search backends at all and plugins for which we do not know yet which backends
+        they provide).
+        """
+        wanted = set(search_backends) if search_backends is not None else None
+        loaded = []
+
+        for name in sorted(self.__pending_plugins):
+            entry_point = self.__entry_points[name]
+
+            # Plugins without search backends (e.g. metrics exporters) are always needed
+            if (
+                wanted is not None
+                and entry_point.search_backends
+                and wanted.isdisjoint(entry_point.search_backends)
+            ):
+                continue
+
+            with profiling.span(f"plugins.import.{name}"):
+                plugin = entry_point.load(self.project_name)
+            self.register(plugin, name=name)
+            self.__pending_plugins.discard(name)
+            loaded.append(name)
+
+        if not loaded:
+            return
+
+        # Remember which backends the plugins provide for the next run. This is only
+        # needed once after the environment changed (which invalidates the cache).
+        unknown = [
+            name for name in loaded if self.__entry_points[name].search_backends is None
+        ]
+        for name in unknown:
+            self.__entry_points[name] = self.__entry_points[name]._replace(
+                search_backends=self._get_plugin_search_backend_names(name)
+            )
+
+        if unknown and self.__discovery_cache is not None:
+            self.__discovery_cache.write(self.__entry_points.values())
+
+    def _get_plugin_search_backend_names(self, plugin_name: str) -> tuple[str, ...]:
+        """
+        Returns the names of the search backends that the plugin ``plugin_name``
+        provides. Only the hook implementations of this plugin are called.
+        """
+        plugin = self.get_plugin(plugin_name)
+        hook_caller = self.subset_hook_caller(
+            "search_backend",
+            remove_plugins=[other for other in self.get_plugins() if other is not plugin],
+        )
+        names: list[str] = [search_backend.name for search_backend in hook_caller()]
+
+        return tuple(names)
 
     @property
-    def search_backend_names(self) -> tuple[str, ...]:
+    def search_backend_registry(self) -> dict[str, SearchBackendHook]:
         """
-        Get the names of available search backends that are currently configured.
-        We cache this once per run.
+        All available search backends indexed by their name. This imports all plugins
+        that have not been imported yet.
+
+        :raises LatzError: Raised if duplicate values are found (same plugin
+                                is registered multiple times)
+        """
+        self.load_plugins()
+
+        return self._get_loaded_search_backend_registry()
+
+    def _get_loaded_search_backend_registry(self) -> dict[str, SearchBackendHook]:
+        """
+        All search backends of the plugins registered so far indexed by their name.
+        The `search_backend` hook is only called once to build this and the result is
+        cached until `reset_cache` is called (this happens automatically when plugins
+        are (un)registered).
 
         If there are duplicate names registered, we raise an exception.
 
         :raises LatzError: Raised if duplicate values are found (same plugin
                                 is registered multiple times)
         """
-        if self.__search_backend_hooks is not None:
-            return self.__search_backend_hooks
+        if self.__search_backend_registry is not None:
+            return self.__search_backend_registry
 
-        self.__search_backend_hooks = tuple(
-            search_backend.name for search_backend in self.hook.search_backend()
+        search_backends: list[SearchBackendHook] = self.hook.search_backend()
+        names_counter = Counter(
+            search_backend.name for search_backend in search_backends
         )
-        names_counter = Counter(self.__search_backend_hooks)
         duplicates = tuple(value for value, count in names_counter.items() if count > 1)
 
         if len(duplicates) > 0:
@@ -62,54 +176,112 @@ class AppPluginManager(PluginManager):
                 f"{', '.join(duplicates)}. Please make sure to define a unique 'name' field"
             )
 
-        return self.__search_backend_hooks
+        self.__search_backend_registry = {
+            search_backend.name: search_backend for search_backend in search_backends
+        }
+
+        return self.__search_backend_registry
+
+    @property
+    def search_backend_names(self) -> tuple[str, ...]:
+        """
+        Get the names of available search backends that are currently configured.
+
+        :raises LatzError: Raised if duplicate values are found (same plugin
+                                is registered multiple times)
+        """
+        return tuple(self.search_backend_registry)
 
     def get_configured_search_backends(self, config) -> tuple[SearchBackendHook, ...]:
         """
         Get the search backends that are currently configured to be used.
         These are differently than those that have simply been registered.
+        They are returned in the order they appear in the configuration.
+
+        Only the plugins providing these search backends are imported.
         """
+        self.load_plugins(config.search_backends)
+        registry = self._get_loaded_search_backend_registry()
+
         return tuple(
-            search_backend
-            for search_backend in self.hook.search_backend()
-            if search_backend.name in config.search_backends
+            registry[name]
+            for name in dict.fromkeys(config.search_backends)
+            if name in registry
         )
 
+    @property
+    def config_fields_fingerprint(self) -> str:
+        """
+        Fingerprint of the config fields of the search backends registered so far.
+        Generated models and schemas are cached under this fingerprint.
+        """
+        if self.__config_fields_fingerprint is None:
+            self.__config_fields_fingerprint = get_config_fields_fingerprint(
+                self._get_loaded_search_backend_registry().values()
+            )
+
+        return self.__config_fields_fingerprint
+
     @property
     def search_backend_config_fields(self) -> dict:
+        """
+        Returns all the registered config fields for the `search_backend` plugins.
+        See `get_search_backend_config_fields`.
+        """
+        return self.get_search_backend_config_fields()
+
+    def get_search_backend_config_fields(
+        self, search_backends: Iterable[str] | None = None
+    ) -> dict:
         """
         Returns all the registered config fields for the `search_backend` plugins.
         We perform a merge of all registered `config_fields` dictionaries that represent
         the new configuration fields that will be added.
 
-        TODO: add a duplicate check just like for search backend names
+        When ``search_backends`` is given, only the plugins providing these backends are
+        imported, so the config fields of other plugins that have not been imported yet
+        are left out.
         """
-        # Merge config fields from all registered plugins
-        search_backend_config = reduce(
-            lambda dict_one, dict_two: {**dict_one, **dict_two},
-            (
-                {search_backends.name: search_backends.config_fields}
-                for search_backends in self.hook.search_backend()
-            ),
-        )
+        self.load_plugins(search_backends)
 
-        SearchBackendSettings = create_model(
-            SEARCH_BACKEND_SETTINGS_MODEL, **search_backend_config
-        )
+        # Generating the model is slow, so we reuse it for as long as the config fields
+        # of the registered plugins stay the same.
+        fingerprint = self.config_fields_fingerprint
+
+        if fingerprint not in _search_backend_settings_models:
+            registry = self._get_loaded_search_backend_registry()
+
+            # Merge config fields from all registered plugins
+            search_backend_config: dict[str, Any] = {
+                name: add_base_search_backend_settings(search_backend.config_fields)
+                for name, search_backend in registry.items()
+            }
 
-        return {
-            SEARCH_BACKEND_SETTINGS_KEY: (
+            SearchBackendSettings = create_model(
+                SEARCH_BACKEND_SETTINGS_MODEL, **search_backend_config
+            )
+            _search_backend_settings_models[fingerprint] = (
                 SearchBackendSettings,
                 SearchBackendSettings().dict(),
             )
-        }
+
+        SearchBackendSettings, defaults = _search_backend_settings_models[fingerprint]
+
+        return {SEARCH_BACKEND_SETTINGS_KEY: (SearchBackendSettings, defaults)}
 
     def get_backend_validator_func(self) -> Callable:
         """Returns the validator function that is used by Pydantic when parsing configuration"""
 
         def validate_backend(cls, values):
+            self.load_plugins(values)
+            registry = self._get_loaded_search_backend_registry()
+
             for value in values:
-                if value not in self.search_backend_names:
+                if value not in registry:
+                    # Plugins are imported lazily; make sure we have all of them
+                    registry = self.search_backend_registry
+
+                if value not in registry:
                     valid_names = ", ".join(self.search_backend_names)
                     raise ValueError(
                         f"'{value}' is not a valid choice for a search backend. "
@@ -120,6 +292,50 @@ class AppPluginManager(PluginManager):
         return validate_backend
 
 
+def add_base_search_backend_settings(config_fields: BaseModel) -> BaseModel:
+    """
+    Extends a plugin's ``config_fields`` model with the settings latz provides for every
+    search backend (see ``BaseSearchBackendSettings``) and returns its default instance.
+    """
+    model = get_search_backend_settings_class(type(config_fields))
+
+    return model(**config_fields.dict())
+
+
+@cache
+def get_search_backend_settings_class(
+    config_fields_class: type[BaseModel],
+) -> type[BaseModel]:
+    """
+    Returns ``config_fields_class`` extended with ``BaseSearchBackendSettings``. The
+    class is only generated once per ``config_fields_class``.
+    """
+    return create_model(
+        config_fields_class.__name__,
+        __base__=(BaseSearchBackendSettings, config_fields_class),
+    )
+
+
+def get_config_fields_fingerprint(search_backends: Iterable[SearchBackendHook]) -> str:
+    """
+    Returns a fingerprint of the config fields of ``search_backends``. It changes
+    whenever a search backend is added or removed or one of their config models or its
+    default values change.
+    """
+    state = [pydantic.VERSION, *get_model_fields_state(BaseSearchBackendSettings)]
+
+    for search_backend in sorted(search_backends, key=lambda backend: backend.name):
+        config_fields_class = type(search_backend.config_fields)
+        state.append(search_backend.name)
+        state.append(
+            f"{config_fields_class.__module__}.{config_fields_class.__qualname__}"
+        )
+        state.extend(get_model_fields_state(config_fields_class))
+        state.append(search_backend.config_fields.json())
+
+    return hashlib.sha256("\n".join(state).encode()).hexdigest()
+
+
 def get_plugin_manager() -> AppPluginManager:
     """
     Plugin manager for the application. This function registers all plugin
@@ -137,7 +353,9 @@ def get_plugin_manager() -> AppPluginManager:
     plugin_manager.register(placeholder)
 
     # This is the magic that allows our application to discover other plugins
-    # installed alongside it
-    plugin_manager.load_setuptools_entrypoints(APP_NAME)
+    # installed alongside it. They are only imported once they are needed.
+    plugin_manager.add_discovered_plugins(
+        PluginDiscoveryCache(PLUGIN_CACHE_FILE, APP_NAME)
+    )
 
     return plugin_manager
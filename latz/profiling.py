@@ -0,0 +1,170 @@
+"""
+Module which holds the timing instrumentation behind ``latz --profile``. Stages of a
+command (plugin discovery, building the configuration, searching, rendering, ...) are
+wrapped in `span` blocks, which only record anything while profiling is enabled.
+"""
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+from typing import Any, NamedTuple, TypeVar
+
+T = TypeVar("T")
+
+#: Returned by `span` while profiling is disabled; entering it does nothing
+NULL_SPAN = nullcontext()
+
+
+class Span(NamedTuple):
+    """
+    A timed stage; ``start`` is relative to when profiling was enabled
+    """
+
+    name: str
+    start: float
+    duration: float
+
+
+class SpanSummary(NamedTuple):
+    """
+    Timings of all spans sharing the same name
+    """
+
+    name: str
+    calls: int
+    total: float
+    mean: float
+    max: float
+
+
+class Profiler:
+    """
+    Records the spans of a single command
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: list[Span] = []
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            finished = time.perf_counter()
+            self.spans.append(Span(name, started - self.started, finished - started))
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summarize(self) -> tuple[SpanSummary, ...]:
+        """
+        Summarizes the spans by name, in the order they were first started
+        """
+        durations: dict[str, list[float]] = {}
+
+        for span in sorted(self.spans, key=lambda span: span.start):
+            durations.setdefault(span.name, []).append(span.duration)
+
+        return tuple(
+            SpanSummary(
+                name, len(values), sum(values), sum(values) / len(values), max(values)
+            )
+            for name, values in durations.items()
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "total_seconds": self.elapsed,
+            "summary": [summary._asdict() for summary in self.summarize()],
+            "spans": [span._asdict() for span in self.spans],
+        }
+
+    def write(self, path: Path) -> None:
+        """
+        Writes all spans and their summary as JSON to ``path``
+        """
+        path.write_text(json.dumps(self.to_dict(), indent=2))
+
+
+#: Profiler of the running command; ``None`` while profiling is disabled
+_profiler: Profiler | None = None
+
+
+def enable() -> Profiler:
+    """
+    Starts recording spans
+    """
+    global _profiler
+    _profiler = Profiler()
+
+    return _profiler
+
+
+def disable() -> Profiler | None:
+    """
+    Stops recording spans and returns the profiler holding the recorded ones
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+
+    return profiler
+
+
+def span(name: str) -> AbstractContextManager:
+    """
+    Times the enclosed block as ``name`` while profiling is enabled:
+
+        with profiling.span("config"):
+            ...
+    """
+    profiler = _profiler
+
+    return profiler.span(name) if profiler is not None else NULL_SPAN
+
+
+def timed(name: str, func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Returns a version of the coroutine function ``func`` which is timed as ``name``;
+    while profiling is disabled, ``func`` is returned as is.
+    """
+    if _profiler is None:
+        return func
+
+    @wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        with span(name):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def create_report_table(profiler: Profiler):
+    """
+    Creates a `rich.table.Table` summarizing the spans recorded by ``profiler``
+    """
+    from rich.table import Table
+
+    table = Table(title=f"Profile ({profiler.elapsed * 1000:.1f} ms in total)")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total (ms)", justify="right")
+    table.add_column("Mean (ms)", justify="right")
+    table.add_column("Max (ms)", justify="right")
+
+    for summary in profiler.summarize():
+        table.add_row(
+            summary.name,
+            str(summary.calls),
+            f"{summary.total * 1000:.1f}",
+            f"{summary.mean * 1000:.1f}",
+            f"{summary.max * 1000:.1f}",
+        )
+
+    return table
@@ -0,0 +1,133 @@
+"""
+Module which holds everything related to resizing downloaded images. Resizing is CPU
+bound, so it is spread across a pool of worker processes.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+from PIL import Image
+
+#: Separator between width and height when sizes are provided as strings (e.g. "200x100")
+SIZE_SEPARATOR = "x"
+
+#: Suffix for resized images that are still being written
+PARTIAL_SUFFIX = ".part"
+
+
+class ImageSize(NamedTuple):
+    """
+    Target size of a resized image. Images are scaled down to fit within this size
+    while keeping their aspect ratio.
+    """
+
+    width: int
+    height: int
+
+    def __str__(self) -> str:
+        return f"{self.width}{SIZE_SEPARATOR}{self.height}"
+
+
+def parse_size(value: str) -> ImageSize:
+    """
+    Parses a size in the "<width>x<height>" format
+
+    Example:
+    >>> parse_size("200x100")
+    ImageSize(width=200, height=100)
+
+    :raises ValueError: Raised when ``value`` is not in the correct format
+    """
+    width, _, height = value.lower().partition(SIZE_SEPARATOR)
+    size = ImageSize(int(width), int(height))
+
+    if size.width <= 0 or size.height <= 0:
+        raise ValueError(f"'{value}' is not a valid size")
+
+    return size
+
+
+def get_resized_path(path: Path, size: ImageSize) -> Path:
+    """
+    Returns where the resized version of the image at ``path`` is saved to
+
+    Example:
+    >>> get_resized_path(Path("images/bunny.jpg"), ImageSize(200, 100)).as_posix()
+    'images/bunny_200x100.jpg'
+    """
+    return path.with_name(f"{path.stem}_{size}{path.suffix}")
+
+
+def resize_image(path: Path, sizes: Sequence[ImageSize]) -> tuple[Path, ...]:
+    """
+    Saves a copy of the image at ``path`` for each of the ``sizes``. The image is only
+    decoded once. For JPEG images, draft mode is used so that the decoder already
+    scales the image down to (roughly) the largest size we need, which is much faster
+    than decoding it at full size.
+
+    This function runs in worker processes, so it only takes and returns picklable values.
+    """
+    resized_paths = []
+
+    with Image.open(path) as image:
+        image_format = image.format
+        image.draft(
+            None,
+            (max(size.width for size in sizes), max(size.height for size in sizes)),
+        )
+        image.load()
+
+        for size in sizes:
+            resized_path = get_resized_path(path, size)
+            partial_path = resized_path.with_name(resized_path.name + PARTIAL_SUFFIX)
+
+            resized = image.copy()
+            resized.thumbnail(size)
+            resized.save(partial_path, format=image_format)
+            os.replace(partial_path, resized_path)
+
+            resized_paths.append(resized_path)
+
+    return tuple(resized_paths)
+
+
+class ResizePool:
+    """
+    Resizes images in a pool of worker processes (by default one per available core).
+    Should be used as an async context manager so the worker processes are shut down
+    afterwards:
+
+        async with ResizePool(sizes) as pool:
+            resized_paths = await pool.resize(path)
+    """
+
+    def __init__(self, sizes: Sequence[ImageSize], max_workers: int | None = None):
+        self.sizes = tuple(sizes)
+        self.executor = ProcessPoolExecutor(max_workers=max_workers or get_cpu_count())
+
+    async def resize(self, path: Path) -> tuple[Path, ...]:
+        """Resizes the image at ``path`` in a worker process"""
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(self.executor, resize_image, path, self.sizes)
+
+    async def __aenter__(self) -> ResizePool:
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self.executor.shutdown(wait=True)
+
+
+def get_cpu_count() -> int:
+    """
+    Returns the number of cores this process may run on
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+
+    return os.cpu_count() or 1
@@ -0,0 +1,245 @@
+"""
+Module which holds `ResultSet`, a compact columnar container for large numbers of
+search results.
+"""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, overload
+
+from .image import ImageSearchResult
+
+if TYPE_CHECKING:
+    import pyarrow
+
+#: Stored in integer columns in place of ``None``
+MISSING = -1
+
+
+class StringColumn:
+    """
+    Column of strings which are stored UTF-8 encoded and back to back in one shared
+    buffer; ``offsets`` holds where each of them starts and ends.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array("q", (0,))
+        self.valid = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def __getitem__(self, idx: int) -> str | None:
+        if not self.valid[idx]:
+            return None
+
+        return self.data[self.offsets[idx] : self.offsets[idx + 1]].decode()
+
+    def append(self, value: str | None) -> None:
+        if value is not None:
+            self.data += value.encode()
+        self.offsets.append(len(self.data))
+        self.valid.append(value is not None)
+
+
+class DictionaryColumn:
+    """
+    Column of strings which repeat a lot (e.g. backend names). Each distinct string is
+    only stored once and the column holds their ``codes``.
+    """
+
+    def __init__(self):
+        self.values: list[str] = []
+        self.codes = array("i")
+        self._codes_by_value: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, idx: int) -> str | None:
+        code = self.codes[idx]
+
+        return self.values[code] if code != MISSING else None
+
+    def append(self, value: str | None) -> None:
+        if value is None:
+            self.codes.append(MISSING)
+            return
+
+        code = self._codes_by_value.get(value)
+        if code is None:
+            code = self._codes_by_value[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+
+class ResultSet(Sequence[ImageSearchResult]):
+    """
+    Holds search results column by column: widths and heights in integer arrays, URLs
+    and IDs in shared string buffers and backend names and queries only once each.
+    This takes up a fraction of the memory of the equivalent tuple of
+    `ImageSearchResult` objects, which it still behaves like.
+
+    Example:
+    >>> results = ResultSet([ImageSearchResult("https://example.com/1", 1, 2, "one")])
+    >>> results.append(ImageSearchResult("https://example.com/2", None, None, "one"))
+    >>> results[-1]
+    ImageSearchResult(url='https://example.com/2', width=None, height=None, \
+search_backend='one', query=None, id=None)
+    >>> [result.width for result in results]
+    [1, None]
+    """
+
+    def __init__(self, results: Iterable[ImageSearchResult] = ()):
+        self.urls = StringColumn()
+        self.widths = array("q")
+        self.heights = array("q")
+        self.search_backends = DictionaryColumn()
+        self.queries = DictionaryColumn()
+        self.ids = StringColumn()
+        self.extend(results)
+
+    def __len__(self) -> int:
+        return len(self.widths)
+
+    @overload
+    def __getitem__(self, idx: int) -> ImageSearchResult:
+        ...
+
+    @overload
+    def __getitem__(self, idx: slice) -> ResultSet:
+        ...
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return ResultSet(self._get(pos) for pos in range(*idx.indices(len(self))))
+
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("ResultSet index out of range")
+
+        return self._get(idx)
+
+    def __iter__(self) -> Iterator[ImageSearchResult]:
+        return (self._get(idx) for idx in range(len(self)))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (ResultSet, tuple, list)):
+            return NotImplemented
+
+        return len(self) == len(other) and all(
+            result == other_result for result, other_result in zip(self, other)
+        )
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f"<ResultSet of {len(self)} results>"
+
+    def _get(self, idx: int) -> ImageSearchResult:
+        width = self.widths[idx]
+        height = self.heights[idx]
+
+        return ImageSearchResult(
+            url=self.urls[idx],
+            width=width if width != MISSING else None,
+            height=height if height != MISSING else None,
+            search_backend=self.search_backends[idx],
+            query=self.queries[idx],
+            id=self.ids[idx],
+        )
+
+    def append(self, result: ImageSearchResult) -> None:
+        """
+        Adds ``result`` to the end of the set
+        """
+        self.urls.append(result.url)
+        self.widths.append(result.width if result.width is not None else MISSING)
+        self.heights.append(result.height if result.height is not None else MISSING)
+        self.search_backends.append(result.search_backend)
+        self.queries.append(result.query)
+        self.ids.append(result.id)
+
+    def extend(self, results: Iterable[ImageSearchResult]) -> None:
+        """
+        Adds all ``results`` to the end of the set
+        """
+        for result in results:
+            self.append(result)
+
+    def to_arrow(self) -> pyarrow.Table:
+        """
+        Converts the set into a `pyarrow.Table` with the same columns as
+        `ImageSearchResult`. The columns are handed to Arrow as whole buffers instead
+        of converting each result; backend names and queries become dictionary columns.
+
+        :raises ImportError: Raised when the optional "pyarrow" package is not installed
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+        except ImportError as exc:
+            raise ImportError(
+                "Exporting results requires the 'pyarrow' package "
+                "(pip install 'latz[arrow]')"
+            ) from exc
+
+        length = len(self)
+
+        def with_nulls(values: pyarrow.Array, nulls: pyarrow.Array) -> pyarrow.Array:
+            return pc.if_else(nulls, pa.scalar(None, values.type), values)
+
+        def integers(column: array, type: pyarrow.DataType) -> pyarrow.Array:
+            values = pa.Array.from_buffers(
+                type, len(column), [None, pa.py_buffer(column.tobytes())]
+            )
+
+            return with_nulls(values, pc.equal(values, MISSING))
+
+        def strings(column: StringColumn) -> pyarrow.Array:
+            values = pa.Array.from_buffers(
+                pa.large_string(),
+                length,
+                [
+                    None,
+                    pa.py_buffer(column.offsets.tobytes()),
+                    pa.py_buffer(bytes(column.data)),
+                ],
+            )
+            valid = pa.Array.from_buffers(
+                pa.uint8(), length, [None, pa.py_buffer(bytes(column.valid))]
+            )
+
+            return with_nulls(values, pc.equal(valid, 0))
+
+        def dictionary(column: DictionaryColumn) -> pyarrow.Array:
+            return pa.DictionaryArray.from_arrays(
+                integers(column.codes, pa.int32()), pa.array(column.values, pa.string())
+            )
+
+        return pa.table(
+            {
+                "url": strings(self.urls),
+                "width": integers(self.widths, pa.int64()),
+                "height": integers(self.heights, pa.int64()),
+                "search_backend": dictionary(self.search_backends),
+                "query": dictionary(self.queries),
+                "id": strings(self.ids),
+            }
+        )
+
+    def to_parquet(self, path: Path | str) -> None:
+        """
+        Writes the set to a Parquet file at ``path`` (see `to_arrow`)
+
+        :raises ImportError: Raised when the optional "pyarrow" package is not installed
+        """
+        table = self.to_arrow()
+
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path)
@@ -0,0 +1,578 @@
+"""
+Module which holds the search pipeline: running queries against the configured search
+backends (using the cache where possible) and displaying the results.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncGenerator, Awaitable, Callable, Iterable, Sequence
+from functools import partial
+from itertools import chain, islice
+from typing import Any, NamedTuple
+
+from rich.console import Console
+from rich.live import Live
+from rich.markup import escape
+
+from . import fetch, profiling
+from .events import EventDispatcher
+from .cache import SearchResultCache, get_cache_ttl, get_settings_hash
+from .image import ImageSearchResult, ResultIndex, deduplicate_results
+from .output import (
+    TABLE_FORMAT,
+    ResultWriter,
+    create_results_table,
+    display_failed_searches,
+    display_missed_searches,
+    display_results,
+)
+from .plugins import SearchBackendHook
+from .results import ResultSet
+
+
+class SearchJob(NamedTuple):
+    """
+    A single query that needs to be run against a single search backend
+    """
+
+    query: str
+    backend: SearchBackendHook
+
+
+def display_missed_jobs(
+    missed: Iterable[SearchJob], deadline: float, show_query: bool = False
+) -> None:
+    """
+    Reports the search jobs which did not finish before the ``deadline``
+    """
+    display_missed_searches(
+        ((job.backend.name, job.query) for job in missed), deadline, show_query
+    )
+
+
+def display_failed_jobs(failed: Iterable[SearchJob], show_query: bool = False) -> None:
+    """
+    Reports the search jobs which failed
+    """
+    display_failed_searches(
+        ((job.backend.name, job.query) for job in failed), show_query
+    )
+
+
+class ResultCollector:
+    """
+    Collects the results of search jobs into a single `ResultSet` as the jobs finish,
+    applying ``limit`` to each job. Jobs which failed (``None``) are skipped.
+
+    Results are added in the order of the jobs no matter in which order they finish;
+    the results of a job that finishes early are only held back until the jobs before
+    it are done. Images returned more than once for the same query (e.g. by several
+    backends) are only kept the first time they appear; duplicates do not count
+    towards ``limit``.
+    """
+
+    def __init__(self, limit: int | None = None):
+        self.limit = limit
+        self.results = ResultSet()
+        self._index = ResultIndex(per_query=True)
+        self._pending: dict[int, Any] = {}
+        self._next = 0
+
+    def add(self, idx: int, results: Any) -> None:
+        """
+        Adds the ``results`` of job number ``idx`` (starting at 0)
+        """
+        self._pending[idx] = results
+
+        while self._next in self._pending:
+            self._append(self._pending.pop(self._next), self._index)
+            self._next += 1
+
+    def preview(self) -> Iterable[ImageSearchResult]:
+        """
+        Returns the results collected so far followed by the results which are still
+        held back, e.g. to display them before all jobs are done
+        """
+        if not self._pending:
+            return self.results
+
+        preview = ResultSet()
+        index = self._index.copy()
+        for idx in sorted(self._pending):
+            self._append(self._pending[idx], index, preview)
+
+        return chain(self.results, preview)
+
+    def close(self) -> ResultSet:
+        """
+        Adds the results which are still held back (because a job before them never
+        finished) and returns all collected results
+        """
+        for idx in sorted(self._pending):
+            self._append(self._pending.pop(idx), self._index)
+
+        return self.results
+
+    def _append(
+        self, results: Any, index: ResultIndex, result_set: ResultSet | None = None
+    ) -> None:
+        if results is not None:
+            result_set = result_set if result_set is not None else self.results
+            result_set.extend(islice(deduplicate_results(results, index), self.limit))
+
+
+def merge_results(results: Iterable[Any], limit: int | None = None) -> ResultSet:
+    """
+    Merges the per backend result tuples into a single `ResultSet` (see
+    `ResultCollector`)
+    """
+    collector = ResultCollector(limit)
+
+    for idx, res in enumerate(results):
+        collector.add(idx, res)
+
+    return collector.close()
+
+
+def get_search_jobs(
+    backends: Sequence[SearchBackendHook], queries: Sequence[str]
+) -> tuple[SearchJob, ...]:
+    """
+    Returns a job for every query and backend combination, ordered by query first
+    """
+    return tuple(SearchJob(query, backend) for query in queries for backend in backends)
+
+
+def is_paginated(backend: SearchBackendHook) -> bool:
+    """
+    Returns whether ``backend`` accepts ``limit`` and ``offset`` arguments
+    """
+    return backend.capabilities is not None and backend.capabilities.pagination
+
+
+def get_result_limit(backend: SearchBackendHook, limit: int | None) -> int | None:
+    """
+    Returns the number of results a search of ``backend`` asks for; ``None`` means all
+    of them. Backends with pagination return their ``default_page_size`` (if known)
+    when no ``limit`` is given.
+    """
+    if not is_paginated(backend):
+        return None
+
+    if limit is None:
+        return backend.capabilities.default_page_size  # type: ignore
+
+    return limit
+
+
+def get_unsupported_filters(
+    backend: SearchBackendHook, filters: Iterable[str]
+) -> tuple[str, ...]:
+    """
+    Returns the names of the ``filters`` that ``backend`` does not support
+    """
+    supported = backend.capabilities.filters if backend.capabilities else ()
+
+    return tuple(name for name in filters if name not in supported)
+
+
+def get_request_params(
+    backend: SearchBackendHook, offset: int = 0, filters: dict | None = None
+) -> dict:
+    """
+    Returns the keyword arguments (besides ``limit``) that ``backend.search`` is
+    called with. Backends which do not declare any capabilities receive none.
+    """
+    if backend.capabilities is None:
+        return {}
+
+    params = dict(filters or {})
+
+    if backend.capabilities.pagination:
+        params["offset"] = offset
+
+    return params
+
+
+def plan_requests(
+    backend: SearchBackendHook, limit: int | None, params: dict
+) -> tuple[dict, ...]:
+    """
+    Returns the keyword arguments of each ``backend.search`` call needed to get
+    ``limit`` results. Backends with pagination are asked for no more than ``limit``
+    results, split into requests of at most their ``max_page_size``.
+
+    Example:
+    >>> from latz.plugins import SearchBackendCapabilities
+    >>> capabilities = SearchBackendCapabilities(pagination=True, max_page_size=30)
+    >>> backend = SearchBackendHook("test", None, None, capabilities)
+    >>> plan_requests(backend, 70, {"offset": 10})
+    ({'offset': 10, 'limit': 30}, {'offset': 40, 'limit': 30}, {'offset': 70, 'limit': 10})
+    """
+    if not is_paginated(backend) or limit is None:
+        return (params,)
+
+    page_size = backend.capabilities.max_page_size or limit  # type: ignore
+
+    return tuple(
+        {
+            **params,
+            "offset": params["offset"] + start,
+            "limit": min(page_size, limit - start),
+        }
+        for start in range(0, limit, page_size)
+    )
+
+
+def combine_chunks(
+    chunks: Sequence[tuple[ImageSearchResult, ...] | None]
+) -> tuple[ImageSearchResult, ...] | None:
+    """
+    Combines the results of the requests a search was split into; ``None`` when all of
+    them failed
+    """
+    if chunks and all(chunk is None for chunk in chunks):
+        return None
+
+    return tuple(chain.from_iterable(chunk for chunk in chunks if chunk is not None))
+
+
+def apply_offset(
+    results: tuple[ImageSearchResult, ...] | None,
+    backend: SearchBackendHook,
+    offset: int,
+) -> tuple[ImageSearchResult, ...] | None:
+    """
+    Skips the first ``offset`` results of backends without pagination (backends with
+    pagination have already done this themselves)
+    """
+    if results is None or not offset or is_paginated(backend):
+        return results
+
+    return results[offset:]
+
+
+def tag_results(
+    results: tuple[ImageSearchResult, ...] | None, query: str
+) -> tuple[ImageSearchResult, ...] | None:
+    """
+    Sets ``query`` on each of the ``results``
+    """
+    if results is None:
+        return None
+
+    return tuple(result._replace(query=query) for result in results)
+
+
+def get_search_callable(
+    clients: fetch.ClientManager, config, job: SearchJob, kwargs: dict
+) -> Callable[[], Awaitable[Any]]:
+    """
+    Returns a callable running the search of ``job`` with the keyword arguments
+    ``kwargs``. The search is profiled and reported to ``clients.events``.
+    """
+    query, backend = job
+    search = profiling.timed(f"search.{backend.name}", backend.search)
+    search = clients.events.observe_search(backend.name, query, search)
+
+    return partial(search, clients.get_client(backend.name), config, query, **kwargs)
+
+
+async def iter_search_results(
+    clients: fetch.ClientManager,
+    config,
+    jobs: Sequence[SearchJob],
+    cache: SearchResultCache | None = None,
+    refresh: bool = False,
+    concurrency: int = 10,
+    deadline: float | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+    filters: dict | None = None,
+) -> AsyncGenerator[tuple[int, Any], None]:
+    """
+    Runs all search ``jobs`` and yields ``(index, results)`` pairs as soon as each job
+    is done; ``index`` is the position of the job in ``jobs``. Each backend receives its
+    own client from ``clients`` and at most ``concurrency`` requests run at the same
+    time. How many of these may run against the same backend is adapted to how well the
+    backend copes (see `fetch.ConcurrencyLimiter`).
+
+    Backends with pagination are only asked for the ``limit`` results starting at
+    ``offset`` (see `plan_requests`); the first ``offset`` results of other backends
+    are dropped. ``filters`` are passed on as keyword arguments; the backends of the
+    ``jobs`` need to support all of them.
+
+    Results found in ``cache`` are yielded first instead of querying the backend unless
+    ``refresh`` is set. Freshly retrieved results are written back to the ``cache``.
+
+    When ``deadline`` (in seconds) runs out before all backends have answered, the
+    outstanding searches are cancelled and `asyncio.TimeoutError` is raised.
+    """
+    backends = {job.backend.name: job.backend for job in jobs}
+    params = {
+        name: get_request_params(backend, offset, filters)
+        for name, backend in backends.items()
+    }
+    settings_hashes = {
+        name: get_settings_hash(
+            getattr(config.search_backend_settings, name, None), params[name]
+        )
+        for name in backends
+    }
+    backend_limits = {
+        name: get_result_limit(backend, limit) for name, backend in backends.items()
+    }
+
+    # Each job is split into one or more requests; chunks holds their results
+    requests: list[tuple[int, int, dict]] = []
+    chunks: dict[int, list] = {}
+
+    for idx, (query, backend) in enumerate(jobs):
+        cached = None
+        if cache is not None and not refresh:
+            cached = cache.get(
+                backend.name,
+                query,
+                settings_hashes[backend.name],
+                ttl=get_cache_ttl(config, backend.name),
+                limit=backend_limits[backend.name],
+            )
+            clients.events.emit(
+                "cache_lookup",
+                backend=backend.name,
+                query=query,
+                hit=cached is not None,
+            )
+        if cached is not None:
+            yield idx, tag_results(apply_offset(cached, backend, offset), query)
+            continue
+
+        planned = plan_requests(backend, limit, params[backend.name])
+        if not planned:
+            yield idx, ()
+            continue
+
+        chunks[idx] = [None] * len(planned)
+        requests.extend(
+            (idx, chunk_idx, kwargs) for chunk_idx, kwargs in enumerate(planned)
+        )
+
+    search_callables = (
+        get_search_callable(clients, config, jobs[idx], kwargs)
+        for idx, _, kwargs in requests
+    )
+    remaining = {idx: len(job_chunks) for idx, job_chunks in chunks.items()}
+
+    async for request_idx, result in fetch.iter_results(
+        search_callables, limit=concurrency, timeout=deadline
+    ):
+        idx, chunk_idx, _ = requests[request_idx]
+        chunks[idx][chunk_idx] = result
+        remaining[idx] -= 1
+
+        if remaining[idx]:
+            continue
+
+        query, backend = jobs[idx]
+        job_chunks = chunks.pop(idx)
+        results = combine_chunks(job_chunks)
+
+        # Only complete results are cached
+        complete = all(chunk is not None for chunk in job_chunks)
+        if cache is not None and results is not None and complete:
+            result_limit = backend_limits[backend.name]
+
+            # We only know how many results we got, not how many were asked for
+            if result_limit is None and is_paginated(backend):
+                result_limit = len(results)
+
+            cache.set(
+                backend.name,
+                query,
+                settings_hashes[backend.name],
+                results,
+                limit=result_limit,
+            )
+
+        yield idx, tag_results(apply_offset(results, backend, offset), query)
+
+
+async def collect_search_results(
+    clients: fetch.ClientManager,
+    config,
+    jobs: Sequence[SearchJob],
+    on_result: Callable[[int, Any], Any],
+    **kwargs,
+) -> tuple[tuple[SearchJob, ...], tuple[SearchJob, ...]]:
+    """
+    Runs all search ``jobs`` and calls ``on_result`` with the index of each job and its
+    results (``None`` when it failed) as soon as the job is done (e.g. the ``add``
+    method of a `ResultCollector`). Returns the jobs that missed the deadline and the
+    jobs that failed.
+
+    Accepts the same keyword arguments as `iter_search_results`.
+    """
+    done = set()
+    failed = set()
+    search_results = iter_search_results(clients, config, jobs, **kwargs)
+
+    try:
+        async for idx, result in search_results:
+            done.add(idx)
+            if result is None:
+                failed.add(idx)
+            on_result(idx, result)
+    except asyncio.TimeoutError:
+        if kwargs.get("deadline") is None:
+            raise
+    finally:
+        # Cancels outstanding searches when ``on_result`` raises
+        await search_results.aclose()
+
+    return (
+        tuple(job for idx, job in enumerate(jobs) if idx not in done),
+        tuple(job for idx, job in enumerate(jobs) if idx in failed),
+    )
+
+
+async def get_search_results(
+    clients: fetch.ClientManager,
+    config,
+    jobs: Sequence[SearchJob],
+    limit: int | None = None,
+    **kwargs,
+) -> ResultSet:
+    """
+    Runs all search ``jobs`` and returns the merged results once all of them are done
+    (or the deadline has passed). Accepts the same keyword arguments as
+    `iter_search_results`.
+    """
+    collector = ResultCollector(limit)
+    await collect_search_results(
+        clients, config, jobs, on_result=collector.add, limit=limit, **kwargs
+    )
+
+    return collector.close()
+
+
+def filter_backends(
+    backends: Sequence[SearchBackendHook], filters: dict
+) -> tuple[SearchBackendHook, ...]:
+    """
+    Returns the ``backends`` which support all ``filters`` and warns about the others
+    """
+    console = Console(stderr=True)
+    supported = []
+
+    for backend in backends:
+        unsupported = get_unsupported_filters(backend, filters)
+        if unsupported:
+            console.print(
+                f"[yellow]Skipping {escape(backend.name)}; it does not support the "
+                f"filters: {escape(', '.join(unsupported))}[/yellow]"
+            )
+        else:
+            supported.append(backend)
+
+    return tuple(supported)
+
+
+async def main(
+    config,
+    backends: Sequence[SearchBackendHook],
+    queries: Sequence[str],
+    limit: int | None = None,
+    cache: SearchResultCache | None = None,
+    refresh: bool = False,
+    stream: bool = False,
+    concurrency: int | None = None,
+    deadline: float | None = None,
+    offset: int = 0,
+    filters: dict | None = None,
+    output_format: str = TABLE_FORMAT,
+    events: EventDispatcher | None = None,
+):
+    """
+    Main async coroutine that runs all the currently configured search functions
+    for each of the ``queries`` and prints the output.
+
+    Unless ``output_format`` is the default rich table, the results of each backend
+    are written (see `ResultWriter`) as soon as it has answered, so they are not
+    ordered by backend.
+
+    Searches, requests and cache lookups are reported to ``events``.
+
+    Results start at ``offset`` and are narrowed down by ``filters``; backends which
+    do not support all of the ``filters`` are skipped with a warning.
+
+    When ``stream`` is set, the results table is redrawn as each backend finishes
+    instead of once all backends are done. Rows are always ordered by query and then
+    by backend (in the order they are configured), so the final table does not depend
+    on timing.
+
+    When ``deadline`` (or the ``search_deadline`` setting) is set, backends which have
+    not answered within that many seconds are cancelled and reported; the results
+    that did arrive are still shown. Searches which fail are reported as well.
+    """
+    if filters:
+        backends = filter_backends(backends, filters)
+
+    jobs = get_search_jobs(backends, queries)
+    show_query = len(queries) > 1
+    deadline = deadline or config.search_deadline
+    kwargs: dict[str, Any] = dict(
+        cache=cache,
+        refresh=refresh,
+        concurrency=concurrency or config.max_concurrency,
+        deadline=deadline,
+        limit=limit,
+        offset=offset,
+        filters=filters,
+    )
+
+    async with fetch.ClientManager(config, events=events) as clients:
+        if output_format != TABLE_FORMAT:
+            writer = ResultWriter(output_format)
+            index = ResultIndex(per_query=True)
+
+            def write_results(idx: int, results: Any) -> None:
+                if results is not None:
+                    with profiling.span("render"):
+                        writer.write(islice(deduplicate_results(results, index), limit))
+
+            with profiling.span("search"):
+                missed, failed = await collect_search_results(
+                    clients, config, jobs, on_result=write_results, **kwargs
+                )
+            writer.close()
+        elif not stream:
+            collector = ResultCollector(limit)
+            with profiling.span("search"):
+                missed, failed = await collect_search_results(
+                    clients, config, jobs, on_result=collector.add, **kwargs
+                )
+            display_results(collector.close(), show_query=show_query)
+        else:
+            collector = ResultCollector(limit)
+            with Live(
+                create_results_table((), show_query), console=Console()
+            ) as live, profiling.span("search"):
+
+                def update_table(idx: int, results: Any) -> None:
+                    collector.add(idx, results)
+                    with profiling.span("render"):
+                        live.update(
+                            create_results_table(
+                                collector.preview(), show_query=show_query
+                            )
+                        )
+
+                missed, failed = await collect_search_results(
+                    clients, config, jobs, on_result=update_table, **kwargs
+                )
+
+    if missed and deadline is not None:
+        display_missed_jobs(missed, deadline, show_query=show_query)
+
+    if failed:
+        display_failed_jobs(failed, show_query=show_query)
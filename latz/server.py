@@ -0,0 +1,583 @@
+"""
+Module which holds the long-running JSON HTTP API started by ``latz serve``. The plugins,
+configuration and connection pool are set up once and shared by all requests, so each
+search only costs the time the search backends take to answer.
+
+Endpoints:
+
+- ``GET /health``
+- ``POST /search`` with a JSON object holding ``queries`` (or ``query``), ``limit``,
+  ``offset``, ``filters``, ``concurrency``, ``cache``, ``refresh`` and ``deadline``
+- ``POST /download`` with a JSON object holding ``query`` (or saved ``results``),
+  ``limit`` and ``output_dir`` (which has to be inside the server's download directory)
+
+Request bodies have to be sent with the ``application/json`` content type. Browsers do not
+send that type across origins without asking first, so web pages cannot make the server
+search (and use up the search backends' rate limits) on their own; for the same reason
+searches cannot be sent as ``GET`` requests.
+
+The API is served over TCP (``latz serve``) or a Unix domain socket (``latz serve
+--daemon``, see `latz.daemon`).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+from collections.abc import Awaitable, Callable, Sequence
+from contextlib import suppress
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, NamedTuple
+from urllib.parse import urlsplit
+
+from . import fetch
+from .cache import SearchResultCache
+from .config import get_config_sources_state
+from .daemon import get_config_environment
+from .download import DOWNLOAD_CLIENT_NAME, download_images, parse_results
+from .events import EventDispatcher
+from .image import deduplicate_results
+from .plugins import SearchBackendHook
+from .search import (
+    ResultCollector,
+    collect_search_results,
+    get_search_jobs,
+    get_unsupported_filters,
+)
+
+logger = logging.getLogger(__name__)
+
+#: Largest request body accepted (in bytes)
+MAX_BODY_SIZE = 1024 * 1024
+
+#: Largest number of header lines accepted per request
+MAX_HEADERS = 100
+
+#: Seconds an idle connection is kept open
+KEEP_ALIVE_TIMEOUT = 60.0
+
+
+class Request(NamedTuple):
+    """
+    A parsed HTTP request
+    """
+
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes
+    keep_alive: bool
+
+    def json(self) -> dict:
+        """
+        Returns the body parsed as a JSON object (empty when there is no body)
+
+        :raises RequestError: Raised when the body is not a JSON object or not sent as
+                              ``application/json``
+        """
+        content_type = self.headers.get("content-type", "").split(";")[0].strip()
+        if content_type.lower() != "application/json":
+            raise RequestError(
+                HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                "Content-Type must be application/json",
+            )
+
+        if not self.body:
+            return {}
+
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON")
+
+        if not isinstance(data, dict):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+
+        return data
+
+
+class RequestError(Exception):
+    """
+    Raised while handling a request to answer it with an error response
+    """
+
+    def __init__(self, status: HTTPStatus, message: str):
+        self.status = status
+        self.message = message
+
+
+class SearchParams(NamedTuple):
+    """
+    Parameters of a search request
+    """
+
+    queries: tuple[str, ...]
+    limit: int | None = None
+    offset: int = 0
+    filters: dict[str, str] = {}
+    concurrency: int | None = None
+    cache: bool = True
+    refresh: bool = False
+    deadline: float | None = None
+    #: Environment variables of the client which may change the configuration
+    environment: dict[str, str] | None = None
+
+
+async def read_request(reader: asyncio.StreamReader) -> Request | None:
+    """
+    Reads the next request from ``reader``; ``None`` once the client has closed the
+    connection.
+
+    :raises RequestError: Raised when the request is malformed or too large
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+    headers: dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise RequestError(
+                HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers"
+            )
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        content_length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+
+    if content_length > MAX_BODY_SIZE:
+        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body is too large")
+
+    body = await reader.readexactly(content_length) if content_length > 0 else b""
+    connection = headers.get("connection", "").lower()
+    keep_alive = (
+        connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    )
+    return Request(method.upper(), urlsplit(target).path, headers, body, keep_alive)
+
+
+def write_response(
+    writer: asyncio.StreamWriter, status: HTTPStatus, data: Any, keep_alive: bool
+) -> None:
+    """
+    Writes a JSON response holding ``data``
+    """
+    body = json.dumps(data).encode()
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+
+def get_int(value: Any, name: str, minimum: int = 0) -> int | None:
+    """
+    Parses the optional integer parameter ``name``
+
+    :raises RequestError: Raised when ``value`` is not an integer of at least ``minimum``
+    """
+    if value is None:
+        return None
+
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer")
+
+    if number < minimum or isinstance(value, bool):
+        raise RequestError(
+            HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer >= {minimum}"
+        )
+
+    return number
+
+
+def get_search_params(request: Request) -> SearchParams:
+    """
+    Reads the search parameters from the JSON body of ``request``
+
+    :raises RequestError: Raised when the parameters are invalid
+    """
+    data = request.json()
+    if "query" in data:
+        data["queries"] = [data["query"]]
+
+    queries = data.get("queries")
+    if (
+        not isinstance(queries, list)
+        or not queries
+        or not all(isinstance(query, str) and query for query in queries)
+    ):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "At least one query is required")
+
+    filters = data.get("filters") or {}
+    if not isinstance(filters, dict):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "'filters' must be an object")
+
+    deadline: float | None = None
+    if data.get("deadline") is not None:
+        try:
+            deadline = float(data["deadline"])
+        except (TypeError, ValueError):
+            deadline = 0
+        if deadline <= 0:
+            raise RequestError(
+                HTTPStatus.BAD_REQUEST, "'deadline' must be a number > 0"
+            )
+
+    environment = data.get("environment")
+    if environment is not None and not isinstance(environment, dict):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "'environment' must be an object")
+
+    return SearchParams(
+        queries=tuple(queries),
+        limit=get_int(data.get("limit"), "limit"),
+        offset=get_int(data.get("offset"), "offset") or 0,
+        filters={name: str(value) for name, value in filters.items()},
+        concurrency=get_int(data.get("concurrency"), "concurrency", minimum=1),
+        cache=data.get("cache", True) is not False,
+        refresh=bool(data.get("refresh")),
+        deadline=deadline,
+        environment=environment,
+    )
+
+
+class SearchServer:
+    """
+    JSON HTTP API for searching with the configured ``backends`` (and downloading the
+    images found). All requests share one `fetch.ClientManager`, so connections to the
+    search backends are kept open between requests.
+
+    Searches are refused with "409 Conflict" once the ``config_files`` have changed or
+    when the client sends environment variables which differ from ours, as ``config``
+    would then be out of date.
+
+    Images are only downloaded into ``download_dir`` (or one of its subdirectories).
+
+    Usage:
+
+        server = SearchServer(config, backends)
+        await server.serve("127.0.0.1", 8080)
+    """
+
+    def __init__(
+        self,
+        config,
+        backends: Sequence[SearchBackendHook],
+        cache: SearchResultCache | None = None,
+        events: EventDispatcher | None = None,
+        config_files: Sequence[Path] = (),
+        download_dir: Path = Path("."),
+    ):
+        self.config = config
+        self.backends = tuple(backends)
+        self.cache = cache
+        self.events = events
+        self.config_files = tuple(config_files)
+        self.config_files_state, _ = get_config_sources_state(self.config_files)
+        self.download_dir = download_dir
+        self.environment = get_config_environment()
+        self.socket_path: Path | None = None
+        self.clients: fetch.ClientManager | None = None
+        self.server: asyncio.AbstractServer | None = None
+        self.routes: dict[tuple[str, str], Callable[[Request], Awaitable[Any]]] = {
+            ("GET", "/health"): self.health,
+            ("POST", "/search"): self.search,
+            ("POST", "/download"): self.download,
+        }
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        """
+        Starts listening on ``host`` and ``port`` (0 picks a free one)
+        """
+        self.clients = fetch.ClientManager(self.config, events=self.events)
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+
+        return self.server
+
+    async def start_unix(self, path: Path) -> asyncio.AbstractServer:
+        """
+        Starts listening on the Unix domain socket ``path``, which only the current
+        user may connect to. A socket left behind by a daemon which is no longer
+        running is replaced.
+
+        :raises OSError: Raised when another daemon is already listening on ``path``
+        """
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+        if path.exists():
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                try:
+                    sock.connect(str(path))
+                except OSError:
+                    path.unlink()
+                else:
+                    raise OSError(f"Another daemon is already listening on {path}")
+
+        self.clients = fetch.ClientManager(self.config, events=self.events)
+
+        # The socket is created with these permissions, so others can never connect
+        umask = os.umask(0o077)
+        try:
+            self.server = await asyncio.start_unix_server(
+                self.handle_connection, str(path)
+            )
+        finally:
+            os.umask(umask)
+        self.socket_path = path
+
+        return self.server
+
+    async def aclose(self) -> None:
+        """
+        Stops listening and closes the connection pool
+        """
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+        if self.socket_path is not None:
+            with suppress(FileNotFoundError):
+                self.socket_path.unlink()
+            self.socket_path = None
+
+        if self.clients is not None:
+            await self.clients.aclose()
+            self.clients = None
+
+    async def serve(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        on_ready: Callable[[asyncio.AbstractServer], Any] | None = None,
+        socket_path: Path | None = None,
+    ) -> None:
+        """
+        Serves requests on ``host`` and ``port`` (or the Unix domain socket
+        ``socket_path`` when given) until cancelled or terminated (SIGTERM)
+        """
+        if socket_path is not None:
+            server = await self.start_unix(socket_path)
+        else:
+            server = await self.start(host, port)
+
+        terminated = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        # Signal handlers are only supported on Unix and in the main thread
+        with suppress(NotImplementedError, RuntimeError, ValueError):
+            loop.add_signal_handler(signal.SIGTERM, terminated.set)
+
+        try:
+            if on_ready is not None:
+                on_ready(server)
+            await terminated.wait()
+        finally:
+            with suppress(NotImplementedError, RuntimeError, ValueError):
+                loop.remove_signal_handler(signal.SIGTERM)
+            await self.aclose()
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Answers the requests sent over a single connection
+        """
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(
+                        read_request(reader), KEEP_ALIVE_TIMEOUT
+                    )
+                except RequestError as exc:
+                    write_response(writer, exc.status, {"error": exc.message}, False)
+                    await writer.drain()
+                    break
+
+                if request is None:
+                    break
+
+                status, data = await self.handle_request(request)
+                write_response(writer, status, data, request.keep_alive)
+                await writer.drain()
+
+                if not request.keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def handle_request(self, request: Request) -> tuple[HTTPStatus, Any]:
+        """
+        Routes ``request`` to its handler and returns the status and data to respond with
+        """
+        handler = self.routes.get((request.method, request.path))
+
+        if handler is None:
+            if any(path == request.path for _, path in self.routes):
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Method not allowed"}
+            return HTTPStatus.NOT_FOUND, {"error": "Not found"}
+
+        try:
+            return HTTPStatus.OK, await handler(request)
+        except RequestError as exc:
+            return exc.status, {"error": exc.message}
+        except Exception as exc:
+            logger.exception(f"Error while handling {request.method} {request.path}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(exc)}
+
+    async def health(self, request: Request) -> dict:
+        return {
+            "status": "ok",
+            "search_backends": [backend.name for backend in self.backends],
+        }
+
+    async def search(self, request: Request) -> dict:
+        """
+        Searches all backends for each of the queries. Backends which do not support
+        all of the filters are skipped and listed under "skipped"; searches which missed
+        the deadline are listed under "missed" and searches which failed under "failed".
+        The results of all other searches are returned either way.
+        """
+        params = get_search_params(request)
+        self.check_config(params)
+        backends = [
+            backend
+            for backend in self.backends
+            if not get_unsupported_filters(backend, params.filters)
+        ]
+        results, missed, failed = await self.run_search(params, backends)
+
+        return {
+            "deadline": params.deadline or self.config.search_deadline,
+            "results": [result._asdict() for result in results],
+            "missed": [
+                {"backend": job.backend.name, "query": job.query} for job in missed
+            ],
+            "failed": [
+                {"backend": job.backend.name, "query": job.query} for job in failed
+            ],
+            "skipped": [
+                backend.name for backend in self.backends if backend not in backends
+            ],
+        }
+
+    def check_config(self, params: SearchParams) -> None:
+        """
+        :raises RequestError: Raised when our configuration may be out of date
+        """
+        files_state, _ = get_config_sources_state(self.config_files)
+        environment_changed = (
+            params.environment is not None and params.environment != self.environment
+        )
+
+        if files_state != self.config_files_state or environment_changed:
+            raise RequestError(
+                HTTPStatus.CONFLICT,
+                "The configuration has changed since the server was started",
+            )
+
+    async def download(self, request: Request) -> dict:
+        """
+        Downloads the images found for "query" (or the saved "results") into
+        "output_dir" on the machine the server runs on (see `get_output_dir`)
+        """
+        data = request.json()
+        limit = get_int(data.get("limit"), "limit")
+        output_dir = self.get_output_dir(data.get("output_dir"))
+
+        if isinstance(data.get("results"), list):
+            results: Sequence = parse_results(data["results"])[:limit]
+        elif isinstance(data.get("query"), str) and data["query"]:
+            results, _, _ = await self.run_search(
+                SearchParams(queries=(data["query"],), limit=limit), self.backends
+            )
+        else:
+            raise RequestError(
+                HTTPStatus.BAD_REQUEST, "Either 'query' or 'results' is required"
+            )
+
+        assert self.clients is not None
+        saved = []
+        failed = []
+
+        async for download_result in download_images(
+            self.clients.get_client(DOWNLOAD_CLIENT_NAME),
+            deduplicate_results(results),
+            output_dir,
+            concurrency=self.config.max_concurrency,
+        ):
+            if download_result.error is None:
+                saved.append(str(download_result.path))
+            else:
+                failed.append(
+                    {"url": download_result.result.url, "error": download_result.error}
+                )
+
+        return {"saved": saved, "failed": failed}
+
+    def get_output_dir(self, value: Any) -> Path:
+        """
+        Returns the directory the "output_dir" ``value`` of a download request points
+        to. Relative paths are relative to ``download_dir``.
+
+        :raises RequestError: Raised when the directory is not inside ``download_dir``
+        """
+        if value is not None and not isinstance(value, str):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "'output_dir' must be a string")
+
+        download_dir = self.download_dir.resolve()
+        output_dir = (download_dir / (value or ".")).resolve()
+
+        try:
+            output_dir.relative_to(download_dir)
+        except ValueError:
+            raise RequestError(
+                HTTPStatus.FORBIDDEN,
+                "'output_dir' must be inside the download directory of the server",
+            )
+
+        return output_dir
+
+    async def run_search(
+        self, params: SearchParams, backends: Sequence[SearchBackendHook]
+    ) -> tuple[Sequence, tuple, tuple]:
+        assert self.clients is not None
+        collector = ResultCollector(params.limit)
+        missed, failed = await collect_search_results(
+            self.clients,
+            self.config,
+            get_search_jobs(backends, params.queries),
+            on_result=collector.add,
+            cache=self.cache if params.cache else None,
+            refresh=params.refresh,
+            concurrency=params.concurrency or self.config.max_concurrency,
+            deadline=params.deadline or self.config.search_deadline,
+            limit=params.limit,
+            offset=params.offset,
+            filters=params.filters,
+        )
+
+        return collector.close(), missed, failed
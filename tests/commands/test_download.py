@@ -0,0 +1,144 @@
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+from PIL import Image
+from click.testing import CliRunner
+
+from latz.cli import cli
+from latz.download import download_image, get_file_stem
+from latz.resize import ResizePool
+from latz.image import ImageSearchResult
+
+COMMAND = "download"
+
+IMAGE_BODY = b"\xff\xd8" + b"image-data" * 1000
+
+
+def image_handler(request: httpx.Request) -> httpx.Response:
+    """Serves ``IMAGE_BODY`` for every request and honors "Range" headers"""
+    range_header = request.headers.get("Range")
+
+    if range_header:
+        start = int(range_header.removeprefix("bytes=").rstrip("-"))
+        if start >= len(IMAGE_BODY):
+            return httpx.Response(416)
+        return httpx.Response(
+            206, content=IMAGE_BODY[start:], headers={"Content-Type": "image/jpeg"}
+        )
+
+    return httpx.Response(
+        200, content=IMAGE_BODY, headers={"Content-Type": "image/jpeg"}
+    )
+
+
+@pytest.fixture
+def mock_transport(mocker):
+    """Replaces the shared connection pool with one serving ``IMAGE_BODY``"""
+    return mocker.patch(
+        "latz.fetch.get_transport", return_value=httpx.MockTransport(image_handler)
+    )
+
+
+def test_download_command_happy_path(
+    runner: tuple[CliRunner, Path], mock_transport, tmp_path: Path
+):
+    """
+    Tests a successful run of the ``download`` command.
+    """
+    cmd_runner, _ = runner
+    output_dir = tmp_path / "images"
+    result = cmd_runner.invoke(
+        cli, [COMMAND, "search_term", "--output-dir", str(output_dir), "--limit", "2"]
+    )
+
+    assert result.exit_code == 0
+
+    images = sorted(output_dir.iterdir())
+
+    assert len(images) == 2
+    assert all(image.read_bytes() == IMAGE_BODY for image in images)
+    assert all(image.suffix == ".jpg" for image in images)
+
+
+def test_download_command_saved_results(
+    runner: tuple[CliRunner, Path], mock_transport, tmp_path: Path
+):
+    """
+    Saved results can be passed in as newline delimited JSON.
+    """
+    cmd_runner, _ = runner
+    output_dir = tmp_path / "images"
+    saved_results = "\n".join(
+        json.dumps({"url": f"https://example.com/{idx}", "search_backend": "test"})
+        for idx in range(3)
+    )
+
+    result = cmd_runner.invoke(
+        cli,
+        [COMMAND, "--results", "-", "--output-dir", str(output_dir)],
+        input=saved_results,
+    )
+
+    assert result.exit_code == 0
+    assert len(tuple(output_dir.iterdir())) == 3
+
+
+def test_download_command_resize_errors(
+    runner: tuple[CliRunner, Path], mock_transport, mocker, tmp_path: Path
+):
+    """
+    An image which cannot be resized is reported as failed without stopping the
+    other downloads and resizes.
+    """
+    cmd_runner, _ = runner
+    output_dir = tmp_path / "images"
+    resized = []
+
+    async def resize(self, path: Path) -> tuple[Path, ...]:
+        if not resized:
+            resized.append(path)
+            raise Image.DecompressionBombError("Image size exceeds limit")
+        resized.append(path)
+        return (path.with_name(f"{path.stem}-small{path.suffix}"),)
+
+    mocker.patch.object(ResizePool, "resize", resize)
+
+    result = cmd_runner.invoke(
+        cli,
+        [COMMAND, "search_term", "--output-dir", str(output_dir), "--size", "10x10"],
+    )
+
+    assert result.exit_code == 1
+    assert len(tuple(output_dir.iterdir())) == 3
+    assert len(resized) == 3
+    assert result.output.count("Resized") == 2
+    assert result.output.count("Failed to resize") == 1
+    assert "Image size exceeds limit" in result.output
+
+
+def test_download_resumes_partial_files(tmp_path: Path):
+    """
+    Partially downloaded files should be completed with a range request.
+    """
+    result = ImageSearchResult("https://example.com/1", 1, 1, "test")
+    partial_file = tmp_path / f"{get_file_stem(result)}.part"
+    partial_file.write_bytes(IMAGE_BODY[:100])
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return image_handler(request)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await download_image(client, result, tmp_path)
+
+    download_result = asyncio.run(run())
+
+    assert download_result.error is None
+    assert download_result.path.read_bytes() == IMAGE_BODY
+    assert requests[0].headers["Range"] == "bytes=100-"
+    assert not partial_file.exists()
@@ -1,8 +1,16 @@
+import asyncio
+import json
+import time
 from pathlib import Path
 
+import pytest
 from click.testing import CliRunner
 
 from latz.cli import cli
+from latz.exceptions import SearchBackendError
+from latz.search import ResultCollector, merge_results
+from latz.image import ImageSearchResult
+from latz.plugins.image import placeholder
 
 COMMAND = "search"
 
@@ -29,3 +37,291 @@ def test_get_command_error_on_no_search_term(runner: tuple[CliRunner, Path]):
     result = cmd_runner.invoke(cli, [COMMAND])
 
     assert result.exit_code == 2
+
+
+def test_get_command_negative_limit(runner: tuple[CliRunner, Path]):
+    """
+    A negative ``--limit`` is rejected as a usage error instead of failing while merging
+    the results.
+    """
+    cmd_runner, _ = runner
+    result = cmd_runner.invoke(cli, [COMMAND, "search_term", "--limit", "-1"])
+
+    assert result.exit_code == 2
+
+
+def test_get_command_uses_cache(runner: tuple[CliRunner, Path], mocker):
+    """
+    Running the same search twice should only query the backend once unless the
+    cache is bypassed with ``--refresh`` or ``--no-cache``.
+    """
+    cmd_runner, _ = runner
+    search = mocker.spy(placeholder, "search")
+
+    for args in ([], [], ["--refresh"], [], ["--no-cache"]):
+        result = cmd_runner.invoke(cli, [COMMAND, "search_term", *args])
+
+        assert result.exit_code == 0
+        assert "https://placekitten.com/200/300" in result.stdout
+
+    assert search.call_count == 3
+
+
+def test_get_command_cache_limit(runner: tuple[CliRunner, Path], mocker):
+    """
+    Results cached for a search without ``--limit`` do not answer a later search asking
+    for more results than the backend returned by default.
+    """
+    cmd_runner, config_file = runner
+    config_file.write_text(json.dumps({"search_backends": ["unsplash"]}))
+
+    def get_results(limit: int, offset: int = 0) -> list[ImageSearchResult]:
+        return [
+            ImageSearchResult(f"https://example.com/{idx}", 1, 1, "unsplash")
+            for idx in range(offset, offset + limit)
+        ]
+
+    get = mocker.patch("latz.plugins.image.unsplash._get", return_value=get_results(10))
+    get_pages = mocker.patch(
+        "latz.plugins.image.unsplash._get_pages",
+        side_effect=lambda client, url, query, limit, offset, **kwargs: get_results(
+            limit, offset
+        ),
+    )
+
+    for args, count in (([], 10), (["--limit", "70"], 70), (["--limit", "5"], 5)):
+        result = cmd_runner.invoke(
+            cli, [COMMAND, "search_term", "--format", "ndjson", *args]
+        )
+
+        assert result.exit_code == 0
+        assert len(result.stdout.splitlines()) == count
+
+    assert get.call_count == 1
+    assert get_pages.call_count == 3
+
+
+def test_get_command_stream(runner: tuple[CliRunner, Path]):
+    """
+    Streaming mode should end up displaying the same results as the default mode.
+    """
+    cmd_runner, _ = runner
+    result = cmd_runner.invoke(cli, [COMMAND, "search_term", "--stream", "--limit", "2"])
+
+    assert result.exit_code == 0
+
+    assert "https://placekitten.com/200/300" in result.stdout
+    assert "https://placekitten.com/600/500" in result.stdout
+    assert "https://placekitten.com/1000/800" not in result.stdout
+
+
+def test_get_command_queries_file(runner: tuple[CliRunner, Path], tmp_path: Path):
+    """
+    Queries can be read from a file or from stdin; results are tagged with their query.
+    """
+    cmd_runner, _ = runner
+    queries_file = tmp_path / "queries.txt"
+    queries_file.write_text("cats\n\ndogs\n")
+
+    result = cmd_runner.invoke(cli, [COMMAND, "--queries-file", str(queries_file)])
+
+    assert result.exit_code == 0
+    assert "Query" in result.stdout
+    assert "cats" in result.stdout
+    assert "dogs" in result.stdout
+    assert result.stdout.count("https://placekitten.com/200/300") == 2
+
+    result = cmd_runner.invoke(
+        cli, [COMMAND, "--queries-file", "-", "--limit", "1"], input="cats\ndogs\n"
+    )
+
+    assert result.exit_code == 0
+    assert result.stdout.count("https://placekitten.com/200/300") == 2
+    assert "https://placekitten.com/600/500" not in result.stdout
+
+
+def test_get_command_query_and_queries_file(runner: tuple[CliRunner, Path]):
+    """
+    Passing both a query and a queries file is a usage error.
+    """
+    cmd_runner, _ = runner
+    result = cmd_runner.invoke(
+        cli, [COMMAND, "cats", "--queries-file", "-"], input="dogs\n"
+    )
+
+    assert result.exit_code == 2
+
+
+def test_merge_results_removes_duplicates():
+    """
+    Images returned by several backends for the same query should only be shown once
+    and duplicates should not count towards the limit.
+    """
+    one = (
+        ImageSearchResult("https://example.com/1", 1, 1, "one", "cats", id="a"),
+        ImageSearchResult("https://example.com/2", 1, 1, "one", "cats", id="b"),
+    )
+    two = (
+        ImageSearchResult("https://EXAMPLE.com/2/", 1, 1, "two", "cats", id="x"),
+        ImageSearchResult("https://example.com/3", 1, 1, "two", "cats", id="y"),
+        ImageSearchResult("https://example.com/4", 1, 1, "two", "cats", id="y"),
+    )
+    other_query = (
+        ImageSearchResult("https://example.com/1", 1, 1, "one", "dogs", id="a"),
+    )
+
+    merged = merge_results((one, None, two, other_query), limit=2)
+
+    assert tuple(result.url for result in merged) == (
+        "https://example.com/1",
+        "https://example.com/2",
+        "https://example.com/3",
+        "https://example.com/1",
+    )
+
+
+def test_result_collector_keeps_job_order():
+    """
+    Results are added in the order of the jobs no matter in which order they finish;
+    jobs which never finish do not hold back the ones after them.
+    """
+    one = (ImageSearchResult("https://example.com/1", 1, 1, "one", "cats"),)
+    two = (ImageSearchResult("https://example.com/1", 1, 1, "two", "cats"),)
+    three = (ImageSearchResult("https://example.com/3", 1, 1, "three", "cats"),)
+    collector = ResultCollector()
+
+    collector.add(2, three)
+    collector.add(1, two)
+
+    assert len(collector.results) == 0
+    assert [result.search_backend for result in collector.preview()] == [
+        "two",
+        "three",
+    ]
+
+    collector.add(0, one)
+
+    assert [result.search_backend for result in collector.results] == ["one", "three"]
+
+    collector = ResultCollector()
+    collector.add(1, two)
+
+    assert [result.search_backend for result in collector.close()] == ["two"]
+
+
+def test_get_command_deadline(runner: tuple[CliRunner, Path], mocker):
+    """
+    Backends which have not answered before the deadline are cancelled and reported
+    while the results of the other backends are still shown.
+    """
+    cmd_runner, config_file = runner
+    config_file.write_text(json.dumps({"search_backends": ["placeholder", "unsplash"]}))
+    mocker.patch(
+        "latz.plugins.image.unsplash._get",
+        return_value=[ImageSearchResult("https://example.com/1", 1, 1, "unsplash")],
+    )
+
+    async def slow_search(*args):
+        await asyncio.sleep(10)
+
+    mocker.patch.object(placeholder, "search", slow_search)
+
+    for args in (["--deadline", "0.2"], ["--deadline", "0.2", "--stream"]):
+        started = time.monotonic()
+        result = cmd_runner.invoke(cli, [COMMAND, "search_term", *args])
+
+        assert result.exit_code == 0
+        assert time.monotonic() - started < 5
+        assert "https://example.com/1" in result.output
+        assert "no results from: placeholder" in result.output
+
+
+def test_get_command_filter_and_offset(runner: tuple[CliRunner, Path], mocker):
+    """
+    Backends which do not support a filter are skipped; the offset and filters are
+    passed on to backends supporting them.
+    """
+    cmd_runner, config_file = runner
+    config_file.write_text(json.dumps({"search_backends": ["placeholder", "unsplash"]}))
+    get = mocker.patch(
+        "latz.plugins.image.unsplash._get",
+        return_value=[ImageSearchResult("https://example.com/1", 1, 1, "unsplash")],
+    )
+
+    result = cmd_runner.invoke(
+        cli,
+        [COMMAND, "search_term", "--offset", "10", "-l", "10", "-F", "color=red"],
+    )
+
+    assert result.exit_code == 0
+    assert "https://example.com/1" in result.stdout
+    assert "https://placekitten.com" not in result.stdout
+    assert "Skipping placeholder" in result.output
+    assert get.call_args.kwargs["params"] == {
+        "color": "red",
+        "page": 2,
+        "per_page": 10,
+    }
+
+    result = cmd_runner.invoke(cli, [COMMAND, "search_term", "-F", "color"])
+
+    assert result.exit_code == 2
+
+
+def test_get_command_format(runner: tuple[CliRunner, Path], mocker):
+    """
+    Machine readable formats are written without the rich table; a closed pipe stops
+    the search without an error.
+    """
+    cmd_runner, _ = runner
+    result = cmd_runner.invoke(cli, [COMMAND, "search_term", "--format", "ndjson"])
+
+    assert result.exit_code == 0
+    assert [json.loads(line)["url"] for line in result.stdout.splitlines()] == [
+        "https://placekitten.com/200/300",
+        "https://placekitten.com/600/500",
+        "https://placekitten.com/1000/800",
+    ]
+
+    mocker.patch("latz.output.ResultWriter.flush", side_effect=BrokenPipeError)
+    result = cmd_runner.invoke(cli, [COMMAND, "search_term", "--format", "csv"])
+
+    assert result.exit_code == 1
+    assert not isinstance(result.exception, BrokenPipeError)
+
+
+@pytest.mark.parametrize(
+    "error", (SearchBackendError("Service unavailable"), KeyError("results"))
+)
+def test_get_command_failed_search(runner: tuple[CliRunner, Path], mocker, error):
+    """
+    A failing search only loses the results of its own backend and query, even when it
+    fails with an unexpected error; the failed searches are reported.
+    """
+    cmd_runner, config_file = runner
+    config_file.write_text(json.dumps({"search_backends": ["placeholder", "unsplash"]}))
+
+    async def get(client, url, query, **kwargs):
+        if query == "dogs":
+            raise error
+        return [ImageSearchResult(f"https://example.com/{query}", 1, 1, "unsplash")]
+
+    mocker.patch("latz.plugins.image.unsplash._get", get)
+
+    result = cmd_runner.invoke(
+        cli,
+        [COMMAND, "--queries-file", "-", "--format", "ndjson"],
+        input="cats\ndogs\n",
+    )
+
+    assert result.exit_code == 0
+    # The runner mixes stderr (where failures are reported) into stdout
+    records = [
+        json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")
+    ]
+    assert {(record["search_backend"], record["query"]) for record in records} == {
+        ("placeholder", "cats"),
+        ("placeholder", "dogs"),
+        ("unsplash", "cats"),
+    }
+    assert 'no results from: unsplash ("dogs")' in result.output
@@ -4,6 +4,76 @@ import pytest
 from click.testing import CliRunner
 
 from latz.constants import CONFIG_FILE_NAME
+from latz.plugins import hookimpl, SearchBackendHook
+from latz.plugins.image.placeholder import PlaceholderBackendConfig, search
+
+
+class DummyPlugin:
+    """Plugin registering a search backend called "dummy" """
+
+    def __init__(self, name: str = "dummy"):
+        self.name = name
+        self.call_count = 0
+
+    @hookimpl
+    def search_backend(self):
+        self.call_count += 1
+        return SearchBackendHook(
+            name=self.name, search=search, config_fields=PlaceholderBackendConfig()
+        )
+
+
+@pytest.fixture
+def dummy_plugin() -> type[DummyPlugin]:
+    """Plugin class registering a search backend (called "dummy" by default)"""
+    return DummyPlugin
+
+
+@pytest.fixture(autouse=True)
+def search_cache_file(mocker, tmp_path):
+    """Keeps the search result cache out of the user's cache directory"""
+    cache_file = tmp_path / "search.sqlite"
+    mocker.patch("latz.commands.search.SEARCH_CACHE_FILE", cache_file)
+    mocker.patch("latz.commands.download.SEARCH_CACHE_FILE", cache_file)
+
+    return cache_file
+
+
+@pytest.fixture(autouse=True)
+def daemon_socket_file(mocker, monkeypatch, tmp_path):
+    """Keeps searches from being forwarded to a daemon the user may be running"""
+    socket_file = tmp_path / "daemon.sock"
+    mocker.patch("latz.daemon.DAEMON_SOCKET_FILE", socket_file)
+    monkeypatch.delenv("LATZ_DAEMON_SOCKET", raising=False)
+
+    return socket_file
+
+
+@pytest.fixture(autouse=True)
+def plugin_cache_file(mocker, tmp_path):
+    """Keeps the plugin discovery cache out of the user's cache directory"""
+    cache_file = tmp_path / "plugins.json"
+    mocker.patch("latz.plugins.manager.PLUGIN_CACHE_FILE", cache_file)
+
+    return cache_file
+
+
+@pytest.fixture(autouse=True)
+def config_schema_cache_file(mocker, tmp_path):
+    """Keeps the config schema cache out of the user's cache directory"""
+    cache_file = tmp_path / "config-schema.json"
+    mocker.patch("latz.cli.CONFIG_SCHEMA_CACHE_FILE", cache_file)
+
+    return cache_file
+
+
+@pytest.fixture(autouse=True)
+def config_snapshot_cache_file(mocker, tmp_path):
+    """Keeps the config snapshot cache out of the user's cache directory"""
+    cache_file = tmp_path / "config-snapshot.json"
+    mocker.patch("latz.cli.CONFIG_SNAPSHOT_CACHE_FILE", cache_file)
+
+    return cache_file
 
 
 @pytest.fixture()
@@ -0,0 +1,51 @@
+"""
+Smoke tests for the benchmark suite's mock API.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from benchmarks.mock_server import MockAPISettings, MockUnsplashServer
+from latz.exceptions import SearchBackendError
+from latz.plugins.image import unsplash
+
+
+def search_mock_api(settings: MockAPISettings, **kwargs) -> tuple:
+    """
+    Searches the mock API with the "unsplash" backend
+    """
+    with MockUnsplashServer(settings) as server:
+        config = SimpleNamespace(
+            search_backend_settings=SimpleNamespace(
+                unsplash=SimpleNamespace(access_key="key", base_url=server.url)
+            )
+        )
+
+        async def run():
+            async with httpx.AsyncClient() as client:
+                return await unsplash.search(client, config, "cats", **kwargs)
+
+        return asyncio.run(run())
+
+
+def test_mock_server_pagination():
+    """
+    The "unsplash" backend pages through the mock API like through the real one
+    """
+    results = search_mock_api(MockAPISettings(latency=0, total_results=45), limit=40)
+
+    assert [result.id for result in results] == [f"cats-{idx}" for idx in range(40)]
+
+    results = search_mock_api(MockAPISettings(latency=0, total_results=45), limit=100)
+
+    assert len(results) == 45
+
+
+def test_mock_server_errors():
+    """
+    The mock API fails requests at the configured error rate
+    """
+    with pytest.raises(SearchBackendError):
+        search_mock_api(MockAPISettings(latency=0, error_rate=1))
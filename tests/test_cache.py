@@ -0,0 +1,84 @@
+"""
+Search result cache related tests.
+"""
+import time
+from pathlib import Path
+
+import pytest
+
+from latz.cache import SearchResultCache, get_settings_hash
+from latz.image import ImageSearchResult
+from latz.plugins.image.placeholder import PlaceholderBackendConfig
+from latz.plugins.manager import add_base_search_backend_settings
+
+RESULTS = tuple(
+    ImageSearchResult(
+        url=f"https://example.com/{idx}", width=idx, height=idx, search_backend="test"
+    )
+    for idx in range(5)
+)
+
+
+@pytest.fixture
+def cache(tmp_path: Path):
+    """Search result cache stored in a temporary directory"""
+    search_cache = SearchResultCache(tmp_path / "cache" / "search.sqlite")
+    yield search_cache
+    search_cache.close()
+
+
+def test_cache_round_trip(cache: SearchResultCache):
+    """
+    Results that are stored should be returned for the same (normalized) query.
+    """
+    cache.set("test", "Funny  Bunny", "hash", RESULTS)
+
+    assert cache.get("test", " funny bunny", "hash", ttl=60) == RESULTS
+    assert cache.get("test", "funny bunny", "other-hash", ttl=60) is None
+    assert cache.get("other", "funny bunny", "hash", ttl=60) is None
+
+
+def test_cache_expired_entries(cache: SearchResultCache, mocker):
+    """
+    Entries older than the TTL should be treated as a cache miss.
+    """
+    cache.set("test", "bunny", "hash", RESULTS)
+    mocker.patch("latz.cache.time.time", return_value=time.time() + 120)
+
+    assert cache.get("test", "bunny", "hash", ttl=60) is None
+    assert cache.get("test", "bunny", "hash", ttl=0) is None
+
+
+@pytest.mark.parametrize(
+    "stored_limit,stored_results,requested_limit,expected",
+    [
+        (None, RESULTS, 3, RESULTS[:3]),
+        (None, RESULTS, None, RESULTS),
+        (5, RESULTS, 3, RESULTS[:3]),
+        (5, RESULTS, 10, None),
+        (5, RESULTS, None, None),
+        (10, RESULTS, 20, RESULTS),
+    ],
+)
+def test_cache_limits(
+    cache: SearchResultCache, stored_limit, stored_results, requested_limit, expected
+):
+    """
+    Entries fetched with a larger limit (or entries where the backend ran out of
+    results) should be able to answer requests with a smaller limit.
+    """
+    cache.set("test", "bunny", "hash", stored_results, limit=stored_limit)
+
+    assert cache.get("test", "bunny", "hash", ttl=60, limit=requested_limit) == expected
+
+
+def test_settings_hash_ignores_cache_settings():
+    """
+    Changing the cache TTL of a backend should not invalidate its cache entries.
+    """
+    settings = add_base_search_backend_settings(PlaceholderBackendConfig())
+    other_ttl = settings.copy(update={"cache_ttl": 10})
+    other_type = settings.copy(update={"type": "bear"})
+
+    assert get_settings_hash(settings) == get_settings_hash(other_ttl)
+    assert get_settings_hash(settings) != get_settings_hash(other_type)
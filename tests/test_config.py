@@ -1,9 +1,20 @@
 """
 Configuration related tests.
 """
+import json
+
 from click.testing import CliRunner
 
-from latz.cli import cli
+import latz.config.main
+
+from latz.cli import cli, create_app_config_class
+from latz.config import (
+    BaseAppConfig,
+    ConfigSchemaCache,
+    ConfigSnapshotCache,
+    get_app_config,
+)
+from latz.plugins.manager import SEARCH_BACKEND_SETTINGS_KEY, get_plugin_manager
 
 
 def test_bad_backend(runner_with_bad_backend: CliRunner):
@@ -59,3 +70,125 @@ def test_multiple_config_files(runner_with_multiple_config_files: CliRunner, moc
     assert "https://placekitten.com/200/300" in result.stdout
     assert "https://placekitten.com/600/500" in result.stdout
     assert "https://placekitten.com/1000/800" in result.stdout
+
+
+def test_app_config_class_is_reused(dummy_plugin):
+    """
+    The generated configuration classes are reused until the config fields of the
+    registered plugins change.
+    """
+    plugin_manager = get_plugin_manager()
+    AppConfig = create_app_config_class(plugin_manager)
+
+    assert create_app_config_class(plugin_manager) is AppConfig
+
+    # Other plugin managers get their own class but share the generated settings model
+    other_plugin_manager = get_plugin_manager()
+    OtherAppConfig = create_app_config_class(other_plugin_manager)
+
+    assert OtherAppConfig is not AppConfig
+    assert (
+        OtherAppConfig.__fields__[SEARCH_BACKEND_SETTINGS_KEY].type_
+        is AppConfig.__fields__[SEARCH_BACKEND_SETTINGS_KEY].type_
+    )
+
+    plugin_manager.register(dummy_plugin())
+    DummyAppConfig = create_app_config_class(plugin_manager)
+
+    assert DummyAppConfig is not AppConfig
+    assert "dummy" in DummyAppConfig().search_backend_settings.dict()
+
+
+def test_config_schema_cache(tmp_path, mocker):
+    """
+    The config schema is only generated again when the fingerprint changes
+    """
+    cache = ConfigSchemaCache(tmp_path / "config-schema.json")
+    schema = cache.get_schema(BaseAppConfig, "fingerprint")
+
+    assert schema["title"] == "BaseAppConfig"
+
+    schema_json = mocker.spy(BaseAppConfig, "schema_json")
+
+    assert cache.get_schema(BaseAppConfig, "fingerprint") == schema
+    assert schema_json.call_count == 0
+
+    assert cache.get_schema(BaseAppConfig, "other fingerprint") == schema
+    assert schema_json.call_count == 1
+
+
+def test_config_files_are_merged(tmp_path):
+    """
+    Later configuration files only override the values they set themselves
+    """
+    config_one = tmp_path / "one.json"
+    config_two = tmp_path / "two.json"
+    config_one.write_text(json.dumps({"cache_ttl": 10, "max_concurrency": 2}))
+    config_two.write_text(json.dumps({"max_concurrency": 5}))
+
+    config = get_app_config((config_one, config_two), BaseAppConfig)
+
+    assert config.cache_ttl == 10
+    assert config.max_concurrency == 5
+
+
+def test_config_snapshot_is_reused(tmp_path, monkeypatch):
+    """
+    The validated configuration is reused until a configuration file or one of our
+    environment variables changes.
+    """
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps({"cache_ttl": 10}))
+    paths = (config_file,)
+
+    config = get_app_config(paths, BaseAppConfig)
+
+    assert get_app_config(paths, BaseAppConfig) is config
+
+    monkeypatch.setenv("LATZ_MAX_CONCURRENCY", "3")
+    env_config = get_app_config(paths, BaseAppConfig)
+
+    assert env_config is not config
+    assert env_config.max_concurrency == 3
+
+    config_file.write_text(json.dumps({"cache_ttl": 100}))
+
+    assert get_app_config(paths, BaseAppConfig).cache_ttl == 100
+
+
+def test_config_snapshot_cache(tmp_path, mocker):
+    """
+    The validated configuration is reused between runs until the configuration
+    sources or the plugins' config fields change.
+    """
+    plugin_manager = get_plugin_manager()
+    AppConfig = create_app_config_class(plugin_manager)
+    fingerprint = plugin_manager.config_fields_fingerprint
+
+    config_file = tmp_path / "config.json"
+    config_file.write_text(
+        json.dumps(
+            {
+                "search_backends": ["placeholder"],
+                "search_backend_settings": {"unsplash": {"access_key": "key"}},
+            }
+        )
+    )
+    paths = (config_file,)
+    cache = ConfigSnapshotCache(tmp_path / "config-snapshot.json")
+    config = get_app_config(paths, AppConfig, cache, fingerprint)
+
+    # Simulates the next run, which does not have the snapshot kept in memory
+    mocker.patch("latz.config.main._config_snapshots", {})
+    parse_app_config = mocker.spy(latz.config.main, "parse_app_config")
+    cached_config = get_app_config(paths, AppConfig, cache, fingerprint)
+
+    assert parse_app_config.call_count == 0
+    assert cached_config == config
+    assert cached_config.search_backends == ("placeholder",)
+    assert cached_config.search_backend_settings.unsplash.access_key == "key"
+
+    mocker.patch("latz.config.main._config_snapshots", {})
+    get_app_config(paths, AppConfig, cache, "other fingerprint")
+
+    assert parse_app_config.call_count == 1
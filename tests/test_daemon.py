@@ -0,0 +1,179 @@
+"""
+Tests for forwarding searches to the daemon started by ``latz serve --daemon``.
+"""
+import asyncio
+import stat
+import threading
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from latz import daemon
+from latz.cli import cli
+from latz.server import SearchServer
+
+from .test_server import BACKEND, AppConfig
+
+
+@pytest.fixture
+def running_daemon(daemon_socket_file: Path):
+    """Runs a daemon using the "test" backend in a background thread"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    server = SearchServer(AppConfig(), (BACKEND,))
+    asyncio.run_coroutine_threadsafe(
+        server.start_unix(daemon_socket_file), loop
+    ).result(5)
+
+    yield server
+
+    asyncio.run_coroutine_threadsafe(server.aclose(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def test_search_is_forwarded_to_daemon(
+    runner: tuple[CliRunner, Path], running_daemon, mocker
+):
+    """
+    While the daemon is running, searches are sent there instead of running in-process
+    """
+    cmd_runner, _ = runner
+    main = mocker.patch("latz.search.main")
+
+    result = cmd_runner.invoke(cli, ["search", "cats", "--limit", "2"])
+
+    assert result.exit_code == 0
+    assert "https://example.com/cats/0" in result.stdout
+    assert "https://example.com/cats/1" in result.stdout
+    assert "https://example.com/cats/2" not in result.stdout
+    assert not main.called
+
+    # Without the daemon, the configured "placeholder" backend is used in-process;
+    # streamed output always runs in-process
+    for args in (["--no-daemon"], ["--stream"], ["--format", "ndjson"]):
+        main.reset_mock()
+        result = cmd_runner.invoke(cli, ["search", "cats", *args])
+
+        assert result.exit_code == 0
+        assert main.called
+
+
+def test_daemon_failed_searches_are_reported(runner: tuple[CliRunner, Path], mocker):
+    """
+    Searches which failed on the daemon are reported along with the other results
+    """
+    cmd_runner, _ = runner
+    mocker.patch(
+        "latz.daemon.search",
+        return_value={
+            "deadline": None,
+            "results": [
+                {
+                    "url": "https://example.com/cats/0",
+                    "width": 1,
+                    "height": 1,
+                    "search_backend": "test",
+                    "query": "cats",
+                    "id": None,
+                }
+            ],
+            "missed": [],
+            "failed": [{"backend": "broken", "query": "cats"}],
+            "skipped": [],
+        },
+    )
+
+    result = cmd_runner.invoke(cli, ["search", "cats"])
+
+    assert result.exit_code == 0
+    assert "https://example.com/cats/0" in result.output
+    assert "no results from: broken" in result.output
+
+
+def test_search_falls_back_without_daemon(runner: tuple[CliRunner, Path]):
+    """
+    Searches run in-process when no daemon is listening
+    """
+    cmd_runner, _ = runner
+
+    with pytest.raises(daemon.DaemonUnavailable):
+        daemon.search(("cats",))
+
+    result = cmd_runner.invoke(cli, ["search", "cats"])
+
+    assert result.exit_code == 0
+    assert "https://placekitten.com/200/300" in result.stdout
+
+
+def test_outdated_daemon(runner: tuple[CliRunner, Path], running_daemon, monkeypatch):
+    """
+    Searches run in-process with a warning when the daemon was started with other
+    environment variables
+    """
+    cmd_runner, _ = runner
+    monkeypatch.setenv("LATZ_CACHE", "false")
+
+    with pytest.raises(daemon.DaemonOutdated):
+        daemon.search(("cats",))
+
+    result = cmd_runner.invoke(cli, ["search", "cats"])
+
+    assert result.exit_code == 0
+    assert "Not using the daemon" in result.output
+    assert "https://placekitten.com/200/300" in result.stdout
+
+
+def test_daemon_replaces_stale_socket(daemon_socket_file: Path):
+    """
+    A socket left behind by a daemon that is no longer running is replaced, but a
+    second daemon cannot take over the socket of a running one
+    """
+
+    async def run():
+        first = SearchServer(AppConfig(), (BACKEND,))
+        await first.start_unix(daemon_socket_file)
+        first.socket_path = None
+        first.server.close()
+        await first.server.wait_closed()
+        await first.clients.aclose()
+
+        assert daemon_socket_file.exists()
+
+        second = SearchServer(AppConfig(), (BACKEND,))
+        await second.start_unix(daemon_socket_file)
+
+        try:
+            with pytest.raises(OSError, match="already listening"):
+                await SearchServer(AppConfig(), (BACKEND,)).start_unix(
+                    daemon_socket_file
+                )
+        finally:
+            await second.aclose()
+
+        assert not daemon_socket_file.exists()
+
+    asyncio.run(run())
+
+
+def test_daemon_socket_permissions(tmp_path: Path):
+    """
+    Only the current user may connect to the socket, also while it is being set up
+    """
+    socket_file = tmp_path / "latz" / "daemon.sock"
+
+    async def run():
+        server = SearchServer(AppConfig(), (BACKEND,))
+        await server.start_unix(socket_file)
+
+        try:
+            assert stat.S_IMODE(socket_file.stat().st_mode) & 0o077 == 0
+            assert stat.S_IMODE(socket_file.parent.stat().st_mode) == 0o700
+        finally:
+            await server.aclose()
+
+    asyncio.run(run())
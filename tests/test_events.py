@@ -0,0 +1,83 @@
+"""
+Tests for the observability hooks.
+"""
+import threading
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from latz.cli import cli
+from latz.events import EventDispatcher
+from latz.plugins import hookimpl
+from latz.plugins.manager import get_plugin_manager
+
+
+class MetricsPlugin:
+    """Plugin recording the events it receives"""
+
+    def __init__(self):
+        self.events = []
+        self.threads = set()
+
+    @hookimpl
+    def search_finished(self, backend, query, results, error):
+        self.threads.add(threading.current_thread().name)
+        self.events.append(("search_finished", backend, query, results, error))
+
+    @hookimpl
+    def cache_lookup(self, backend, query, hit):
+        self.events.append(("cache_lookup", backend, query, hit))
+
+
+def test_event_dispatcher():
+    """
+    Events are only queued for implemented hooks and handed to the plugins from a
+    background thread
+    """
+    plugin_manager = get_plugin_manager()
+    events = EventDispatcher(plugin_manager.hook)
+
+    assert events.active == frozenset()
+
+    events.emit("search_finished", backend="one", query="cats", results=1, error=None)
+    events.close()
+
+    assert events._thread is None
+
+    plugin = MetricsPlugin()
+    plugin_manager.register(plugin)
+    events = EventDispatcher(plugin_manager.hook)
+    events.emit(
+        "search_finished",
+        backend="one",
+        query="cats",
+        duration=0.1,
+        results=1,
+        error=None,
+    )
+    events.close()
+
+    assert plugin.events == [("search_finished", "one", "cats", 1, None)]
+    assert plugin.threads == {"latz-events"}
+
+
+def test_search_command_emits_events(runner: tuple[CliRunner, Path], mocker):
+    """
+    Searching reports cache lookups and finished searches to plugins
+    """
+    cmd_runner, _ = runner
+    plugin = MetricsPlugin()
+    plugin_manager = get_plugin_manager()
+    plugin_manager.register(plugin)
+    mocker.patch("latz.plugins.manager.get_plugin_manager", return_value=plugin_manager)
+
+    for _ in range(2):
+        result = cmd_runner.invoke(cli, ["search", "cats"])
+
+        assert result.exit_code == 0
+
+    assert plugin.events == [
+        ("cache_lookup", "placeholder", "cats", False),
+        ("search_finished", "placeholder", "cats", 3, None),
+        ("cache_lookup", "placeholder", "cats", True),
+    ]
@@ -0,0 +1,308 @@
+"""
+Networking related tests.
+"""
+import asyncio
+import json
+import time
+from functools import partial
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from latz.config import BaseAppConfig
+from latz.fetch import (
+    ClientManager,
+    ConcurrencyLimiter,
+    RetryPolicy,
+    SharedTransport,
+    iter_json_items,
+    iter_results,
+)
+
+
+def test_client_manager_scopes_headers():
+    """
+    Clients for different backends should share one connection pool without sharing
+    their headers.
+    """
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        received.append(request.headers.get("Authorization"))
+        return httpx.Response(200, json={})
+
+    async def run():
+        clients = ClientManager(BaseAppConfig())
+        clients.transport = httpx.MockTransport(handler)
+
+        one = clients.get_client("one")
+        two = clients.get_client("two")
+        one.headers["Authorization"] = "one"
+
+        assert clients.get_client("one") is one
+
+        await one.get("https://example.com")
+        await two.get("https://example.com")
+
+        # A backend closing its own client should not close the shared pool
+        await one.aclose()
+        await two.get("https://example.com")
+
+        await clients.aclose()
+
+    asyncio.run(run())
+
+    assert received == ["one", None, None]
+
+
+def test_client_manager_settings():
+    """
+    Connection pool and timeout settings should be taken from the configuration.
+    """
+    config = BaseAppConfig(
+        http_max_connections=3, http_connect_timeout=1.5, http_read_timeout=7
+    )
+    clients = ClientManager(config)
+    client = clients.get_client("one")
+
+    assert client.timeout.connect == 1.5
+    assert client.timeout.read == 7
+    assert clients.transport._pool._max_connections == 3
+
+    asyncio.run(clients.aclose())
+
+
+def test_concurrency_limiter_adapts_limit():
+    """
+    The limit is halved when the backend is overloaded (once per round of requests)
+    and slowly raised again while it stays healthy.
+    """
+    limiter = ConcurrencyLimiter(8, max_limit=9)
+
+    started = time.monotonic()
+    limiter.record(started, 0.1, overloaded=True)
+    limiter.record(started, 0.1, overloaded=True)
+
+    assert limiter.limit == 4
+
+    for _ in range(8):
+        limiter.record(time.monotonic(), 0.1)
+
+    assert 5 < limiter.limit < 6
+
+    for _ in range(100):
+        limiter.record(time.monotonic(), 0.1)
+
+    assert limiter.limit == 9
+
+    # Latency rising well above the lowest latency seen counts as overloaded
+    for _ in range(10):
+        limiter.record(time.monotonic(), 1)
+
+    assert limiter.limit < 9
+
+
+def test_concurrency_limiter_limits_requests():
+    """
+    No more requests than the current limit are sent at the same time, no matter how
+    many searches run; responses signaling an overloaded backend lower the limit.
+    """
+    running = []
+    max_running = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal max_running
+        running.append(1)
+        max_running = max(max_running, len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        return httpx.Response(429)
+
+    async def search(client: httpx.AsyncClient):
+        await client.get("https://example.com")
+
+    async def run():
+        config = BaseAppConfig(max_concurrency=4)
+        clients = ClientManager(config)
+        clients.transport = httpx.MockTransport(handler)
+        client = clients.get_client("one")
+        callables = [partial(search, client) for _ in range(12)]
+
+        async for _ in iter_results(callables, limit=10):
+            pass
+
+        await clients.aclose()
+
+        return clients.get_limiter("one")
+
+    limiter = asyncio.run(run())
+
+    assert max_running == 4
+    assert limiter.limit < 4
+    assert limiter.active == 0
+
+
+def test_shared_transport_retries():
+    """
+    Idempotent requests are retried after 5xx responses and connection errors; other
+    requests are sent only once.
+    """
+    responses = [
+        httpx.Response(503),
+        httpx.ConnectError("refused"),
+        httpx.Response(200, json={}),
+    ]
+    methods = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        methods.append(request.method)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def run():
+        transport = SharedTransport(
+            httpx.MockTransport(handler), policy=RetryPolicy(retries=2, backoff=0)
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.get("https://example.com")
+
+            assert response.status_code == 200
+
+            responses.append(httpx.Response(503))
+            response = await client.post("https://example.com")
+
+            assert response.status_code == 503
+
+    asyncio.run(run())
+
+    assert methods == ["GET", "GET", "GET", "POST"]
+
+
+def test_shared_transport_hedges_slow_requests():
+    """
+    When a request takes longer than most recent requests, a second one is sent and
+    the first response to arrive is used.
+    """
+    delays = [10, 0]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delays.pop(0))
+        return httpx.Response(200, json={})
+
+    async def run():
+        transport = SharedTransport(
+            httpx.MockTransport(handler), policy=RetryPolicy(hedge=True)
+        )
+        transport.latencies.extend([0.01] * 20)
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await asyncio.wait_for(client.get("https://example.com"), 1)
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert delays == []
+
+
+def test_shared_transport_hedges_need_a_free_slot():
+    """
+    Hedged requests take a slot of the limiter like any other request, so no hedged
+    request is sent while the limiter is full.
+    """
+    delays = [0.2, 0]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delays.pop(0))
+        return httpx.Response(200, json={})
+
+    async def run():
+        limiter = ConcurrencyLimiter(1, adaptive=False)
+        transport = SharedTransport(
+            httpx.MockTransport(handler), limiter=limiter, policy=RetryPolicy(hedge=True)
+        )
+        transport.latencies.extend([0.01] * 20)
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.get("https://example.com")
+
+        return response, limiter
+
+    response, limiter = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert delays == [0]
+    assert limiter.active == 0
+
+
+def test_iter_json_items_parses_incrementally():
+    """
+    Items of the array are yielded one at a time no matter where the text is split
+    into chunks; other members of the object are skipped.
+    """
+    text = (
+        '{"total": 12.5, "meta": {"results": [0]}, '
+        '"results": [{"id": "a", "tags": ["x", "}"]}, 123, "b"], "rest": []}'
+    )
+
+    async def collect(size: int) -> list:
+        async def chunks():
+            for start in range(0, len(text), size):
+                yield text[start : start + size]
+
+        return [item async for item in iter_json_items(chunks(), "results")]
+
+    for size in range(1, len(text) + 1):
+        assert asyncio.run(collect(size)) == [
+            {"id": "a", "tags": ["x", "}"]},
+            123,
+            "b",
+        ]
+
+
+def test_iter_json_items_rejects_malformed_text():
+    """
+    Text which is not a JSON object raises a `json.JSONDecodeError`
+    """
+
+    async def collect(text: str) -> list:
+        async def chunks():
+            yield text
+
+        return [item async for item in iter_json_items(chunks(), "results")]
+
+    assert asyncio.run(collect('{"results": []}')) == []
+
+    for text in ('[{"id": "a"}]', '{"results": [{"id": "a"}', '{"results": [1 2]}'):
+        with pytest.raises(json.JSONDecodeError):
+            asyncio.run(collect(text))
+
+
+def test_shared_transport_reports_requests():
+    """
+    Every request sent (including retries) is reported as a "request_completed" event
+    """
+    emitted = []
+    events = SimpleNamespace(
+        active={"request_completed"},
+        emit=lambda name, **kwargs: emitted.append((kwargs["status_code"], kwargs)),
+    )
+    responses = [httpx.Response(503), httpx.Response(200, json={})]
+
+    async def run():
+        transport = SharedTransport(
+            httpx.MockTransport(lambda request: responses.pop(0)),
+            policy=RetryPolicy(retries=1, backoff=0),
+            name="one",
+            events=events,
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("https://example.com/search")
+
+    asyncio.run(run())
+
+    assert [status_code for status_code, _ in emitted] == [503, 200]
+    assert emitted[0][1]["backend"] == "one"
+    assert emitted[0][1]["url"] == "https://example.com/search"
@@ -0,0 +1,35 @@
+"""
+Tests for the JSON file cache used by the startup caches.
+"""
+import stat
+
+from latz.filecache import JSONFileCache
+
+
+def test_json_file_cache(tmp_path):
+    """
+    Cached values are only returned for the fingerprint they were written with
+    """
+    path = tmp_path / "cache" / "value.json"
+
+    assert JSONFileCache(path, "one").read() is None
+
+    JSONFileCache(path, "one").write({"a": [1, 2]})
+
+    assert JSONFileCache(path, "one").read() == {"a": [1, 2]}
+    assert JSONFileCache(path, "two").read() is None
+    assert [file.name for file in path.parent.iterdir()] == ["value.json"]
+
+    path.write_text("{")
+
+    assert JSONFileCache(path, "one").read() is None
+
+
+def test_json_file_cache_mode(tmp_path):
+    """
+    The cache file is created with the requested permissions
+    """
+    path = tmp_path / "value.json"
+    JSONFileCache(path, "one", mode=0o600).write("secret")
+
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
@@ -0,0 +1,68 @@
+"""
+Tests for the machine readable output formats.
+"""
+import io
+import json
+
+from latz.image import ImageSearchResult
+from latz.output import ResultWriter
+
+RESULTS = (
+    ImageSearchResult("https://example.com/1", 1, 2, "one", "cats", id="a"),
+    ImageSearchResult("https://example.com/2", None, None, "two", "cats"),
+)
+
+
+class RecordingStream(io.StringIO):
+    """
+    Stream recording what has been written by the time of each flush
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.flushed: list[str] = []
+
+    def flush(self):
+        self.flushed.append(self.getvalue())
+
+
+def test_result_writer_formats():
+    """
+    Each format can be parsed back into the results that were written
+    """
+    outputs = {}
+
+    for output_format in ("ndjson", "csv", "json"):
+        stream = io.StringIO()
+        writer = ResultWriter(output_format, stream)
+        writer.write(RESULTS[:1])
+        writer.write(RESULTS[1:])
+        writer.close()
+        outputs[output_format] = stream.getvalue()
+
+    records = [result._asdict() for result in RESULTS]
+
+    assert [json.loads(line) for line in outputs["ndjson"].splitlines()] == records
+    assert json.loads(outputs["json"]) == records
+    assert outputs["csv"].splitlines() == [
+        "url,width,height,search_backend,query,id",
+        "https://example.com/1,1,2,one,cats,a",
+        "https://example.com/2,,,two,cats,",
+    ]
+
+    stream = io.StringIO()
+    ResultWriter("json", stream).close()
+
+    assert json.loads(stream.getvalue()) == []
+
+
+def test_result_writer_flushes_in_batches():
+    """
+    Results are flushed after every batch and at the end of each write
+    """
+    stream = RecordingStream()
+    writer = ResultWriter("ndjson", stream, batch_size=2)
+
+    writer.write(RESULTS * 2 + RESULTS[:1])
+
+    assert [value.count("\n") for value in stream.flushed] == [2, 4, 5]
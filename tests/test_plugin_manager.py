@@ -0,0 +1,135 @@
+"""
+Plugin manager related tests.
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from latz.exceptions import LatzError
+from latz.plugins import hookimpl, SearchBackendHook
+from latz.plugins.image.placeholder import PlaceholderBackendConfig, search
+from latz.plugins.discovery import PluginDiscoveryCache, PluginEntryPoint
+from latz.plugins.manager import get_plugin_manager
+
+
+def test_search_backend_hook_is_called_once(dummy_plugin):
+    """
+    The ``search_backend`` hook should only be called once no matter how many times
+    the registered backends are looked up.
+    """
+    plugin_manager = get_plugin_manager()
+    plugin = dummy_plugin()
+    plugin_manager.register(plugin)
+    config = SimpleNamespace(search_backends=("dummy", "placeholder", "dummy"))
+
+    assert set(plugin_manager.search_backend_names) == {
+        "dummy",
+        "placeholder",
+        "unsplash",
+    }
+    assert tuple(
+        backend.name
+        for backend in plugin_manager.get_configured_search_backends(config)
+    ) == ("dummy", "placeholder")
+    assert plugin_manager.search_backend_config_fields
+    assert plugin.call_count == 1
+
+    plugin_manager.reset_cache()
+    plugin_manager.search_backend_names
+
+    assert plugin.call_count == 2
+
+
+def test_search_backend_hookwrappers_are_applied():
+    """
+    The search backend registry is built through pluggy's hook call, so hook wrappers
+    registered by plugins can change the search backends which are returned.
+    """
+
+    class HideUnsplashPlugin:
+        @hookimpl(hookwrapper=True)
+        def search_backend(self):
+            outcome = yield
+            outcome.force_result(
+                [backend for backend in outcome.get_result() if backend.name != "unsplash"]
+            )
+
+    plugin_manager = get_plugin_manager()
+    plugin_manager.register(HideUnsplashPlugin())
+
+    assert set(plugin_manager.search_backend_names) == {"placeholder"}
+
+
+def test_duplicate_search_backend_names(dummy_plugin):
+    """
+    Registering two search backends with the same name should raise an error.
+    """
+    plugin_manager = get_plugin_manager()
+    plugin_manager.register(dummy_plugin("placeholder"))
+
+    with pytest.raises(LatzError, match="Duplicate values"):
+        plugin_manager.search_backend_registry
+
+
+@hookimpl
+def search_backend():
+    """Search backend hook used when this module is loaded as a discovered plugin"""
+    return SearchBackendHook(
+        name="lazy", search=search, config_fields=PlaceholderBackendConfig()
+    )
+
+
+def test_discovered_plugins_are_imported_lazily(plugin_cache_file: Path, mocker):
+    """
+    Discovered plugins should be cached and only be imported when one of their search
+    backends is needed.
+    """
+    entry_point = PluginEntryPoint(name="lazy", value=__name__)
+    discover = mocker.patch(
+        "latz.plugins.discovery.discover_entry_points", return_value=(entry_point,)
+    )
+    module = sys.modules[__name__]
+
+    plugin_manager = get_plugin_manager()
+    assert plugin_manager.get_plugin("lazy") is None
+
+    # We do not know yet which backends the plugin provides, so it has to be imported
+    plugin_manager.get_configured_search_backends(
+        SimpleNamespace(search_backends=("placeholder",))
+    )
+    assert plugin_manager.get_plugin("lazy") is module
+
+    # The next run knows the plugin only provides "lazy" and uses the cached entry points
+    plugin_manager = get_plugin_manager()
+    plugin_manager.get_configured_search_backends(
+        SimpleNamespace(search_backends=("placeholder",))
+    )
+    assert plugin_manager.get_plugin("lazy") is None
+
+    backends = plugin_manager.get_configured_search_backends(
+        SimpleNamespace(search_backends=("lazy",))
+    )
+    assert tuple(backend.name for backend in backends) == ("lazy",)
+    assert discover.call_count == 1
+
+
+def test_plugin_discovery_cache_is_invalidated(plugin_cache_file: Path, mocker):
+    """
+    The discovery cache should not be used once the environment has changed.
+    """
+    discover = mocker.patch(
+        "latz.plugins.discovery.discover_entry_points", return_value=()
+    )
+    PluginDiscoveryCache(plugin_cache_file, "latz").get_entry_points()
+    PluginDiscoveryCache(plugin_cache_file, "latz").get_entry_points()
+
+    assert discover.call_count == 1
+
+    mocker.patch(
+        "latz.plugins.discovery.get_environment_fingerprint", return_value="changed"
+    )
+    PluginDiscoveryCache(plugin_cache_file, "latz").get_entry_points()
+
+    assert discover.call_count == 2
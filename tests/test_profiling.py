@@ -0,0 +1,69 @@
+"""
+Tests for the per stage timing instrumentation.
+"""
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from latz import profiling
+from latz.cli import cli
+
+
+async def search():
+    return ()
+
+
+def test_spans_only_recorded_while_enabled():
+    """
+    Spans are free while profiling is disabled and recorded while it is enabled
+    """
+    assert profiling.span("stage") is profiling.NULL_SPAN
+    assert profiling.timed("search", search) is search
+
+    profiler = profiling.enable()
+    try:
+        for _ in range(2):
+            with profiling.span("stage"):
+                pass
+    finally:
+        assert profiling.disable() is profiler
+
+    (summary,) = profiler.summarize()
+
+    assert summary.name == "stage"
+    assert summary.calls == 2
+    assert summary.total >= summary.max >= summary.mean >= 0
+
+
+@pytest.mark.parametrize("args", ((), ("--stream",)))
+def test_profile_file(runner: tuple[CliRunner, Path], tmp_path: Path, args):
+    """
+    The timings of each stage of a command are written to the profile file (also
+    when the results table is redrawn while streaming)
+    """
+    cmd_runner, _ = runner
+    profile_file = tmp_path / "profile.json"
+
+    result = cmd_runner.invoke(
+        cli,
+        ["--profile", "--profile-file", str(profile_file), "search", "cats", *args],
+    )
+
+    assert result.exit_code == 0
+    assert "Profile" in result.output
+
+    stages = {
+        summary["name"] for summary in json.loads(profile_file.read_text())["summary"]
+    }
+
+    assert {
+        "plugins.discover",
+        "config.class",
+        "config.load",
+        "search",
+        "search.placeholder",
+        "render",
+    } <= stages
+    assert profiling._profiler is None
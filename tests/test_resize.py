@@ -0,0 +1,50 @@
+"""
+Image resizing related tests.
+"""
+import asyncio
+from pathlib import Path
+
+from PIL import Image
+
+from latz.resize import ImageSize, ResizePool, get_resized_path, resize_image
+
+SIZES = (ImageSize(200, 200), ImageSize(50, 100))
+
+
+def create_image(path: Path, size=(800, 400)) -> Path:
+    """Writes a JPEG image to ``path``"""
+    Image.new("RGB", size, color="orange").save(path, format="JPEG")
+    return path
+
+
+def test_resize_image(tmp_path: Path):
+    """
+    A copy of the image should be saved for each size while keeping its aspect ratio.
+    """
+    image_path = create_image(tmp_path / "image.jpg")
+    resized_paths = resize_image(image_path, SIZES)
+
+    assert resized_paths == tuple(get_resized_path(image_path, size) for size in SIZES)
+
+    with Image.open(resized_paths[0]) as image:
+        assert image.size == (200, 100)
+        assert image.format == "JPEG"
+
+    with Image.open(resized_paths[1]) as image:
+        assert image.size == (50, 25)
+
+
+def test_resize_pool(tmp_path: Path):
+    """
+    Images should be resized in worker processes.
+    """
+    image_paths = tuple(create_image(tmp_path / f"image-{idx}.jpg") for idx in range(3))
+
+    async def run():
+        async with ResizePool(SIZES, max_workers=2) as pool:
+            return await asyncio.gather(*(pool.resize(path) for path in image_paths))
+
+    results = asyncio.run(run())
+
+    assert len(results) == 3
+    assert all(path.exists() for resized_paths in results for path in resized_paths)
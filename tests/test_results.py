@@ -0,0 +1,48 @@
+"""
+Tests for the columnar result set.
+"""
+import pytest
+
+from latz.image import ImageSearchResult
+from latz.results import ResultSet
+
+RESULTS = (
+    ImageSearchResult("https://example.com/1", 100, 200, "one", "cats", id="a"),
+    ImageSearchResult("https://example.com/ü", None, 50, "two", "cats"),
+    ImageSearchResult(None, 10, None, "one", None, id=""),
+)
+
+
+def test_result_set_behaves_like_tuple():
+    """
+    A result set holds the same results as the tuple it was created from
+    """
+    results = ResultSet(RESULTS)
+
+    assert len(results) == 3
+    assert tuple(results) == RESULTS
+    assert results == RESULTS
+    assert results[-1] == RESULTS[-1]
+    assert results[1:] == RESULTS[1:]
+    assert RESULTS[0] in results
+    assert results.search_backends.values == ["one", "two"]
+
+    with pytest.raises(IndexError):
+        results[3]
+
+
+def test_result_set_to_arrow(tmp_path):
+    """
+    Exporting to Arrow and Parquet keeps all values including missing ones
+    """
+    pq = pytest.importorskip("pyarrow.parquet")
+    results = ResultSet(RESULTS)
+
+    table = results.to_arrow()
+
+    assert table.column_names == list(ImageSearchResult._fields)
+    assert [ImageSearchResult(**row) for row in table.to_pylist()] == list(RESULTS)
+
+    results.to_parquet(tmp_path / "results.parquet")
+
+    assert pq.read_table(tmp_path / "results.parquet").to_pylist() == table.to_pylist()
@@ -0,0 +1,177 @@
+"""
+Tests for the HTTP API behind ``latz serve``.
+"""
+import asyncio
+
+import httpx
+from pydantic import BaseModel
+
+from latz.config import BaseAppConfig
+from latz.config.models import BaseSearchBackendSettings
+from latz.image import ImageSearchResult
+from latz.plugins import SearchBackendCapabilities, SearchBackendHook
+from latz.server import SearchServer
+
+
+async def search(client, config, query: str, limit=None, offset=0, **filters):
+    return tuple(
+        ImageSearchResult(f"https://example.com/{query}/{idx}", idx, idx, "test")
+        for idx in range(offset, offset + (limit or 3))
+    )
+
+
+class SearchBackendSettings(BaseModel):
+    test: BaseSearchBackendSettings = BaseSearchBackendSettings()
+
+
+class AppConfig(BaseAppConfig):
+    search_backend_settings: SearchBackendSettings = SearchBackendSettings()
+
+
+BACKEND = SearchBackendHook(
+    name="test",
+    search=search,
+    config_fields=BaseSearchBackendSettings(),
+    capabilities=SearchBackendCapabilities(pagination=True, filters=("color",)),
+)
+
+
+def call_server(
+    *requests: tuple, backends: tuple = (BACKEND,), **server_kwargs
+) -> list[httpx.Response]:
+    """
+    Starts a server on a free port and sends it ``requests`` (method, path, kwargs)
+    over a single connection
+    """
+
+    async def run():
+        server = SearchServer(AppConfig(), backends, **server_kwargs)
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+                return [
+                    await client.request(method, path, **kwargs)
+                    for method, path, kwargs in requests
+                ]
+        finally:
+            await server.aclose()
+
+    return asyncio.run(run())
+
+
+def test_server_search():
+    """
+    Searches are sent as POST requests and reuse the connection
+    """
+    health, single, post = call_server(
+        ("GET", "/health", {}),
+        ("POST", "/search", {"json": {"query": "cats", "limit": 2, "offset": 1}}),
+        ("POST", "/search", {"json": {"queries": ["cats", "dogs"], "limit": 1}}),
+    )
+
+    assert health.json() == {"status": "ok", "search_backends": ["test"]}
+
+    assert single.status_code == 200
+    assert [result["url"] for result in single.json()["results"]] == [
+        "https://example.com/cats/1",
+        "https://example.com/cats/2",
+    ]
+
+    assert [result["query"] for result in post.json()["results"]] == ["cats", "dogs"]
+    assert post.json()["missed"] == []
+    assert post.json()["failed"] == []
+
+
+def test_server_failed_search():
+    """
+    A failing backend does not fail the request; its searches are listed as failed
+    """
+
+    async def broken_search(client, config, query: str):
+        raise ValueError("Unexpected response")
+
+    broken = SearchBackendHook(
+        name="broken", search=broken_search, config_fields=BaseSearchBackendSettings()
+    )
+    (response,) = call_server(
+        ("POST", "/search", {"json": {"query": "cats"}}), backends=(broken, BACKEND)
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 3
+    assert response.json()["failed"] == [{"backend": "broken", "query": "cats"}]
+
+
+def test_server_filters():
+    """
+    Backends which do not support all filters are skipped
+    """
+    (supported,) = call_server(
+        ("POST", "/search", {"json": {"query": "cats", "filters": {"color": "red"}}})
+    )
+    (unsupported,) = call_server(
+        ("POST", "/search", {"json": {"query": "cats", "filters": {"size": "big"}}})
+    )
+
+    assert len(supported.json()["results"]) == 3
+    assert unsupported.json()["results"] == []
+    assert unsupported.json()["skipped"] == ["test"]
+
+
+def test_server_errors():
+    """
+    Invalid requests are answered with an error status and message
+    """
+    (
+        not_found,
+        not_allowed,
+        get_search,
+        no_query,
+        bad_limit,
+        bad_json,
+        not_json,
+    ) = call_server(
+        ("GET", "/nope", {}),
+        ("DELETE", "/search", {}),
+        ("GET", "/search", {"params": {"q": "cats"}}),
+        ("POST", "/search", {"json": {}}),
+        ("POST", "/search", {"json": {"query": "cats", "limit": "many"}}),
+        (
+            "POST",
+            "/search",
+            {"content": b"{", "headers": {"Content-Type": "application/json"}},
+        ),
+        ("POST", "/search", {"content": b'{"query": "cats"}'}),
+    )
+
+    assert not_found.status_code == 404
+    assert not_allowed.status_code == 405
+    # Web pages can send GET requests to any server without asking first
+    assert get_search.status_code == 405
+    assert no_query.status_code == 400
+    assert no_query.json() == {"error": "At least one query is required"}
+    assert bad_limit.json() == {"error": "'limit' must be an integer"}
+    assert bad_json.status_code == 400
+    assert not_json.status_code == 415
+
+
+def test_server_download_dir(tmp_path):
+    """
+    Downloads cannot be saved outside of the download directory of the server
+    """
+    download_dir = tmp_path / "downloads"
+    inside, outside, absolute, not_a_string = call_server(
+        ("POST", "/download", {"json": {"results": [], "output_dir": "cats"}}),
+        ("POST", "/download", {"json": {"query": "cats", "output_dir": "../outside"}}),
+        ("POST", "/download", {"json": {"query": "cats", "output_dir": str(tmp_path)}}),
+        ("POST", "/download", {"json": {"query": "cats", "output_dir": 1}}),
+        download_dir=download_dir,
+    )
+
+    assert inside.json() == {"saved": [], "failed": []}
+    assert outside.status_code == 403
+    assert absolute.status_code == 403
+    assert not_a_string.status_code == 400
+    assert not (tmp_path / "outside").exists()
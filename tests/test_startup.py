@@ -0,0 +1,149 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+#: Directory containing the "latz" package
+PROJECT_ROOT = Path(__file__).parent.parent
+
+#: Upper bound for the time spent importing modules for "--help" (in microseconds),
+#: about twice what we measured (~250ms). Slower machines can raise it with the
+#: ``LATZ_IMPORT_TIME_BUDGET`` environment variable.
+IMPORT_TIME_BUDGET = int(os.environ.get("LATZ_IMPORT_TIME_BUDGET", 500_000))
+
+
+def get_imported_modules(tmp_path, *args) -> dict[str, int]:
+    """
+    Runs latz with ``args`` in a fresh interpreter and returns the modules it imported
+    (indented by their nesting level) along with their cumulative import time in
+    microseconds
+    """
+    env = {
+        **os.environ,
+        "HOME": str(tmp_path),
+        "XDG_CACHE_HOME": str(tmp_path / "cache"),
+        "PYTHONPATH": str(PROJECT_ROOT),
+    }
+    process = subprocess.run(
+        (sys.executable, "-X", "importtime", "-m", "latz", *args),
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert process.returncode == 0, process.stderr
+
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules[name.rstrip()] = int(cumulative)
+
+    return modules
+
+
+def get_total_import_time(modules: dict[str, int]) -> int:
+    return sum(
+        cumulative
+        for name, cumulative in modules.items()
+        # Nested imports are indented by two extra spaces per level
+        if not name.startswith("  ")
+    )
+
+
+@pytest.mark.parametrize("args", (("--help",), ("search", "--help")))
+def test_help_does_not_import_heavy_dependencies(tmp_path, args):
+    """
+    Showing help neither needs the plugins nor the configuration, so none of the heavy
+    dependencies should be imported.
+    """
+    modules = {name.strip() for name in get_imported_modules(tmp_path, *args)}
+
+    assert "httpx" not in modules
+    assert "pydantic" not in modules
+    assert "PIL" not in modules
+
+
+def test_config_show_does_not_import_httpx(tmp_path):
+    """
+    Showing the configuration does not perform any requests, so httpx is not imported
+    """
+    modules = {
+        name.strip() for name in get_imported_modules(tmp_path, "config", "show")
+    }
+
+    assert "httpx" not in modules
+    assert "PIL" not in modules
+
+
+def test_cli_import_does_not_import_heavy_dependencies():
+    """
+    Importing the command line interface must not import any of the heavy
+    dependencies; they are only imported by the commands that need them.
+    """
+    heavy_modules = ("httpx", "pydantic", "PIL", "latz.search")
+    process = subprocess.run(
+        (
+            sys.executable,
+            "-c",
+            "import sys, latz.cli; "
+            f"print(*(name for name in {heavy_modules!r} if name in sys.modules))",
+        ),
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert process.returncode == 0, process.stderr
+
+    assert process.stdout.split() == []
+
+
+def test_help_import_time_budget(tmp_path):
+    """
+    The time spent importing modules for "--help" stays within our budget
+    """
+    modules = get_imported_modules(tmp_path, "--help")
+
+    assert get_total_import_time(modules) < IMPORT_TIME_BUDGET
+
+
+def test_search_forwarded_to_daemon_does_not_import_heavy_dependencies(tmp_path):
+    """
+    Searches forwarded to "latz serve --daemon" need neither the plugins nor the
+    configuration, so none of the heavy dependencies should be imported.
+    """
+    (tmp_path / ".latz.json").write_text('{"search_backends": ["placeholder"]}')
+    socket_file = tmp_path / "cache" / "latz" / "daemon.sock"
+    env = {
+        **os.environ,
+        "HOME": str(tmp_path),
+        "XDG_CACHE_HOME": str(tmp_path / "cache"),
+        "PYTHONPATH": str(PROJECT_ROOT),
+    }
+    server = subprocess.Popen(
+        (sys.executable, "-m", "latz", "serve", "--daemon"),
+        cwd=tmp_path,
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+
+    try:
+        deadline = time.monotonic() + 10
+        while not socket_file.exists():
+            assert time.monotonic() < deadline, "The daemon did not start"
+            time.sleep(0.05)
+
+        modules = {
+            name.strip() for name in get_imported_modules(tmp_path, "search", "cats")
+        }
+    finally:
+        server.terminate()
+        server.wait(10)
+
+    assert "httpx" not in modules
+    assert "pydantic" not in modules
+    assert "pluggy" not in modules
@@ -0,0 +1,107 @@
+"""
+Unsplash search backend tests.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+
+from latz.plugins.image import unsplash
+
+
+def get_config():
+    return SimpleNamespace(
+        search_backend_settings=SimpleNamespace(
+            unsplash=SimpleNamespace(access_key="key", base_url=unsplash.BASE_URL)
+        )
+    )
+
+
+def search(limit: int | None, total: int, **kwargs) -> tuple[tuple, list[dict]]:
+    """
+    Searches a fake Unsplash API which has ``total`` results and returns the results
+    along with the query parameters of each request
+    """
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        requests.append(params)
+        page = int(params.get("page", 1))
+        per_page = int(params.get("per_page", 10))
+        ids = range((page - 1) * per_page, min(page * per_page, total))
+
+        return httpx.Response(
+            200,
+            json={
+                "results": [
+                    {
+                        "id": str(idx),
+                        "links": {"download": f"https://example.com/{idx}"},
+                    }
+                    for idx in ids
+                ]
+            },
+        )
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await unsplash.search(
+                client, get_config(), "cats", limit=limit, **kwargs
+            )
+
+    return asyncio.run(run()), requests
+
+
+def test_search_without_limit_fetches_first_page():
+    """
+    Without a limit, only the first page (with the default page size) is fetched
+    """
+    results, requests = search(None, total=100)
+
+    assert len(results) == 10
+    assert requests == [{"query": "cats"}]
+
+
+def test_search_fetches_pages_for_limit():
+    """
+    All pages needed for the limit are fetched using the largest page size
+    """
+    results, requests = search(70, total=100)
+
+    assert [result.id for result in results] == [str(idx) for idx in range(70)]
+    assert sorted(int(params["page"]) for params in requests) == [1, 2, 3]
+    assert {params["per_page"] for params in requests} == {"30"}
+
+
+def test_search_stops_at_last_page():
+    """
+    When there are fewer results than the limit, all of them are returned
+    """
+    results, requests = search(70, total=45)
+
+    assert len(results) == 45
+
+    results, requests = search(5, total=100)
+
+    assert len(results) == 5
+    assert requests == [{"query": "cats", "page": "1", "per_page": "5"}]
+
+
+def test_search_fetches_window_for_offset():
+    """
+    Only the pages containing the results from ``offset`` on are fetched and filters
+    are passed on to the API
+    """
+    results, requests = search(10, total=100, offset=20, orientation="portrait")
+
+    assert [result.id for result in results] == [str(idx) for idx in range(20, 30)]
+    assert requests == [
+        {"query": "cats", "orientation": "portrait", "page": "3", "per_page": "10"}
+    ]
+
+    # An offset which does not line up with the limit uses the largest page size
+    results, requests = search(10, total=100, offset=25)
+
+    assert [result.id for result in results] == [str(idx) for idx in range(25, 35)]
+    assert sorted(int(params["page"]) for params in requests) == [1, 2]